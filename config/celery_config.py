@@ -1,9 +1,10 @@
 from datetime import timedelta
 
 from config.database_config import DB_USER, DB_PASS, DB_HOST, DB_NAME
+from config.redis_config import REDIS_URL
 
-broker_url = 'redis://redis:6379/0'
-result_backend = 'redis://redis:6379/0'
+broker_url = REDIS_URL
+result_backend = REDIS_URL
 
 
 task_serializer = 'json'
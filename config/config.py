@@ -1,17 +1,61 @@
-from src.monitoring.parsers.mega_market_parser import MegaMarkerParser
+import os
+
+from config.selenium_config import DRIVER_POOL_MAX_SIZE
+from src.monitoring.parsers.mega_market_parser import MegaMarketHtmlParser
 from src.monitoring.parsers.ozon_parser import OzonParser
-from src.monitoring.parsers.wildberries_parser import WildberriesParser
+from src.monitoring.parsers.wildberries_api_parser import WildberriesApiParser
 
 
+# ключи - маркетплейсы без www, как их возвращает get_marketplace
 DOMAINS = {
-    'megamarket.ru': MegaMarkerParser,
-    'www.megamarket.ru': MegaMarkerParser,
-
-    'www.ozon.ru': OzonParser,
+    'megamarket.ru': MegaMarketHtmlParser,
     'ozon.ru': OzonParser,
+    'wildberries.ru': WildberriesApiParser,
+}
+
+
+SWEEP_MAX_SESSIONS = int(os.getenv('SWEEP_MAX_SESSIONS', DRIVER_POOL_MAX_SIZE))
+DEFAULT_MARKETPLACE_SESSIONS = 1
+MARKETPLACE_SESSIONS = {
+    'megamarket.ru': int(os.getenv('MEGAMARKET_SESSIONS', 1)),
+    'ozon.ru': int(os.getenv('OZON_SESSIONS', 1)),
+    'wildberries.ru': int(os.getenv('WILDBERRIES_SESSIONS', 1)),
+}
+
+# Не больше стольких загрузок страниц в секунду на маркетплейс, общий лимит для всех воркеров
+DEFAULT_RATE_LIMIT = float(os.getenv('DEFAULT_RATE_LIMIT', 0.5))
+MARKETPLACE_RATE_LIMITS = {
+    'megamarket.ru': float(os.getenv('MEGAMARKET_RATE_LIMIT', 0.5)),
+    'ozon.ru': float(os.getenv('OZON_RATE_LIMIT', 0.5)),
+    'wildberries.ru': float(os.getenv('WILDBERRIES_RATE_LIMIT', 2)),
+}
+RATE_LIMIT_BURST = int(os.getenv('RATE_LIMIT_BURST', 3))
+RATE_LIMIT_MAX_WAIT = float(os.getenv('RATE_LIMIT_MAX_WAIT', 30))  # дольше ждать очереди не имеет смысла
+CIRCUIT_BREAKER_FAILURES = int(os.getenv('CIRCUIT_BREAKER_FAILURES', 5))  # ошибок подряд до отключения маркетплейса
+CIRCUIT_BREAKER_COOLDOWN = int(os.getenv('CIRCUIT_BREAKER_COOLDOWN', 5 * 60))
+
+RESULT_CACHE_TTL = int(os.getenv('RESULT_CACHE_TTL', 120))  # сколько секунд цена товара считается свежей
+RESULT_CACHE_LOCAL_SIZE = int(os.getenv('RESULT_CACHE_LOCAL_SIZE', 1024))
+RESULT_CACHE_LOCK_TIMEOUT = int(os.getenv('RESULT_CACHE_LOCK_TIMEOUT', 60))  # не дольше загрузки страницы
+
+HANDLER_SCRAPE_WORKERS = int(os.getenv('HANDLER_SCRAPE_WORKERS', DRIVER_POOL_MAX_SIZE))
+SWEEP_WRITE_CHUNK_SIZE = int(os.getenv('SWEEP_WRITE_CHUNK_SIZE', 100))
+SWEEP_READ_CHUNK_SIZE = int(os.getenv('SWEEP_READ_CHUNK_SIZE', 1000))
+MONITORING_TASK_CHUNK_SIZE = int(os.getenv('MONITORING_TASK_CHUNK_SIZE', 20))  # товаров в одной задаче Celery
+PRICE_HISTORY_RAW_DAYS = int(os.getenv('PRICE_HISTORY_RAW_DAYS', 30))
 
-    'www.wildberries.ru': WildberriesParser,
-    'wildberries.ru': WildberriesParser,
-    'https://wildberries.ru': WildberriesParser,
+# Ограничения Telegram: ~30 сообщений в секунду всего и не чаще раза в секунду в один чат
+NOTIFICATIONS_GLOBAL_RATE = float(os.getenv('NOTIFICATIONS_GLOBAL_RATE', 25))
+NOTIFICATIONS_CHAT_INTERVAL = float(os.getenv('NOTIFICATIONS_CHAT_INTERVAL', 1))
+NOTIFICATIONS_SENDERS = int(os.getenv('NOTIFICATIONS_SENDERS', 8))
+NOTIFICATIONS_MAX_RETRIES = int(os.getenv('NOTIFICATIONS_MAX_RETRIES', 3))
+NOTIFICATIONS_FLUSH_TIMEOUT = float(os.getenv('NOTIFICATIONS_FLUSH_TIMEOUT', 60))
 
-}
\ No newline at end of file
+# Планировщик проверок: интервалы в секундах
+SCHEDULE_TICK_LIMIT = int(os.getenv('SCHEDULE_TICK_LIMIT', 500))  # товаров за один тик beat
+SCHEDULE_BASE_INTERVAL = int(os.getenv('SCHEDULE_BASE_INTERVAL', 30 * 60))
+SCHEDULE_MIN_INTERVAL = int(os.getenv('SCHEDULE_MIN_INTERVAL', 2 * 60))
+SCHEDULE_MAX_INTERVAL = int(os.getenv('SCHEDULE_MAX_INTERVAL', 6 * 60 * 60))
+SCHEDULE_VOLATILITY_ALPHA = float(os.getenv('SCHEDULE_VOLATILITY_ALPHA', 0.3))
+# сколько товар закреплен за обходом; отсчет начинается заново, когда порция берется в работу
+SCHEDULE_LEASE_TIMEOUT = int(os.getenv('SCHEDULE_LEASE_TIMEOUT', 15 * 60))
@@ -1,13 +1,20 @@
+import time
 
-from sqlalchemy import create_engine, select
-from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+from sqlalchemy import create_engine, text, event, Engine, QueuePool
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession, AsyncEngine
 from sqlalchemy.orm import scoped_session, sessionmaker, DeclarativeBase
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 from dotenv import load_dotenv
 import os
 
+from config.logger import setup_logger
+from src.monitoring.metrics import metrics
+
 
 load_dotenv()
 
+logger = setup_logger(__name__)
+
 
 DB_USER = os.getenv('DB_USER')
 DB_PASS = os.getenv('DB_PASS')
@@ -18,21 +25,105 @@ if None in [DB_USER, DB_PASS, DB_HOST, DB_NAME]:
     raise ValueError("One or more required environment variables are missing.")
 
 DATABASE_URL = f"postgresql://{DB_USER}:{DB_PASS}@{DB_HOST}/{DB_NAME}"
-# DATABASE_URL = f"postgresql+asyncpg://{DB_USER}:{DB_PASS}@{DB_HOST}/{DB_NAME}"
+ASYNC_DATABASE_URL = f"postgresql+asyncpg://{DB_USER}:{DB_PASS}@{DB_HOST}/{DB_NAME}"
 # DATABASE_URL = f"postgresql://{DB_USER}:{DB_PASS}@{DB_HOST}/{DB_NAME}_test"
 
-engine = create_engine(DATABASE_URL, echo=True)
+# роль процесса: bot - бот и его обработчики, worker - воркер Celery, beat - планировщик Celery
+DB_ROLE = os.getenv('DB_ROLE', 'bot')
+DB_POOL_SIZES = {
+    'bot': (5, 10),  # (pool_size, max_overflow)
+    'worker': (2, 4),
+    'beat': (1, 1),
+}
+DB_POOL_SIZE = os.getenv('DB_POOL_SIZE')
+DB_MAX_OVERFLOW = os.getenv('DB_MAX_OVERFLOW')
+DB_POOL_TIMEOUT = float(os.getenv('DB_POOL_TIMEOUT', 30))
+DB_POOL_RECYCLE = int(os.getenv('DB_POOL_RECYCLE', 1800))  # раньше, чем соединение закроет сервер или балансировщик
+DB_ECHO = os.getenv('DB_ECHO', 'false').lower() == 'true'
+DB_SLOW_QUERY_SECONDS = float(os.getenv('DB_SLOW_QUERY_SECONDS', 0.5))
+
+
+class TimedCheckoutMixin:
+    """Считает время ожидания свободного соединения из пула в метриках db.pool_*"""
+
+    # _do_get - внутренний метод пула SQLAlchemy (проверено на 2.0.25 из requirements.txt);
+    # событие checkout вызывается уже после получения соединения и не видит ожидания
+    def _do_get(self):
+        started_at = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            metrics.increment('db.pool_checkouts')
+            metrics.increment('db.pool_wait_seconds', time.perf_counter() - started_at)
+
+
+class TimedQueuePool(TimedCheckoutMixin, QueuePool):
+    pass
+
+
+class TimedAsyncQueuePool(TimedCheckoutMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+def get_pool_settings(role: str) -> dict:
+    pool_size, max_overflow = DB_POOL_SIZES[role]
+    return {
+        'pool_size': int(DB_POOL_SIZE or pool_size),
+        'max_overflow': int(DB_MAX_OVERFLOW or max_overflow),
+        'pool_timeout': DB_POOL_TIMEOUT,
+        'pool_recycle': DB_POOL_RECYCLE,
+        'pool_pre_ping': True,
+        'echo': DB_ECHO,
+    }
+
+
+def create_db_engine(role: str = DB_ROLE, url: str = DATABASE_URL) -> Engine:
+    db_engine = create_engine(url, poolclass=TimedQueuePool, **get_pool_settings(role))
+    log_slow_queries(db_engine)
+    return db_engine
+
+
+def create_async_db_engine(role: str = DB_ROLE, url: str = ASYNC_DATABASE_URL) -> AsyncEngine:
+    db_engine = create_async_engine(url, poolclass=TimedAsyncQueuePool, **get_pool_settings(role))
+    log_slow_queries(db_engine.sync_engine)
+    return db_engine
+
+
+def log_slow_queries(db_engine: Engine, threshold: float = DB_SLOW_QUERY_SECONDS):
+    """Вместо echo пишет в лог только запросы дольше threshold секунд"""
+
+    @event.listens_for(db_engine, 'before_cursor_execute')
+    def start_timer(conn, cursor, statement, parameters, context, executemany):
+        context._query_started_at = time.perf_counter()
+
+    @event.listens_for(db_engine, 'after_cursor_execute')
+    def check_duration(conn, cursor, statement, parameters, context, executemany):
+        duration = time.perf_counter() - context._query_started_at
+        if duration >= threshold:
+            metrics.increment('db.slow_queries')
+            logger.warning(f'Медленный запрос ({duration:.3f} с): {" ".join(statement.split())[:1000]}')
+
+
+engine = create_db_engine()
 db_session = scoped_session(sessionmaker(autocommit=False, autoflush=False, bind=engine))
 
-# engine = create_async_engine(
-#     DATABASE_URL,
-#     echo=True
-# )
-# async_session: async_sessionmaker[AsyncSession] = async_sessionmaker(
-#     engine,
-#     class_=AsyncSession,
-#     expire_on_commit=False,
-# )
+# Асинхронный движок для бота, синхронный db_session остается для воркеров Celery
+async_engine = create_async_db_engine()
+async_session: async_sessionmaker[AsyncSession] = async_sessionmaker(
+    async_engine,
+    class_=AsyncSession,
+    expire_on_commit=False,
+)
+
+
+def dispose_engines_after_fork():
+    """Дочерний процесс не должен пользоваться сокетами родителя: пулы начинаются заново.
+
+    close=False оставляет соединения родителя открытыми для самого родителя.
+    """
+    db_session.remove()
+    engine.dispose(close=False)
+    async_engine.sync_engine.dispose(close=False)
 
 
 class Base(DeclarativeBase):
@@ -46,46 +137,30 @@ class Base(DeclarativeBase):
                 cols.append(f'{col}={getattr(self, col)}')
         return f'<{self.__class__.__name__} {", ".join(cols)}'
 
+
+# create_all не добавляет колонки в существующие таблицы, поэтому новые колонки добавляются здесь
+SCHEMA_UPGRADES = [
+    "ALTER TABLE users ADD COLUMN IF NOT EXISTS digest_mode VARCHAR(16) NOT NULL DEFAULT 'immediate'",
+    "ALTER TABLE products ADD COLUMN IF NOT EXISTS marketplace VARCHAR(64)",
+    "ALTER TABLE products ADD COLUMN IF NOT EXISTS article_id VARCHAR(256)",
+    "CREATE UNIQUE INDEX IF NOT EXISTS ix_products_marketplace_article_id ON products (marketplace, article_id)",
+    # из повторных подписок на товар остается последняя
+    'DELETE FROM user_products AS duplicate USING user_products AS latest '
+    'WHERE duplicate."user" = latest."user" AND duplicate.product = latest.product AND duplicate.id < latest.id',
+    'CREATE UNIQUE INDEX IF NOT EXISTS uq_user_products_user_product ON user_products ("user", product)',
+    'CREATE INDEX IF NOT EXISTS ix_user_products_product ON user_products (product)',
+]
+
+
 # Base.metadata.drop_all(bind
 def init_db():
     from db.models import Base
-    engine.echo = False
+    from db.crud_operations import ProductsCRUD
     # async with engine.begin() as conn:
     #     await conn.run_sync(Base.metadata.create_all)
     # Base.metadata.drop_all(bind=engine)
     Base.metadata.create_all(bind=engine)
-    engine.echo = True
-
-
-# ______ASYNC______________
-# async def get_session() -> AsyncSession:
-#     async with async_session() as session:
-#         return session
-
-
-# async def get_user_products(session: AsyncSession, telegram_id: int = None):
-#     result = (
-#         await session.execute(
-#             select(UserProducts, Users, Products)
-#             .join(Users, UserProducts.user == Users.id)
-#             .filter(Users.telegram_id == telegram_id)
-#             .join(Products, UserProducts.product == Products.id)
-#         ))
-#
-#     return result
-#
-#
-# async def main():
-#     # Initialize the database asynchronously
-#     await init_db()
-#
-#     # Use the asynchronous session to query user products
-#     async with async_session() as session:
-#         telegram_id = 5139738902  # Replace with the actual Telegram ID
-#         result = await get_user_products(session, telegram_id)
-#         print('WHOAAAA')
-#         print([x.id for x in result.scalars().all()])
-#
-# if __name__ == '__main__':
-#
-#     asyncio.run(main())
+    with engine.begin() as connection:
+        for statement in SCHEMA_UPGRADES:
+            connection.execute(text(statement))
+    ProductsCRUD.backfill_product_keys()
@@ -0,0 +1,26 @@
+import os
+import threading
+
+import redis
+from dotenv import load_dotenv
+
+
+load_dotenv()
+
+
+REDIS_URL = os.getenv('REDIS_URL', 'redis://redis:6379/0')
+REDIS_SOCKET_TIMEOUT = float(os.getenv('REDIS_SOCKET_TIMEOUT', 2))
+
+_lock = threading.Lock()
+_client: redis.Redis | None = None
+
+
+def get_redis() -> redis.Redis:
+    """Общий для процесса клиент Redis с пулом соединений"""
+    global _client
+    if _client is None:
+        with _lock:
+            if _client is None:
+                _client = redis.Redis.from_url(REDIS_URL, socket_timeout=REDIS_SOCKET_TIMEOUT,
+                                               socket_connect_timeout=REDIS_SOCKET_TIMEOUT)
+    return _client
@@ -1,4 +1,5 @@
 import json
+import os
 
 from selenium import webdriver
 from selenium.webdriver.chrome.webdriver import WebDriver
@@ -9,6 +10,34 @@ from config.logger import setup_logger
 logger = setup_logger(__name__)
 
 
+SELENIUM_REMOTE_URL = os.getenv('SELENIUM_REMOTE_URL', 'http://172.19.0.3:4444/wd/hub')
+PAGE_LOAD_TIMEOUT = int(os.getenv('PAGE_LOAD_TIMEOUT', 8))
+PAGE_WAIT_TIMEOUT = float(os.getenv('PAGE_WAIT_TIMEOUT', 7))
+ANTI_BOT_JITTER = (float(os.getenv('ANTI_BOT_JITTER_MIN', 0)), float(os.getenv('ANTI_BOT_JITTER_MAX', 1)))
+
+DRIVER_POOL_MAX_SIZE = int(os.getenv('DRIVER_POOL_MAX_SIZE', 2))
+DRIVER_POOL_IDLE_TIMEOUT = float(os.getenv('DRIVER_POOL_IDLE_TIMEOUT', 300))
+DRIVER_POOL_MAX_PAGE_LOADS = int(os.getenv('DRIVER_POOL_MAX_PAGE_LOADS', 100))
+DRIVER_POOL_LEASE_TIMEOUT = float(os.getenv('DRIVER_POOL_LEASE_TIMEOUT', 60))
+
+BLOCK_RESOURCES = os.getenv('BLOCK_RESOURCES', '1') == '1'
+PAGE_LOAD_STRATEGY = os.getenv('PAGE_LOAD_STRATEGY', 'eager')
+
+# Ресурсы, не нужные для цены и названия: картинки, шрифты, видео, аналитика и реклама
+BLOCKED_URL_PATTERNS = ['*.png', '*.jpg', '*.jpeg', '*.gif', '*.webp', '*.avif', '*.svg', '*.ico',
+                        '*.woff', '*.woff2', '*.ttf', '*.otf', '*.mp4', '*.webm', '*.m3u8',
+                        '*google-analytics.com*', '*googletagmanager.com*', '*doubleclick.net*',
+                        '*mc.yandex.ru*', '*an.yandex.ru*', '*top-fwz1.mail.ru*', '*vk.com/rtrg*']
+MARKETPLACE_BLOCKED_URL_PATTERNS = {
+    'ozon.ru': ['*ir.ozone.ru/s3/multimedia*', '*xapi.ozon.ru/dlte*'],
+    'wildberries.ru': ['*images.wbstatic.net*', '*basket-*.wbbasket.ru*/images/*'],
+    'megamarket.ru': ['*main-cdn.sbermegamarket.ru/big*'],
+}
+
+HTTP_TIMEOUT = float(os.getenv('HTTP_TIMEOUT', 5))
+HTTP_POOL_MAXSIZE = int(os.getenv('HTTP_POOL_MAXSIZE', 10))
+
+
 def send(driver, cmd, params={}):
     resource = "/session/%s/chromium/send_command_and_get_result" % driver.session_id
     url = driver.command_executor._url + resource
@@ -21,6 +50,16 @@ def add_script(driver, script):
     send(driver, "Page.addScriptToEvaluateOnNewDocument", {"source": script})
 
 
+def block_resources(driver, marketplace: str):
+    """Запрещает загрузку ресурсов, не нужных для цены и названия на страницах маркетплейса"""
+    if not BLOCK_RESOURCES or getattr(driver, 'blocked_resources_for', None) == marketplace:
+        return
+    patterns = BLOCKED_URL_PATTERNS + MARKETPLACE_BLOCKED_URL_PATTERNS.get(marketplace, [])
+    send(driver, "Network.enable")
+    send(driver, "Network.setBlockedURLs", {"urls": patterns})
+    driver.blocked_resources_for = marketplace
+
+
 WebDriver.add_script = add_script
 
 options = webdriver.ChromeOptions()
@@ -35,6 +74,15 @@ options.add_argument(f"--user-agent={my_user_agent}")
 options.add_argument("--disable-blink-features=AutomationControlled")
 options.add_experimental_option("excludeSwitches", ["enable-automation"])
 options.add_experimental_option("useAutomationExtension", False)
+options.page_load_strategy = PAGE_LOAD_STRATEGY
+
+if BLOCK_RESOURCES:
+    options.add_argument("--blink-settings=imagesEnabled=false")
+    options.add_experimental_option("prefs", {
+        "profile.managed_default_content_settings.images": 2,
+        "profile.managed_default_content_settings.media_stream": 2,
+        "profile.default_content_setting_values.notifications": 2,
+    })
 
 
 # driver_sel = webdriver.Remote(
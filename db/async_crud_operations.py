@@ -0,0 +1,89 @@
+from functools import wraps
+
+from sqlalchemy import select, update
+
+from config.database_config import async_session
+from config.logger import setup_logger
+from db.crud_operations import handle_database_errors, UsersCRUD, UserProductsCRUD
+from db.models import UserProducts, Users
+
+logger = setup_logger(__name__)
+
+
+def async_database_operation(func):
+    @wraps(func)
+    async def wrapper(*args, **kwargs):
+        with handle_database_errors():
+            return await func(*args, **kwargs)
+
+    return wrapper
+
+
+class AsyncUsersCRUD:
+    @classmethod
+    @async_database_operation
+    async def add_new_user_and_get_user_id(cls, telegram_id: int) -> int:
+        UsersCRUD._validate_telegram_id(telegram_id)
+
+        async with async_session() as session:
+            user_id = (await session.execute(UsersCRUD.upsert_user_query(telegram_id))).scalar_one()
+            await session.commit()
+            return user_id
+
+    @classmethod
+    @async_database_operation
+    async def get_digest_mode(cls, telegram_id: int) -> str | None:
+        UsersCRUD._validate_telegram_id(telegram_id)
+
+        async with async_session() as session:
+            statement = select(Users.digest_mode).filter_by(telegram_id=telegram_id)
+            return (await session.execute(statement)).scalar_one_or_none()
+
+    @classmethod
+    @async_database_operation
+    async def set_digest_mode(cls, telegram_id: int, digest_mode: str) -> bool:
+        UsersCRUD._validate_telegram_id(telegram_id)
+
+        async with async_session() as session:
+            statement = update(Users).filter_by(telegram_id=telegram_id).values(digest_mode=digest_mode)
+            result = await session.execute(statement)
+            await session.commit()
+            return result.rowcount > 0
+
+
+class AsyncUserProductsCRUD:
+    @staticmethod
+    @async_database_operation
+    async def get_user_products_for_handler(telegram_id: int = None) -> list[UserProducts]:
+        if not telegram_id:
+            raise ValueError
+        async with async_session() as session:
+            query = UserProductsCRUD.user_products_query(telegram_id)
+            result = (await session.execute(query)).scalars().all()
+            return result
+
+    @staticmethod
+    @async_database_operation
+    async def add_user_product(telegram_id: int, product_url: str, is_take_into_account_bonuses: bool,
+                               threshold_price: float, last_product_price: float, product_name: str,
+                               is_any_change: bool):
+        query = UserProductsCRUD.add_user_product_query(
+            telegram_id=telegram_id, product_url=product_url, last_product_price=last_product_price,
+            product_name=product_name, is_any_change=is_any_change, threshold_price=threshold_price,
+            is_take_into_account_bonuses=is_take_into_account_bonuses)
+        async with async_session() as session:
+            user_product_id = (await session.execute(query)).scalar_one()
+            await session.commit()
+            return user_product_id
+
+    @staticmethod
+    @async_database_operation
+    async def delete_user_products(user_product_id: int):
+        async with async_session() as session:
+            user_product = await session.get(UserProducts, user_product_id)
+
+            if user_product:
+                await session.delete(user_product)
+                await session.commit()
+                return user_product
+            raise ValueError(f'Invalid user_product_id: {user_product_id}')
@@ -1,13 +1,18 @@
+import datetime
 from contextlib import contextmanager
-from typing import Union
+from typing import Union, Iterator, NamedTuple
 
-from sqlalchemy import select
+from sqlalchemy import select, func, update, values, column, Integer, delete, and_, exists, Float, DateTime, or_, Row, \
+    literal, true, tuple_
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.exc import SQLAlchemyError
-from sqlalchemy.orm import joinedload
+from sqlalchemy.orm import contains_eager
 
 from config.database_config import db_session
 from config.logger import setup_logger
-from db.models import UserProducts, Users, Products
+from db.models import UserProducts, Users, Products, SelectorStats, PriceObservations, PriceRollups, \
+    ProductSchedule, PendingNotifications
+from src.monitoring.services.product_key import get_product_key
 
 logger = setup_logger(__name__)
 
@@ -35,16 +40,20 @@ class UsersCRUD:
         cls._validate_telegram_id(telegram_id)
 
         with db_session() as session:
-            statement = select(Users).filter_by(telegram_id=telegram_id)
-            existing_user = session.execute(statement).scalars().one_or_none()
-
-            if existing_user:
-                return existing_user.id
-
-            new_user = Users(telegram_id=telegram_id)
-            session.add(new_user)
+            user_id = session.execute(cls.upsert_user_query(telegram_id)).scalar_one()
             session.commit()
-            return new_user.id
+            return user_id
+
+    @staticmethod
+    def upsert_user_query(telegram_id: int):
+        """INSERT ... ON CONFLICT, возвращающий id и нового, и уже существующего пользователя"""
+        statement = insert(Users).values(telegram_id=telegram_id)
+        return (
+            statement
+            .on_conflict_do_update(index_elements=[Users.telegram_id],
+                                   set_={'telegram_id': statement.excluded.telegram_id})
+            .returning(Users.id)
+        )
 
     @staticmethod
     def _validate_telegram_id(telegram_id: int):
@@ -63,27 +72,81 @@ class ProductsCRUD:
         cls._validate_product_name(product_name)
 
         with db_session() as session:
-            product = session.query(Products).filter_by(url=product_url).first()
-
-            if not product:
-                product = Products(url=product_url, last_price=last_price, product_name=product_name)
-                session.add(product)
-                session.commit()
-                return product.id
-
-            product.last_price = last_price
-            product.product_name = product_name
+            product_id = session.execute(cls.upsert_product_query(product_url, last_price, product_name)).scalar_one()
             session.commit()
-            return product.id
+            return product_id
+
+    @staticmethod
+    def upsert_product_query(product_url: str, last_price: float, product_name: str, is_update_price: bool = True):
+        """Upsert товара по маркетплейсу и артикулу, ссылка остается первой.
+
+        is_update_price=False не трогает цену и название существующего товара: их меняет
+        только обход, иначе изменение цены не дойдет до остальных подписчиков и в историю.
+        """
+        marketplace, article_id = get_product_key(product_url)
+        statement = insert(Products).values(url=product_url, last_price=last_price, product_name=product_name,
+                                            marketplace=marketplace, article_id=article_id)
+        if is_update_price:
+            changes = {'last_price': statement.excluded.last_price,
+                       'product_name': statement.excluded.product_name,
+                       'updated_at': func.timezone('utc', func.now())}
+        else:
+            # обновление без изменений нужно, чтобы RETURNING вернул id существующего товара
+            changes = {'marketplace': statement.excluded.marketplace}
+        return (
+            statement
+            .on_conflict_do_update(index_elements=[Products.marketplace, Products.article_id], set_=changes)
+            .returning(Products.id)
+        )
 
     @classmethod
     @database_operation
     def get_product_id(cls, product_url: str) -> int | None:
         cls._validate_product_url(product_url)
 
+        marketplace, article_id = get_product_key(product_url)
         with db_session() as session:
-            product = session.query(Products).filter_by(url=product_url).first()
-            return product.id if product else None
+            return session.scalar(select(Products.id).filter_by(marketplace=marketplace, article_id=article_id))
+
+    @classmethod
+    @database_operation
+    def backfill_product_keys(cls) -> int:
+        """Заполняет маркетплейс и артикул у старых товаров и сливает товары с одним артикулом.
+
+        Подписки на дубликаты переносятся на товар с меньшим id, дубликаты удаляются.
+        Возвращает число удаленных дубликатов.
+        """
+        user_products = UserProducts.__table__.alias()
+        with db_session() as session:
+            kept_ids = {(marketplace, article_id): product_id for product_id, marketplace, article_id in session.execute(
+                select(Products.id, Products.marketplace, Products.article_id).where(Products.article_id.is_not(None)))}
+            new_keys = []
+            duplicates = {}
+            for product_id, url in session.execute(
+                    select(Products.id, Products.url).where(Products.article_id.is_(None)).order_by(Products.id)):
+                key = get_product_key(url)
+                if key in kept_ids:
+                    duplicates[product_id] = kept_ids[key]
+                else:
+                    kept_ids[key] = product_id
+                    new_keys.append({'id': product_id, 'marketplace': key.marketplace, 'article_id': key.article_id})
+
+            for duplicate_id, product_id in duplicates.items():
+                already_subscribed = (select(UserProducts.id)
+                                      .where(UserProducts.product == product_id,
+                                             UserProducts.user == user_products.c.user))
+                session.execute(update(user_products)
+                                .where(user_products.c.product == duplicate_id, ~exists(already_subscribed))
+                                .values(product=product_id))
+            if duplicates:
+                session.execute(delete(Products).where(Products.id.in_(duplicates)))
+            if new_keys:
+                session.execute(update(Products), new_keys)
+            session.commit()
+
+        if new_keys or duplicates:
+            logger.info(f'Артикулы заполнены у {len(new_keys)} товаров, удалено дубликатов: {len(duplicates)}')
+        return len(duplicates)
 
     @classmethod
     @database_operation
@@ -99,6 +162,29 @@ class ProductsCRUD:
                 logger.info(f'Ошибка изменения строки {product_id}')
                 raise ValueError('Продукта в БД нет!')
 
+    @classmethod
+    @database_operation
+    def set_new_product_prices(cls, new_prices: dict[int, int]) -> int:
+        """Записывает цены всех товаров одним UPDATE ... FROM (VALUES ...) и возвращает число обновленных строк"""
+        if not new_prices:
+            return 0
+        for product_id, new_price in new_prices.items():
+            cls._validate_product_id(product_id)
+            cls._validate_last_price(new_price)
+
+        new_prices_values = values(column('id', Integer), column('last_price', Integer),
+                                   name='new_prices').data(list(new_prices.items()))
+        statement = (
+            update(Products)
+            .where(Products.id == new_prices_values.c.id)
+            .values(last_price=new_prices_values.c.last_price)
+            .execution_options(synchronize_session=False)
+        )
+        with db_session() as session:
+            result = session.execute(statement)
+            session.commit()
+            return result.rowcount
+
     @staticmethod
     def _validate_product_url(product_url):
         if not isinstance(product_url, str) or not product_url:
@@ -124,6 +210,19 @@ class ProductsCRUD:
             raise ValueError("product_id должен быть int")
 
 
+class MonitoredSubscription(NamedTuple):
+    product_id: int
+    url: str
+    last_price: int
+    telegram_id: int
+    threshold_price: int
+    is_any_change: bool
+    is_take_into_account_bonuses: bool
+    volatility: float = 0
+    consecutive_failures: int = 0
+    digest_mode: str = 'immediate'
+
+
 class UserProductsCRUD:
     @staticmethod
     @database_operation
@@ -131,47 +230,93 @@ class UserProductsCRUD:
         if not telegram_id:
             raise ValueError # why this error throw
         with db_session() as session:
-            query = (
-                select(UserProducts)
-                .options(joinedload(UserProducts.products),
-                         joinedload(UserProducts.users))
-                .where(UserProducts.users.has(telegram_id=telegram_id))
-            )
-            result = session.execute(query).scalars().all()
+            result = session.execute(UserProductsCRUD.user_products_query(telegram_id)).scalars().all()
             return result
 
     @staticmethod
-    @database_operation
-    def get_user_products_for_monitoring():
-        with db_session() as session:
-            query = (
-                select(UserProducts)
-                .join(UserProducts.products)
-                .options(joinedload(UserProducts.products),
-                         joinedload(UserProducts.users))
-                .order_by(Products.url)
-            )
-            result = session.execute(query).scalars().all()
-            return result
+    def user_products_query(telegram_id: int):
+        """Подписки пользователя с товарами: поиск по users.telegram_id и индексу user_products(user, product)"""
+        return (
+            select(UserProducts)
+            .join(UserProducts.users)
+            .join(UserProducts.products)
+            .options(contains_eager(UserProducts.users), contains_eager(UserProducts.products))
+            .where(Users.telegram_id == telegram_id)
+            .order_by(UserProducts.id)
+        )
+
+    @staticmethod
+    def iter_subscriptions_for_monitoring(chunk_size: int = 1000,
+                                          product_ids: list[int] | None = None) -> Iterator[MonitoredSubscription]:
+        """Построчно читает подписки через серверный курсор, упорядочивая их по товару.
+
+        Используется отдельная сессия: db_session этого потока закрывается другими
+        операциями, пока обход читает подписки.
+        """
+        query = UserProductsCRUD.subscriptions_query(product_ids).execution_options(yield_per=chunk_size)
+        with handle_database_errors(), db_session.session_factory() as session:
+            for row in session.execute(query):
+                yield MonitoredSubscription(*row)
+
+    @staticmethod
+    def subscriptions_query(product_ids: list[int] | None = None):
+        """Подписки для обхода в порядке товаров: соединение по индексу user_products(product)"""
+        query = (
+            select(Products.id, Products.url, Products.last_price, Users.telegram_id,
+                   UserProducts.threshold_price, UserProducts.is_any_change,
+                   UserProducts.is_take_into_account_bonuses,
+                   func.coalesce(ProductSchedule.volatility, 0),
+                   func.coalesce(ProductSchedule.consecutive_failures, 0),
+                   Users.digest_mode)
+            .join(UserProducts.products)
+            .join(UserProducts.users)
+            .outerjoin(ProductSchedule, ProductSchedule.product_id == Products.id)
+            .order_by(Products.id)
+        )
+        if product_ids is not None:
+            query = query.where(Products.id.in_(product_ids))
+        return query
 
     @staticmethod
     @database_operation  # когда пользователь скидывает ссылку и выбирает что с товаром делать
     def add_user_product(telegram_id: int, product_url: str, is_take_into_account_bonuses: bool,
-                         threshold_price: float, last_product_price: float, product_name: str, is_any_change: bool):
+                         threshold_price: float, last_product_price: float, product_name: str,
+                         is_any_change: bool) -> int:
         with db_session() as session:
-            user_id = UsersCRUD.add_new_user_and_get_user_id(telegram_id=telegram_id)
-
-            product_id = ProductsCRUD.get_product_id(product_url=product_url)
-            if product_id is None:
-                product_id = ProductsCRUD.add_new_product(product_url=product_url,
-                                                          product_name=product_name,
-                                                          last_price=last_product_price)
-
-            user_product = UserProducts(user=user_id, product=product_id, is_any_change=is_any_change,
-                                        threshold_price=threshold_price,
-                                        is_take_into_account_bonuses=is_take_into_account_bonuses)
-            session.add(user_product)
+            user_product_id = session.execute(UserProductsCRUD.add_user_product_query(
+                telegram_id=telegram_id, product_url=product_url, last_product_price=last_product_price,
+                product_name=product_name, is_any_change=is_any_change, threshold_price=threshold_price,
+                is_take_into_account_bonuses=is_take_into_account_bonuses)).scalar_one()
             session.commit()
+            return user_product_id
+
+    @staticmethod
+    def add_user_product_query(telegram_id: int, product_url: str, last_product_price: float, product_name: str,
+                               is_any_change: bool, threshold_price: float, is_take_into_account_bonuses: bool):
+        """Один запрос: upsert пользователя и товара в CTE, затем upsert подписки.
+
+        Цена уже известного товара не меняется. Повторная подписка на тот же товар
+        обновляет настройки существующей подписки.
+        """
+        UsersCRUD._validate_telegram_id(telegram_id)
+        ProductsCRUD._validate_product_url(product_url)
+        ProductsCRUD._validate_last_price(last_product_price)
+        ProductsCRUD._validate_product_name(product_name)
+
+        user = UsersCRUD.upsert_user_query(telegram_id).cte('upserted_user')
+        product = ProductsCRUD.upsert_product_query(product_url, last_product_price, product_name,
+                                                    is_update_price=False).cte('upserted_product')
+        settings = {'is_any_change': is_any_change, 'threshold_price': threshold_price,
+                    'is_take_into_account_bonuses': is_take_into_account_bonuses}
+        return (
+            insert(UserProducts)
+            .from_select(['user', 'product', *settings],
+                         select(user.c.id, product.c.id, *(literal(value) for value in settings.values()))
+                         .select_from(user.join(product, true())))
+            .on_conflict_do_update(index_elements=[UserProducts.user, UserProducts.product],
+                                   set_={**settings, 'updated_at': func.timezone('utc', func.now())})
+            .returning(UserProducts.id)
+        )
 
     @staticmethod
     @database_operation
@@ -186,6 +331,335 @@ class UserProductsCRUD:
             raise ValueError(f'Invalid user_product_id: {user_product_id}')
 
 
+class SelectorStatsCRUD:
+    @staticmethod
+    @database_operation
+    def get_selector_stats() -> list[SelectorStats]:
+        with db_session() as session:
+            return session.execute(select(SelectorStats)).scalars().all()
+
+    @staticmethod
+    @database_operation
+    def save_selector_stats(stats: list[dict]) -> int:
+        """Прибавляет накопленные попадания/промахи к статистике селекторов в БД, возвращает число строк"""
+        if not stats:
+            return 0
+        with db_session() as session:
+            statement = insert(SelectorStats).values(stats)
+            statement = statement.on_conflict_do_update(
+                index_elements=[SelectorStats.marketplace, SelectorStats.kind, SelectorStats.selector],
+                set_={'hits': SelectorStats.hits + statement.excluded.hits,
+                      'misses': SelectorStats.misses + statement.excluded.misses,
+                      'score': statement.excluded.score,
+                      'updated_at': func.timezone('utc', func.now()),
+                      'is_learned': SelectorStats.is_learned | statement.excluded.is_learned,
+                      'last_success_at': func.coalesce(statement.excluded.last_success_at,
+                                                       SelectorStats.last_success_at)}
+            )
+            session.execute(statement)
+            session.commit()
+            return len(stats)
+
+
+class PriceObservationsCRUD:
+    @staticmethod
+    @database_operation
+    def add_observations(observed_prices: dict[int, int]) -> int:
+        """Добавляет наблюдения одним INSERT ... SELECT, пропуская товары, цена которых не изменилась"""
+        if not observed_prices:
+            return 0
+        observed = values(column('product_id', Integer), column('price', Integer),
+                          name='observed').data(list(observed_prices.items()))
+        last_price = (
+            select(PriceObservations.price)
+            .where(PriceObservations.product_id == observed.c.product_id)
+            .order_by(PriceObservations.observed_at.desc())
+            .limit(1)
+            .scalar_subquery()
+        )
+        statement = insert(PriceObservations).from_select(
+            ['product_id', 'price'],
+            select(observed.c.product_id, observed.c.price).where(observed.c.price.is_distinct_from(last_price))
+        )
+        with db_session() as session:
+            result = session.execute(statement)
+            session.commit()
+            return result.rowcount
+
+    @staticmethod
+    @database_operation
+    def get_observations(product_id: int, since: datetime.datetime,
+                         until: datetime.datetime | None = None) -> list[tuple[datetime.datetime, int]]:
+        query = (
+            select(PriceObservations.observed_at, PriceObservations.price)
+            .where(PriceObservations.product_id == product_id, PriceObservations.observed_at >= since)
+            .order_by(PriceObservations.observed_at)
+        )
+        if until is not None:
+            query = query.where(PriceObservations.observed_at < until)
+        with db_session() as session:
+            return [tuple(row) for row in session.execute(query)]
+
+    @staticmethod
+    @database_operation
+    def get_price_stats(product_id: int, since: datetime.datetime,
+                        until: datetime.datetime | None = None) -> dict | None:
+        """min/max/avg цены за период по сырым наблюдениям и дневным агрегатам"""
+        until = until or datetime.datetime.utcnow()
+        raw = select(
+            func.min(PriceObservations.price).label('min_price'),
+            func.max(PriceObservations.price).label('max_price'),
+            func.sum(PriceObservations.price).label('price_sum'),
+            func.count().label('observations'),
+        ).where(PriceObservations.product_id == product_id,
+                PriceObservations.observed_at >= since, PriceObservations.observed_at < until)
+        rollups = select(
+            func.min(PriceRollups.min_price).label('min_price'),
+            func.max(PriceRollups.max_price).label('max_price'),
+            func.sum(PriceRollups.avg_price * PriceRollups.observations).label('price_sum'),
+            func.coalesce(func.sum(PriceRollups.observations), 0).label('observations'),
+        ).where(PriceRollups.product_id == product_id,
+                PriceRollups.period_start >= since, PriceRollups.period_start < until)
+
+        with db_session() as session:
+            rows = [session.execute(raw).one(), session.execute(rollups).one()]
+
+        rows = [row for row in rows if row.observations]
+        if not rows:
+            return None
+        observations = sum(row.observations for row in rows)
+        return {'min_price': min(row.min_price for row in rows),
+                'max_price': max(row.max_price for row in rows),
+                'avg_price': sum(float(row.price_sum) for row in rows) / observations,
+                'observations': observations}
+
+    @staticmethod
+    @database_operation
+    def downsample_observations(older_than: datetime.datetime) -> int:
+        """Сворачивает наблюдения старше older_than в дневные агрегаты и удаляет их.
+
+        Последнее наблюдение каждого товара остается, чтобы по нему работала дедупликация.
+        """
+        latest_ids = (
+            select(PriceObservations.id)
+            .distinct(PriceObservations.product_id)
+            .order_by(PriceObservations.product_id, PriceObservations.observed_at.desc())
+        )
+        is_old = and_(PriceObservations.observed_at < older_than, PriceObservations.id.not_in(latest_ids))
+        period_start = func.date_trunc('day', PriceObservations.observed_at)
+
+        aggregated = insert(PriceRollups).from_select(
+            ['product_id', 'period_start', 'min_price', 'max_price', 'avg_price', 'observations'],
+            select(PriceObservations.product_id, period_start,
+                   func.min(PriceObservations.price), func.max(PriceObservations.price),
+                   func.avg(PriceObservations.price), func.count())
+            .where(is_old)
+            .group_by(PriceObservations.product_id, period_start)
+        )
+        aggregated = aggregated.on_conflict_do_update(
+            index_elements=[PriceRollups.product_id, PriceRollups.period_start],
+            set_={'min_price': func.least(PriceRollups.min_price, aggregated.excluded.min_price),
+                  'max_price': func.greatest(PriceRollups.max_price, aggregated.excluded.max_price),
+                  'avg_price': (PriceRollups.avg_price * PriceRollups.observations
+                                + aggregated.excluded.avg_price * aggregated.excluded.observations)
+                               / (PriceRollups.observations + aggregated.excluded.observations),
+                  'observations': PriceRollups.observations + aggregated.excluded.observations}
+        )
+
+        with db_session() as session:
+            session.execute(aggregated)
+            result = session.execute(delete(PriceObservations).where(is_old))
+            session.commit()
+            return result.rowcount
+
+
+class ScheduledCheck(NamedTuple):
+    product_id: int
+    next_check_at: datetime.datetime
+    priority: float
+    volatility: float
+    consecutive_failures: int
+    last_checked_at: datetime.datetime | None  # None - проверка пропущена, прежнее значение сохраняется
+
+
+class ProductScheduleCRUD:
+    @staticmethod
+    @database_operation
+    def add_missing_schedules() -> int:
+        """Добавляет в расписание товары, которых в нем еще нет, с проверкой прямо сейчас"""
+        missing = select(Products.id).where(~exists().where(ProductSchedule.product_id == Products.id))
+        statement = insert(ProductSchedule).from_select(['product_id'], missing).on_conflict_do_nothing()
+        with db_session() as session:
+            result = session.execute(statement)
+            session.commit()
+            return result.rowcount
+
+    @staticmethod
+    @database_operation
+    def claim_due_products(limit: int, worker_id: str, lease_timeout: int,
+                           now: datetime.datetime | None = None) -> dict[int, str]:
+        """Закрепляет за воркером товары, время проверки которых наступило, и возвращает {id товара: url}.
+
+        Строки выбираются через FOR UPDATE SKIP LOCKED, поэтому параллельные обходы делят
+        очередь между собой, а товар с действующей арендой не достанется другому воркеру.
+        """
+        now = now or datetime.datetime.utcnow()
+        due = (
+            select(ProductSchedule.product_id)
+            .where(ProductSchedule.next_check_at <= now,
+                   or_(ProductSchedule.leased_until.is_(None), ProductSchedule.leased_until < now),
+                   exists().where(UserProducts.product == ProductSchedule.product_id))
+            .order_by(ProductSchedule.priority.desc(), ProductSchedule.next_check_at)
+            .limit(limit)
+            .with_for_update(skip_locked=True, of=ProductSchedule)
+        )
+        statement = (
+            update(ProductSchedule)
+            .where(ProductSchedule.product_id.in_(due), ProductSchedule.product_id == Products.id)
+            .values(leased_until=now + datetime.timedelta(seconds=lease_timeout), leased_by=worker_id)
+            .returning(ProductSchedule.product_id, Products.url)
+            .execution_options(synchronize_session=False)
+        )
+        with db_session() as session:
+            due_products = dict(session.execute(statement).all())
+            session.commit()
+            return due_products
+
+    @staticmethod
+    @database_operation
+    def renew_leases(product_ids: list[int], worker_id: str, lease_timeout: int,
+                     now: datetime.datetime | None = None) -> list[int]:
+        """Продлевает аренду товаров, которые все еще закреплены за worker_id, и возвращает их id.
+
+        Товары, аренда которых истекла и которые закрепил за собой другой обход, не возвращаются.
+        """
+        if not product_ids:
+            return []
+        now = now or datetime.datetime.utcnow()
+        statement = (
+            update(ProductSchedule)
+            .where(ProductSchedule.product_id.in_(product_ids), ProductSchedule.leased_by == worker_id)
+            .values(leased_until=now + datetime.timedelta(seconds=lease_timeout))
+            .returning(ProductSchedule.product_id)
+            .execution_options(synchronize_session=False)
+        )
+        with db_session() as session:
+            renewed = list(session.execute(statement).scalars())
+            session.commit()
+            return renewed
+
+    @staticmethod
+    @database_operation
+    def release_leases(product_ids: list[int], worker_id: str) -> int:
+        """Снимает аренду worker_id с товаров, чтобы следующий тик мог сразу проверить их снова"""
+        if not product_ids:
+            return 0
+        statement = (
+            update(ProductSchedule)
+            .where(ProductSchedule.product_id.in_(product_ids), ProductSchedule.leased_by == worker_id)
+            .values(leased_until=None, leased_by=None)
+            .execution_options(synchronize_session=False)
+        )
+        with db_session() as session:
+            result = session.execute(statement)
+            session.commit()
+            return result.rowcount
+
+    @staticmethod
+    @database_operation
+    def count_leased_due_products(now: datetime.datetime | None = None) -> int:
+        """Сколько наступивших проверок сейчас закреплено за другими воркерами"""
+        now = now or datetime.datetime.utcnow()
+        query = (
+            select(func.count())
+            .select_from(ProductSchedule)
+            .where(ProductSchedule.next_check_at <= now, ProductSchedule.leased_until >= now)
+        )
+        with db_session() as session:
+            return session.execute(query).scalar_one()
+
+    @staticmethod
+    @database_operation
+    def save_checks(checks: list[ScheduledCheck], worker_id: str) -> int:
+        """Записывает результаты проверок одним UPDATE ... FROM (VALUES ...) и снимает аренду.
+
+        Товары, аренду которых за это время перехватил другой обход, не меняются.
+        """
+        if not checks:
+            return 0
+        checked = values(column('product_id', Integer), column('next_check_at', DateTime),
+                         column('priority', Float), column('volatility', Float),
+                         column('consecutive_failures', Integer), column('last_checked_at', DateTime),
+                         name='checked').data([tuple(check) for check in checks])
+        statement = (
+            update(ProductSchedule)
+            .where(ProductSchedule.product_id == checked.c.product_id, ProductSchedule.leased_by == worker_id)
+            .values(next_check_at=checked.c.next_check_at,
+                    priority=checked.c.priority,
+                    volatility=checked.c.volatility,
+                    consecutive_failures=checked.c.consecutive_failures,
+                    last_checked_at=func.coalesce(checked.c.last_checked_at, ProductSchedule.last_checked_at),
+                    leased_until=None,
+                    leased_by=None)
+            .execution_options(synchronize_session=False)
+        )
+        with db_session() as session:
+            result = session.execute(statement)
+            session.commit()
+            return result.rowcount
+
+
+class PendingNotificationsCRUD:
+    @staticmethod
+    @database_operation
+    def add_pending_notifications(changes: list[dict]) -> int:
+        """Копит изменения для сводки: у товара остается первая старая цена и обновляется новая"""
+        if not changes:
+            return 0
+        statement = insert(PendingNotifications).values(changes)
+        statement = statement.on_conflict_do_update(
+            index_elements=[PendingNotifications.chat_id, PendingNotifications.product_id],
+            set_={'new_price': statement.excluded.new_price,
+                  'product_name': statement.excluded.product_name,
+                  'updated_at': func.timezone('utc', func.now())}
+        )
+        with db_session() as session:
+            result = session.execute(statement)
+            session.commit()
+            return result.rowcount
+
+    @staticmethod
+    @database_operation
+    def get_pending_notifications(digest_modes: list[str]) -> list[Row]:
+        """Возвращает накопленные изменения пользователей с указанными режимами сводки"""
+        chat_ids = select(Users.telegram_id).where(Users.digest_mode.in_(digest_modes))
+        query = (
+            select(PendingNotifications.id, PendingNotifications.chat_id, PendingNotifications.product_name,
+                   PendingNotifications.product_url, PendingNotifications.old_price,
+                   PendingNotifications.new_price, PendingNotifications.updated_at)
+            .where(PendingNotifications.chat_id.in_(chat_ids))
+        )
+        with db_session() as session:
+            return session.execute(query).all()
+
+    @staticmethod
+    @database_operation
+    def delete_sent_notifications(notifications: list[Row]) -> int:
+        """Удаляет отправленные изменения. Строки, обновленные после чтения, остаются до следующей сводки"""
+        if not notifications:
+            return 0
+        statement = (
+            delete(PendingNotifications)
+            .where(tuple_(PendingNotifications.id, PendingNotifications.updated_at)
+                   .in_([(notification.id, notification.updated_at) for notification in notifications]))
+            .execution_options(synchronize_session=False)
+        )
+        with db_session() as session:
+            result = session.execute(statement)
+            session.commit()
+            return result.rowcount
+
+
 # with db_session() as session:
 #
 #     user_product = session.get(UserProducts, 55)
@@ -1,7 +1,8 @@
 import datetime
 from typing import Annotated
 
-from sqlalchemy import Column, Integer, String, Boolean, Float, ForeignKey, DateTime, func, BigInteger, text
+from sqlalchemy import Column, Integer, String, Boolean, Float, ForeignKey, DateTime, func, BigInteger, text, \
+    UniqueConstraint, Index
 from sqlalchemy.ext.asyncio import AsyncAttrs
 from sqlalchemy.ext.declarative import declarative_base, declared_attr
 from sqlalchemy.orm import relationship, DeclarativeBase, mapped_column, Mapped
@@ -27,22 +28,29 @@ class Users(Base, TimestampMixin):
     __tablename__ = 'users'
 
     telegram_id: Mapped[int] = mapped_column(unique=True)
+    # только server_default: INSERT внутри CTE не подставляет default на стороне Python и передал бы NULL
+    digest_mode: Mapped[str] = mapped_column(String(16), server_default='immediate')
 
     users_product: Mapped[list['UserProducts']] = relationship()
 
 
 class Products(Base, TimestampMixin):
     __tablename__ = 'products'
+    __table_args__ = (Index('ix_products_marketplace_article_id', 'marketplace', 'article_id', unique=True),)
 
     product_name: Mapped[str] = mapped_column(String(256))
     url: Mapped[str] = mapped_column(String(512), unique=True)
     last_price: Mapped[int]
+    marketplace: Mapped[str | None] = mapped_column(String(64))  # товар определяется маркетплейсом и артикулом,
+    article_id: Mapped[str | None] = mapped_column(String(256))  # а не текстом ссылки
 
     user_product: Mapped[list['UserProducts']] = relationship()
 
 
 class UserProducts(Base, TimestampMixin):
     __tablename__ = 'user_products'
+    __table_args__ = (Index('uq_user_products_user_product', 'user', 'product', unique=True),
+                      Index('ix_user_products_product', 'product'))
 
     user: Mapped[int] = mapped_column(ForeignKey('users.id', ondelete='CASCADE'))
     product: Mapped[int] = mapped_column(ForeignKey('products.id', ondelete='CASCADE'))
@@ -53,3 +61,67 @@ class UserProducts(Base, TimestampMixin):
     users: Mapped['Users'] = relationship(back_populates='users_product')
     products: Mapped['Products'] = relationship(back_populates='user_product')
 
+
+class SelectorStats(Base, TimestampMixin):
+    __tablename__ = 'selector_stats'
+    __table_args__ = (UniqueConstraint('marketplace', 'kind', 'selector'),)
+
+    marketplace: Mapped[str] = mapped_column(String(128))
+    kind: Mapped[str] = mapped_column(String(16))
+    selector: Mapped[str] = mapped_column(String(256))
+    hits: Mapped[int] = mapped_column(default=0)
+    misses: Mapped[int] = mapped_column(default=0)
+    score: Mapped[float] = mapped_column(default=0)
+    is_learned: Mapped[bool] = mapped_column(default=False)
+    last_success_at: Mapped[datetime.datetime | None]
+
+
+class PriceObservations(Base):
+    """История цен: строка добавляется только если цена изменилась с прошлого наблюдения"""
+    __tablename__ = 'price_observations'
+    __table_args__ = (Index('ix_price_observations_product_id_observed_at', 'product_id', 'observed_at'),)
+
+    id: Mapped[intpk]
+    product_id: Mapped[int] = mapped_column(ForeignKey('products.id', ondelete='CASCADE'))
+    price: Mapped[int]
+    observed_at: Mapped[created_at]
+
+
+class PriceRollups(Base):
+    """Дневные агрегаты старых наблюдений из price_observations"""
+    __tablename__ = 'price_rollups'
+
+    product_id: Mapped[int] = mapped_column(ForeignKey('products.id', ondelete='CASCADE'), primary_key=True)
+    period_start: Mapped[datetime.datetime] = mapped_column(primary_key=True)
+    min_price: Mapped[int]
+    max_price: Mapped[int]
+    avg_price: Mapped[float]
+    observations: Mapped[int]
+
+
+class ProductSchedule(Base):
+    """Когда и с каким приоритетом проверять цену товара"""
+    __tablename__ = 'product_schedule'
+    __table_args__ = (Index('ix_product_schedule_next_check_at', 'next_check_at'),)
+
+    product_id: Mapped[int] = mapped_column(ForeignKey('products.id', ondelete='CASCADE'), primary_key=True)
+    next_check_at: Mapped[created_at]
+    priority: Mapped[float] = mapped_column(default=0, server_default=text('0'))
+    volatility: Mapped[float] = mapped_column(default=0, server_default=text('0'))
+    consecutive_failures: Mapped[int] = mapped_column(default=0, server_default=text('0'))
+    last_checked_at: Mapped[datetime.datetime | None]
+    leased_until: Mapped[datetime.datetime | None]  # до этого времени товар проверяет воркер leased_by
+    leased_by: Mapped[str | None] = mapped_column(String(128))
+
+
+class PendingNotifications(Base, TimestampMixin):
+    """Изменения цен, ожидающие отправки сводкой: одна строка на чат и товар"""
+    __tablename__ = 'pending_notifications'
+    __table_args__ = (UniqueConstraint('chat_id', 'product_id'),)
+
+    chat_id: Mapped[int] = mapped_column(BigInteger)
+    product_id: Mapped[int] = mapped_column(ForeignKey('products.id', ondelete='CASCADE'))
+    product_name: Mapped[str] = mapped_column(String(256))
+    product_url: Mapped[str] = mapped_column(String(512))
+    old_price: Mapped[int]  # цена до первого изменения с прошлой сводки
+    new_price: Mapped[int]
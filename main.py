@@ -28,4 +28,3 @@ if __name__ == '__main__':
 # TODO тесты входных данных
 # TODO почистить requiremrntsd=
 # TODO раз в 4 минуты заходить на любой сайт, если не заходил на другие
-# TODO при каждом новом вызове создавался новый драйвер
@@ -1,8 +1,6 @@
-import asyncio
-
 from config.logger import setup_logger
-from db.crud_operations import ProductsCRUD
-from src.notifications.utils import send_message_price_changed
+from src.notifications.digest import digest_buffer
+from src.notifications.dispatcher import notification_dispatcher
 
 logger = setup_logger(__name__)
 
@@ -11,7 +9,9 @@ class PriceComparer:
     @classmethod
     def compare_prices_and_notify_user(cls, is_any_change: bool, threshold_price: int,
                                        product_last_price: int, product_new_price: int, product_id: int,
-                                       chat_id: int, product_url: str, product_name: str):
+                                       chat_id: int, product_url: str, product_name: str,
+                                       digest_mode: str = 'immediate') -> int | None:
+        """Уведомляет пользователя и возвращает цену, которую нужно записать в БД, иначе - None"""
         cls._validate_is_any_change(is_any_change)
         threshold_price = int(threshold_price)
         product_last_price = int(product_last_price)
@@ -30,17 +30,19 @@ class PriceComparer:
         cls._notify_user(product_last_price=product_last_price,
                          product_new_price=product_new_price,
                          chat_id=chat_id,
+                         product_id=product_id,
                          product_url=product_url,
-                         product_name=product_name)
+                         product_name=product_name,
+                         digest_mode=digest_mode)
 
         if is_any_change:
             logger.debug("Цена изменилась!")
-            ProductsCRUD.set_new_product_price(product_id=product_id, new_price=product_new_price)
+            return product_new_price
 
         elif product_new_price <= threshold_price:
             logger.info("Цена достигла нужного занчения!")
-            ProductsCRUD.set_new_product_price(product_id=product_id, new_price=product_new_price)
             # удалить эту напоминалку
+            return product_new_price
 
     @classmethod
     def _compare(cls, new_price: int, product_last_price: int) -> bool:
@@ -75,23 +77,22 @@ class PriceComparer:
     def _notify_user(cls, product_last_price,
                      product_new_price,
                      chat_id,
+                     product_id,
                      product_url,
-                     product_name):
-        loop = asyncio.get_event_loop()
-        loop.run_until_complete(
-            cls._notify_user_async(product_last_price, product_new_price, chat_id, product_url, product_name))
+                     product_name,
+                     digest_mode='immediate'):
+        """Ставит уведомление в очередь, отправкой занимается notification_dispatcher.
+        Пользователям в режиме сводки изменение откладывается до ближайшей сводки"""
+        if digest_mode != 'immediate':
+            digest_buffer.add(chat_id=chat_id, product_id=product_id, product_name=product_name,
+                              product_url=product_url, old_price=product_last_price, new_price=product_new_price)
+            return
 
-    @classmethod
-    async def _notify_user_async(cls, product_last_price,
-                                 product_new_price,
-                                 chat_id,
-                                 product_url,
-                                 product_name):
         message_text = cls._prepare_message_text(product_name=product_name,
                                                  product_url=product_url,
                                                  old_price=product_last_price,
                                                  new_price=product_new_price)
-        await send_message_price_changed(chat_id=chat_id, message_text=message_text)
+        notification_dispatcher.enqueue(chat_id=chat_id, text=message_text)
 
     @classmethod
     def _validate_is_any_change(cls, value):
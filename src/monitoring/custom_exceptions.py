@@ -3,4 +3,15 @@ class ProductNotFound(Exception):
 
 
 class InvalidMessageWithUrl(Exception):
-    """Ошибка при извлечении домена или ссылки из сообщения пользователя"""
\ No newline at end of file
+    """Ошибка при извлечении домена или ссылки из сообщения пользователя"""
+
+
+class PageNotLoaded(ProductNotFound):
+    """Страница не загрузилась или показала заглушку защиты от ботов: на ней нет ни цены, ни названия"""
+
+
+class DomainUnavailable(Exception):
+    """Проверка пропущена нами самими: сработал предохранитель или очередь запросов к маркетплейсу слишком длинная.
+
+    Это не ошибка товара, поэтому она не увеличивает число неудачных проверок подряд.
+    """
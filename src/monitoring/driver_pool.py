@@ -0,0 +1,208 @@
+import atexit
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Callable
+
+from selenium import webdriver
+from selenium.common import WebDriverException
+from selenium.webdriver.remote.webdriver import WebDriver
+
+from config.logger import setup_logger
+from config.selenium_config import options, add_script, SELENIUM_REMOTE_URL, DRIVER_POOL_MAX_SIZE, \
+    DRIVER_POOL_IDLE_TIMEOUT, DRIVER_POOL_MAX_PAGE_LOADS, DRIVER_POOL_LEASE_TIMEOUT, PAGE_LOAD_TIMEOUT
+
+
+logger = setup_logger(__name__)
+
+
+class DriverPoolExhausted(WebDriverException):
+    """Не удалось получить свободный драйвер из пула за отведенное время"""
+
+
+def create_driver() -> WebDriver:
+    driver_sel = webdriver.Remote(
+        command_executor=SELENIUM_REMOTE_URL,
+        options=options
+    )
+
+    driver_sel.maximize_window()
+    driver_sel.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
+    driver_sel.set_page_load_timeout(PAGE_LOAD_TIMEOUT)
+
+    add_script(driver_sel,
+               '''
+                      delete window.cdc_adoQpoasnfa76pfcZLmcfl_Array;
+                      delete window.cdc_adoQpoasnfa76pfcZLmcfl_Promise;
+                      delete window.cdc_adoQpoasnfa76pfcZLmcfl_Symbol;
+                      delete window.cdc_adoQpoasnfa76pfcZLmcfl_JSON;
+                      delete window.cdc_adoQpoasnfa76pfcZLmcfl_Proxy;
+                      delete window.cdc_adoQpoasnfa76pfcZLmcfl_Object;
+                '''
+               )
+    return driver_sel
+
+
+class PooledDriver:
+    def __init__(self, driver: WebDriver):
+        self.driver = driver
+        self.page_loads = 0
+        self.last_used = time.monotonic()
+
+
+class WebDriverPool:
+    """Ограниченный пул прогретых сессий Selenium.
+
+    Каждая аренда драйвера считается одной загрузкой страницы: после max_page_loads
+    загрузок сессия пересоздается, простаивающие дольше idle_timeout сессии закрываются,
+    а упавшие сессии заменяются новыми при следующей аренде.
+    """
+
+    def __init__(self, driver_factory: Callable[[], WebDriver] = create_driver,
+                 max_size: int = DRIVER_POOL_MAX_SIZE,
+                 idle_timeout: float = DRIVER_POOL_IDLE_TIMEOUT,
+                 max_page_loads: int = DRIVER_POOL_MAX_PAGE_LOADS,
+                 lease_timeout: float = DRIVER_POOL_LEASE_TIMEOUT):
+        if max_size < 1:
+            raise ValueError('max_size должен быть больше нуля')
+
+        self.driver_factory = driver_factory
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.max_page_loads = max_page_loads
+        self.lease_timeout = lease_timeout
+
+        self._idle: deque[PooledDriver] = deque()
+        self._size = 0
+        self._condition = threading.Condition()
+
+    @property
+    def size(self) -> int:
+        return self._size
+
+    @property
+    def idle_count(self) -> int:
+        return len(self._idle)
+
+    @contextmanager
+    def lease(self):
+        pooled = self._acquire()
+        is_broken = False
+        try:
+            yield pooled.driver
+        except WebDriverException:
+            is_broken = True
+            raise
+        finally:
+            self._release(pooled, is_broken)
+
+    def evict_idle(self):
+        expired = []
+        with self._condition:
+            now = time.monotonic()
+            while self._idle and now - self._idle[0].last_used > self.idle_timeout:
+                expired.append(self._idle.popleft())
+                self._size -= 1
+            if expired:
+                self._condition.notify(len(expired))
+
+        for pooled in expired:
+            logger.debug('Закрыт простаивающий драйвер')
+            self._quit(pooled)
+
+    def close_all(self):
+        with self._condition:
+            idle = list(self._idle)
+            self._idle.clear()
+            self._size -= len(idle)
+            self._condition.notify_all()
+
+        for pooled in idle:
+            self._quit(pooled)
+
+    def _acquire(self) -> PooledDriver:
+        self.evict_idle()
+        deadline = time.monotonic() + self.lease_timeout
+
+        while True:
+            with self._condition:
+                while not self._idle and self._size >= self.max_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise DriverPoolExhausted(f'Нет свободных драйверов в пуле ({self.max_size})')
+                    self._condition.wait(remaining)
+
+                if self._idle:
+                    pooled = self._idle.pop()
+                else:
+                    pooled = None
+                    self._size += 1
+
+            if pooled is None:
+                return self._create()
+
+            if self._is_alive(pooled):
+                return pooled
+
+            logger.warning('Драйвер из пула не отвечает, создаем новый')
+            self._discard(pooled)
+
+    def _create(self) -> PooledDriver:
+        try:
+            return PooledDriver(self.driver_factory())
+        except Exception:
+            with self._condition:
+                self._size -= 1
+                self._condition.notify()
+            raise
+
+    def _release(self, pooled: PooledDriver, is_broken: bool):
+        pooled.page_loads += 1
+        pooled.last_used = time.monotonic()
+
+        if is_broken or pooled.page_loads >= self.max_page_loads:
+            self._discard(pooled)
+            return
+
+        with self._condition:
+            self._idle.append(pooled)
+            self._condition.notify()
+
+    def _discard(self, pooled: PooledDriver):
+        with self._condition:
+            self._size -= 1
+            self._condition.notify()
+        self._quit(pooled)
+
+    @staticmethod
+    def _is_alive(pooled: PooledDriver) -> bool:
+        try:
+            pooled.driver.current_url
+            return True
+        except WebDriverException:
+            return False
+
+    @staticmethod
+    def _quit(pooled: PooledDriver):
+        try:
+            pooled.driver.quit()
+        except WebDriverException as ex:
+            logger.debug(f'Ошибка при закрытии драйвера: {ex}')
+
+
+driver_pool = WebDriverPool()
+atexit.register(driver_pool.close_all)
+
+
+@contextmanager
+def driver_context():
+    is_leased = False
+    try:
+        with driver_pool.lease() as driver:
+            is_leased = True
+            yield driver
+    except WebDriverException as ex:
+        if not is_leased:
+            raise
+        logger.warning(f'Ошибка драйвера: {ex}')
@@ -0,0 +1,41 @@
+import threading
+from collections import defaultdict
+
+from config.logger import setup_logger
+
+
+logger = setup_logger(__name__)
+
+
+class Metrics:
+    """Потокобезопасные счетчики процесса: обходы, аренды товаров и т.п."""
+
+    def __init__(self):
+        self._counters: dict[str, float] = defaultdict(float)
+        self._lock = threading.Lock()
+
+    def increment(self, name: str, value: float = 1):
+        with self._lock:
+            self._counters[name] += value
+
+    def get(self, name: str) -> float:
+        with self._lock:
+            return self._counters.get(name, 0)
+
+    def snapshot(self) -> dict[str, float]:
+        with self._lock:
+            return dict(self._counters)
+
+    def log(self):
+        """Пишет накопленные счетчики процесса в лог, другого вывода у них нет"""
+        snapshot = self.snapshot()
+        if snapshot:
+            counters = ', '.join(f'{name}={value:g}' for name, value in sorted(snapshot.items()))
+            logger.info(f'Метрики процесса: {counters}')
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+
+
+metrics = Metrics()
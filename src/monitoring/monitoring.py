@@ -1,132 +1,235 @@
 import datetime
-from contextlib import contextmanager
+import os
+import socket
+import time
+import uuid
+from itertools import groupby
+from operator import attrgetter
+from typing import Iterable, Iterator
 
-from selenium import webdriver
-from selenium.common import WebDriverException
 from selenium.webdriver.remote.webdriver import WebDriver
 
+from config.config import SWEEP_WRITE_CHUNK_SIZE, SWEEP_READ_CHUNK_SIZE, SCHEDULE_TICK_LIMIT, SCHEDULE_LEASE_TIMEOUT, \
+    NOTIFICATIONS_FLUSH_TIMEOUT
 from config.logger import setup_logger
-from config.selenium_config import options, add_script
-from db.crud_operations import UserProductsCRUD, ProductsCRUD
+from db.crud_operations import UserProductsCRUD, ProductsCRUD, PriceObservationsCRUD, MonitoredSubscription, \
+    ProductScheduleCRUD, ScheduledCheck
 from db.models import UserProducts, Users, Products
 from src.monitoring.comparer import PriceComparer
-from src.monitoring.custom_exceptions import ProductNotFound
-from src.monitoring.services.utils import choose_parser_class, find_url_in_text
+from src.monitoring.custom_exceptions import ProductNotFound, DomainUnavailable
+from src.monitoring.driver_pool import driver_context
+from src.monitoring.metrics import metrics
+from src.monitoring.parsers.selector_registry import selector_registry
+from src.monitoring.result_cache import result_cache
+from src.monitoring.scheduler import plan_after_success, plan_after_failure, plan_after_skip
+from src.monitoring.services.utils import choose_parser_class, find_url_in_text, get_marketplace
+from src.monitoring.sweep import ParallelSweep
+from src.monitoring.throttling import throttled
+from src.notifications.digest import digest_buffer
+from src.notifications.dispatcher import notification_dispatcher
 from src.notifications.utils import send_message_price_changed
 
 logger = setup_logger(__name__)
 
 
-# class WebDriverManager:
-#     _instance = None
-#
-#     def __new__(cls):
-#         if cls._instance is None:
-#             cls._instance = super(WebDriverManager, cls).__new__(cls)
-#             cls._instance._driver = None
-#         return cls._instance
-#
-#     @property
-#     def driver(self):
-#         if self._driver is None:
-#             self._driver = webdriver.Remote(
-#                 command_executor='http://172.19.0.3:4444/wd/hub',
-#                 options=options
-#             )
-#             self._driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
-#             self.add_script(self._driver,
-#                             '''
-#                                   delete window.cdc_adoQpoasnfa76pfcZLmcfl_Array;
-#                                   delete window.cdc_adoQpoasnfa76pfcZLmcfl_Promise;
-#                                   delete window.cdc_adoQpoasnfa76pfcZLmcfl_Symbol;
-#                                   delete window.cdc_adoQpoasnfa76pfcZLmcfl_JSON;
-#                                   delete window.cdc_adoQpoasnfa76pfcZLmcfl_Proxy;
-#                                   delete window.cdc_adoQpoasnfa76pfcZLmcfl_Object;
-#                             '''
-#                             )
-#         return self._driver
-#
-#     def add_script(self, driver, script):
-#         # Добавьте вашу реализацию функции add_script
-#         pass
-#
-#     @staticmethod
-#     @contextmanager
-#     def driver_context():
-#         try:
-#             yield WebDriverManager()._instance.driver
-#         except WebDriverException:
-#             WebDriverManager()._instance.driver.close()
-#         finally:
-#             WebDriverManager()._instance.driver.close()
-#             ...   # Ничего не делаем здесь, чтобы сохранить драйвер открытым
-#
+def start_monitoring():
+    """Проверяет в этом процессе товары, время проверки которых наступило и которые удалось закрепить за собой"""
+    ProductScheduleCRUD.add_missing_schedules()
+    lease_id = get_lease_id()
+    product_ids = list(claim_due_products(lease_id))
+    summaries = [check_products(renew_leases(product_ids[start:start + SWEEP_WRITE_CHUNK_SIZE], lease_id),
+                                lease_id)
+                 for start in range(0, len(product_ids), SWEEP_WRITE_CHUNK_SIZE)]
+    summarize_sweep(summaries)
+
+
+def claim_due_products(lease_id: str) -> dict[int, str]:
+    """Арендует наступившие проверки, чтобы параллельные обходы не проверяли один товар дважды"""
+    contended = ProductScheduleCRUD.count_leased_due_products() or 0
+    due_products = ProductScheduleCRUD.claim_due_products(limit=SCHEDULE_TICK_LIMIT,
+                                                          worker_id=lease_id,
+                                                          lease_timeout=SCHEDULE_LEASE_TIMEOUT) or {}
+    metrics.increment('schedule.claims')
+    metrics.increment('schedule.claimed_products', len(due_products))
+    metrics.increment('schedule.contended_products', contended)
+    if contended:
+        logger.info(f'Закреплено товаров: {len(due_products)}, уже проверяются другими воркерами: {contended}')
+    return due_products
+
+
+def renew_leases(product_ids: list[int], lease_id: str) -> list[int]:
+    """Продлевает аренду перед проверкой порции: порция могла долго ждать в очереди.
+
+    Товары, аренда которых за это время истекла и досталась другому тику, пропускаются.
+    """
+    renewed = ProductScheduleCRUD.renew_leases(product_ids, worker_id=lease_id,
+                                               lease_timeout=SCHEDULE_LEASE_TIMEOUT) or []
+    lost = len(product_ids) - len(renewed)
+    if lost:
+        metrics.increment('schedule.lost_leases', lost)
+        logger.info(f'Аренда {lost} товаров из {len(product_ids)} перешла к другому обходу, пропускаем их')
+    return renewed
+
+
+def release_leases(product_ids: list[int], lease_id: str):
+    ProductScheduleCRUD.release_leases(product_ids, worker_id=lease_id)
+
+
+def get_worker_id() -> str:
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+def get_lease_id() -> str:
+    """Своя аренда на каждый тик: иначе следующий тик того же процесса продлил бы чужую аренду"""
+    return f'{get_worker_id()}:{uuid.uuid4().hex[:8]}'
+
+
+def split_by_marketplace(due_products: dict[int, str], chunk_size: int) -> list[tuple[str, list[int]]]:
+    """Делит товары на порции не больше chunk_size, в каждой порции товары одного маркетплейса"""
+    product_ids_by_marketplace: dict[str, list[int]] = {}
+    for product_id, url in due_products.items():
+        product_ids_by_marketplace.setdefault(get_marketplace(url), []).append(product_id)
+
+    return [(marketplace, product_ids[start:start + chunk_size])
+            for marketplace, product_ids in product_ids_by_marketplace.items()
+            for start in range(0, len(product_ids), chunk_size)]
+
+
+def check_products(product_ids: list[int], lease_id: str) -> dict:
+    """Проверяет цены товаров порции, записывает результаты в БД и уведомляет подписчиков.
+
+    Результаты записываются до ожидания отправки уведомлений, поэтому не зависят
+    от других порций обхода. Возвращает сводку порции для summarize_sweep.
+    """
+    subscriptions = UserProductsCRUD.iter_subscriptions_for_monitoring(chunk_size=SWEEP_READ_CHUNK_SIZE,
+                                                                       product_ids=product_ids)
+    sweep = ParallelSweep()
+    new_prices: dict[int, int] = {}
+    observed_prices: dict[int, int] = {}
+    checks: list[ScheduledCheck] = []
+    failed = 0
+    skipped = 0
+    started_at = time.monotonic()
+
+    for subscriptions_by_product in group_by_product(subscriptions, chunk_size=SWEEP_READ_CHUNK_SIZE):
+        results = sweep.run(subscriptions_by_product,
+                            get_url=lambda product_subscriptions: product_subscriptions[0].url,
+                            fetch=lambda product_subscriptions: fetch_cached(product_subscriptions[0].url))
+
+        for product_subscriptions, result, error in results:
+            now = datetime.datetime.utcnow()
+            if isinstance(error, DomainUnavailable):
+                checks.append(plan_after_skip(product_subscriptions, now))
+                skipped += 1
+                continue
+            if error is not None:
+                logger.warning(f'{error} {product_subscriptions[0].url}')
+                checks.append(plan_after_failure(product_subscriptions, now))
+                failed += 1
+                continue
+            product_price, product_name = result
+            observed_prices[product_subscriptions[0].product_id] = product_price
+            checks.append(plan_after_success(product_subscriptions, product_price, now))
+            for subscription in product_subscriptions:
+                new_price = compare_and_notify(subscription, product_price, product_name)
+                if new_price is not None:
+                    new_prices[subscription.product_id] = new_price
+
+    save_check_results(new_prices, observed_prices, checks, lease_id)
+    selector_registry.flush()
+    digest_buffer.flush()
+    if not notification_dispatcher.flush(timeout=NOTIFICATIONS_FLUSH_TIMEOUT):
+        logger.warning('Не все уведомления отправлены до конца проверки порции')
+    return {'processed': len(checks),
+            'failed': failed,
+            'skipped': skipped,
+            'new_prices': len(new_prices),
+            'wall_time': time.monotonic() - started_at}
+
+
+def save_check_results(new_prices: dict[int, int], observed_prices: dict[int, int], checks: list[ScheduledCheck],
+                       lease_id: str):
+    """Записывает результаты порции тремя массовыми запросами"""
+    if new_prices:
+        written = ProductsCRUD.set_new_product_prices(new_prices)
+        logger.info(f'Записано новых цен: {written} из {len(new_prices)}')
+    if observed_prices:
+        written = PriceObservationsCRUD.add_observations(observed_prices)
+        logger.info(f'Записано изменений в историю цен: {written} из {len(observed_prices)}')
+    if checks:
+        ProductScheduleCRUD.save_checks(checks, worker_id=lease_id)
+
+
+def summarize_sweep(summaries: list[dict]) -> dict:
+    """Складывает сводки порций обхода в одну и пишет ее в лог и метрики"""
+    summary = {'chunks': len(summaries),
+               'processed': sum(chunk['processed'] for chunk in summaries),
+               'failed': sum(chunk['failed'] for chunk in summaries),
+               'skipped': sum(chunk['skipped'] for chunk in summaries),
+               'new_prices': sum(chunk['new_prices'] for chunk in summaries),
+               'wall_time': max((chunk['wall_time'] for chunk in summaries), default=0)}
+    metrics.increment('sweep.processed', summary['processed'])
+    metrics.increment('sweep.failed', summary['failed'])
+    metrics.increment('sweep.skipped', summary['skipped'])
+    logger.info(f'Итог обхода: порций {summary["chunks"]}, товаров {summary["processed"]} '
+                f'({summary["failed"]} с ошибкой, {summary["skipped"]} отложено), новых цен {summary["new_prices"]}, '
+                f'самая долгая порция {summary["wall_time"]:.1f} с')
+    metrics.log()
+    return summary
+
+
+def group_by_product(subscriptions: Iterable[MonitoredSubscription],
+                     chunk_size: int) -> Iterator[list[list[MonitoredSubscription]]]:
+    """Собирает упорядоченные по товару подписки в порции примерно по chunk_size подписок.
+
+    Подписки одного товара не разрываются между порциями, поэтому страница каждого
+    товара загружается один раз за обход.
+    """
+    chunk: list[list[MonitoredSubscription]] = []
+    chunk_rows = 0
+    for _, product_subscriptions in groupby(subscriptions, key=attrgetter('product_id')):
+        product_subscriptions = list(product_subscriptions)
+        chunk.append(product_subscriptions)
+        chunk_rows += len(product_subscriptions)
+        if chunk_rows >= chunk_size:
+            yield chunk
+            chunk = []
+            chunk_rows = 0
+    if chunk:
+        yield chunk
+
+
+def fetch_product_price_and_name(url: str) -> tuple[int, str]:
+    parser_class = choose_parser_class(url)
+    if not parser_class.requires_browser:
+        return parser_class(driver=None, product_url=url).get_product_price_and_name()
 
-@contextmanager
-def driver_context():
-    # driver_sel = webdriver.Chrome(options=options)
-
-    driver_sel = webdriver.Remote(
-        command_executor='http://172.19.0.3:4444/wd/hub',
-        options=options
-    )
-
-    driver_sel.maximize_window()
-    driver_sel.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
-    driver_sel.set_page_load_timeout(8)
-
-    add_script(driver_sel,
-               '''
-                      delete window.cdc_adoQpoasnfa76pfcZLmcfl_Array;
-                      delete window.cdc_adoQpoasnfa76pfcZLmcfl_Promise;
-                      delete window.cdc_adoQpoasnfa76pfcZLmcfl_Symbol;
-                      delete window.cdc_adoQpoasnfa76pfcZLmcfl_JSON;
-                      delete window.cdc_adoQpoasnfa76pfcZLmcfl_Proxy;
-                      delete window.cdc_adoQpoasnfa76pfcZLmcfl_Object;
-                '''
-               )
-    driver_cont = driver_sel
-
-    try:
-        yield driver_cont
-    except WebDriverException:
-        driver_cont.close()
-    # except Exception as ex:
-    #     logger.debug(f'AAAA {ex}')
-    finally:
-        driver_cont.quit()
+    with driver_context() as driver:
+        parser = parser_class(driver=driver, product_url=url)
+        return parser.get_product_price_and_name()
+    raise ProductNotFound('Ошибка драйвера при загрузке страницы')
 
 
-def start_monitoring():
-    products_to_monitoring = UserProductsCRUD.get_user_products_for_monitoring()
-    logger.debug(f'DLInA: {len(products_to_monitoring)}')
-    for x in products_to_monitoring:
-        logger.debug(x)
-    if products_to_monitoring is None:
-        return
+def fetch_cached(url: str) -> tuple[int, str]:
+    """Загрузка для обхода: свежий результат из кэша или одна загрузка на товар для всех процессов"""
+    return result_cache.get_or_fetch(url, lambda: fetch_throttled(url))
 
-    with driver_context() as driver:
-        for user_product in products_to_monitoring:
-            parse_and_compare(driver, user_product)
 
+def fetch_throttled(url: str) -> tuple[int, str]:
+    """Загрузка для обхода: с лимитом запросов и предохранителем маркетплейса"""
+    return throttled(get_marketplace(url), lambda: fetch_product_price_and_name(url))
 
-def parse_and_compare(driver: WebDriver, user_product: UserProducts):
-    parser_class = choose_parser_class(user_product.products.url)
-    parser = parser_class(driver=driver, product_url=user_product.products.url)
-    try:
-        product_price, product_name = parser.get_product_price_and_name()
 
-        PriceComparer.compare_prices_and_notify_user(product_last_price=user_product.products.last_price,
-                                                     is_any_change=user_product.is_any_change,
-                                                     threshold_price=user_product.threshold_price,
-                                                     product_id=user_product.products.id,
-                                                     product_new_price=product_price,
-                                                     product_name=product_name,
-                                                     chat_id=user_product.users.telegram_id,
-                                                     product_url=user_product.products.url)
-        logger.debug(f'PRICE: {product_price}')
-    except ProductNotFound as ex:
-        logger.warning(f'{ex} {user_product.products.url}')
+def compare_and_notify(subscription: MonitoredSubscription, product_price: int, product_name: str) -> int | None:
+    return PriceComparer.compare_prices_and_notify_user(product_last_price=subscription.last_price,
+                                                        is_any_change=subscription.is_any_change,
+                                                        threshold_price=subscription.threshold_price,
+                                                        product_id=subscription.product_id,
+                                                        product_new_price=product_price,
+                                                        product_name=product_name,
+                                                        chat_id=subscription.telegram_id,
+                                                        product_url=subscription.url,
+                                                        digest_mode=subscription.digest_mode)
 
 
 # def add_new_product(url: str, telegram_id: int):
@@ -137,8 +240,4 @@ def parse_and_compare(driver: WebDriver, user_product: UserProducts):
 
 
 def get_product_price_and_name_from_handlers(url: str) -> tuple[int, str]:
-    with driver_context() as driver:
-        parser_class = choose_parser_class(url)
-        parser = parser_class(driver=driver, product_url=url)
-        product_price, product_name = parser.get_product_price_and_name()
-        return product_price, product_name
+    return result_cache.get_or_fetch(url, lambda: fetch_product_price_and_name(url))
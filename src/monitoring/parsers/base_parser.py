@@ -2,63 +2,145 @@ import datetime
 import random
 import time
 from abc import ABC
+from contextlib import contextmanager
+from urllib.parse import urlparse
 
-from selenium.common import NoSuchElementException, TimeoutException
-from selenium.webdriver.common.by import By
+from selenium.common import TimeoutException
 from selenium.webdriver.remote.webdriver import WebDriver
+from selenium.webdriver.support.wait import WebDriverWait
 
 from config.logger import setup_logger
-from src.monitoring.custom_exceptions import ProductNotFound
+from config.selenium_config import PAGE_WAIT_TIMEOUT, ANTI_BOT_JITTER, block_resources
+from src.monitoring.custom_exceptions import ProductNotFound, PageNotLoaded
+from src.monitoring.driver_pool import driver_context
+from src.monitoring.parsers.selector_registry import selector_registry
 
 
 logger = setup_logger(__name__)
 
 
+FIND_PRODUCT_SCRIPT = '''
+    const [priceSelectors, nameSelectors] = arguments;
+    function findFirst(selectors) {
+        for (let index = 0; index < selectors.length; index++) {
+            let element = null;
+            try {
+                element = document.querySelector(selectors[index]);
+            } catch (e) {
+                continue;
+            }
+            if (element && element.innerText && element.innerText.trim()) {
+                return [index, element.innerText];
+            }
+        }
+        return null;
+    }
+    return {price: findFirst(priceSelectors), name: findFirst(nameSelectors)};
+'''
+
+
 class BaseParser(ABC):
+    requires_browser = True
+    wait_timeout = PAGE_WAIT_TIMEOUT  # предельное время ожидания цены и названия на странице
+    jitter = ANTI_BOT_JITTER  # случайная пауза после загрузки, чтобы не выглядеть как бот
 
     # продумать классы для скидок. как будет осущ выбор
 
-    def __init__(self, driver: WebDriver, product_url: str):
+    def __init__(self, driver: WebDriver | None, product_url: str):
         self.driver = driver
         self.product_url = product_url
         # self.product_name_classes = []
         # self.product_price_classes = []
 
-    def get_product_price_and_name(self, min_time_wait: int = 4, max_time_wait: int = 7) -> tuple[int, str]:
+    def get_product_price_and_name(self) -> tuple[int, str]:
+        block_resources(self.driver, self.marketplace)
         try:
             self.driver.get(url=self.product_url)
         except TimeoutException:
             pass
 
-        time.sleep(random.randint(min_time_wait, max_time_wait))
-        product_price = self._extract_product_price()
-        product_name = self._extract_product_name()
-
+        price_selectors = selector_registry.order(self.marketplace, 'price', self.product_price_classes)
+        name_selectors = selector_registry.order(self.marketplace, 'name', self.product_name_classes)
+        found = self._wait_for_product(price_selectors, name_selectors)
+        self._sleep_jitter()
+
+        for kind, selectors in (('price', price_selectors), ('name', name_selectors)):
+            selector_registry.record(self.marketplace, kind, selectors, found[kind][0] if found[kind] else None)
+
+        if not found['price'] and not found['name']:
+            logger.info(f'Страница товара не загрузилась {self.product_url}')
+            raise PageNotLoaded(f'Страница не загрузилась или заблокирована!')
+        if not found['price']:
+            logger.info(f'Не определена цена товара!')
+            raise ProductNotFound(f'Не определена цена товара!')
+        if not found['name']:
+            logger.info(f'Не определено наименование товара!')
+            raise ProductNotFound(f'Не определено наименование товара!')
+
+        string_price = found['price'][1]
+        product_name = found['name'][1]
+        product_price = self._parse_price_to_int(string_price)
         if not product_price or not product_name:
             raise ProductNotFound('Exception in get product price and name!')
 
         return product_price, product_name
 
-    def _extract_product_price(self):
-        for class_name in self.product_price_classes:
-            try:
-                product_price = self.driver.find_element(By.CLASS_NAME, class_name)
-                string_price = product_price.get_attribute("innerText")
-                return self._parse_price_to_int(string_price)
-            except NoSuchElementException:
-                continue
-        logger.info(f'Не определена цена товара!')
-        raise ProductNotFound(f'Не определена цена товара!')
-
-    def _extract_product_name(self):
-        for class_name in self.product_name_classes:
+    @property
+    def marketplace(self) -> str:
+        return urlparse(self.product_url).netloc.removeprefix('www.')
+
+    def _wait_for_product(self, price_selectors: list[str], name_selectors: list[str]) -> dict:
+        """Ждет, пока на странице появятся цена и название, но не дольше wait_timeout.
+
+        Все селекторы проверяются одним вызовом execute_script: возвращается первый
+        сработавший селектор и текст элемента для цены и для названия.
+        """
+        price_css = [self._class_to_css(class_name) for class_name in price_selectors]
+        name_css = [self._class_to_css(class_name) for class_name in name_selectors]
+        found = {'price': None, 'name': None}
+
+        def resolve(driver):
+            result = driver.execute_script(FIND_PRODUCT_SCRIPT, price_css, name_css) or {}
+            for kind, selectors in (('price', price_selectors), ('name', name_selectors)):
+                if result.get(kind):
+                    index, text = result[kind]
+                    found[kind] = (selectors[index], text)
+            return found['price'] and found['name']
+
+        try:
+            WebDriverWait(self.driver, self.wait_timeout).until(resolve)
+        except TimeoutException:
+            logger.info(f'Не дождались цены и названия товара {self.product_url}')
+        return found
+
+    def _sleep_jitter(self):
+        min_jitter, max_jitter = self.jitter
+        if max_jitter > 0:
+            time.sleep(random.uniform(min_jitter, max_jitter))
+
+    @staticmethod
+    def _class_to_css(class_name: str) -> str:
+        """'l8o.ol8' -> '.l8o.ol8'. Классы, начинающиеся с цифры, экранируются по правилам CSS"""
+        selector = ''
+        for name in class_name.split('.'):
+            if name[:1].isdigit():
+                name = f'\\3{name[0]} {name[1:]}'
+            selector += f'.{name}'
+        return selector
+
+    @contextmanager
+    def _browser(self):
+        """Берет драйвер из пула, если парсер был создан без него"""
+        if self.driver is not None:
+            yield self.driver
+            return
+
+        with driver_context() as driver:
+            self.driver = driver
             try:
-                product_price = self.driver.find_element(By.CLASS_NAME, class_name)
-                return product_price.get_attribute("innerText")
-            except NoSuchElementException:
-                continue
-        logger.info(f'Не определено наименование товара!')
-        raise ProductNotFound(f'Не определено наименование товара!')
+                yield driver
+            finally:
+                self.driver = None
 
     def _parse_price_to_int(self, price_str: str, old_space: str = '\xa0') -> int:
         price_str = price_str.replace(old_space, ' ')
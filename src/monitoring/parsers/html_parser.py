@@ -0,0 +1,180 @@
+import json
+
+import lxml.html
+from lxml.html import HtmlElement
+from requests import RequestException
+
+from config.logger import setup_logger
+from config.selenium_config import HTTP_TIMEOUT
+from src.monitoring.custom_exceptions import ProductNotFound
+from src.monitoring.parsers.base_parser import BaseParser
+from src.monitoring.parsers.http_client import get_http_session
+from src.monitoring.services.product_key import get_product_key
+
+
+logger = setup_logger(__name__)
+
+
+class HtmlParser(BaseParser):
+    """Парсер страниц, цена на которых есть в HTML от сервера.
+
+    Ищет цену и название в JSON-LD разметке, во встроенном состоянии страницы
+    (__NEXT_DATA__ и подобных) и по классам product_price_classes / product_name_classes.
+    Если ничего не найдено, загружает страницу в браузере через родительский парсер.
+    """
+    requires_browser = False
+
+    state_script_ids = ['__NEXT_DATA__', '__NUXT_DATA__']
+    state_price_keys = ['finalPrice', 'price']
+    state_name_keys = ['name', 'title']
+    # товар страницы лежит по известному пути, иначе ищем его в состоянии по артикулу из ссылки
+    state_product_paths = [('props', 'pageProps', 'product')]
+    state_id_keys = ['id', 'sku', 'article', 'productId']
+
+    def get_product_price_and_name(self) -> tuple[int, str]:
+        try:
+            return self._get_product_price_and_name_from_html()
+        except (RequestException, ProductNotFound) as ex:
+            logger.info(f'Цена не найдена в HTML, загружаем страницу в браузере {self.product_url}: {ex}')
+
+        with self._browser():
+            return super().get_product_price_and_name()
+        raise ProductNotFound('Ошибка драйвера при загрузке страницы')
+
+    def _get_product_price_and_name_from_html(self) -> tuple[int, str]:
+        response = get_http_session().get(self.product_url, timeout=HTTP_TIMEOUT)
+        response.raise_for_status()
+        return self.parse_html(response.text)
+
+    def parse_html(self, html: str) -> tuple[int, str]:
+        tree = lxml.html.fromstring(html)
+        try:
+            product_price, product_name = self._extract_from_tree(tree)
+        except ValueError as ex:
+            raise ProductNotFound(f'Ошибка разбора цены в HTML: {ex}')
+
+        if not product_price or not product_name:
+            raise ProductNotFound('Не определена цена или наименование товара в HTML!')
+        return product_price, product_name
+
+    def _extract_from_tree(self, tree: HtmlElement) -> tuple[int | None, str | None]:
+        for extractor in (self._extract_from_json_ld, self._extract_from_state, self._extract_from_classes):
+            product_price, product_name = extractor(tree)
+            if product_price and product_name:
+                return product_price, product_name
+        return None, None
+
+    def _extract_from_json_ld(self, tree: HtmlElement) -> tuple[int | None, str | None]:
+        for script in tree.xpath('//script[@type="application/ld+json"]'):
+            for item in self._iter_json_ld_items(self._load_json(script.text)):
+                product_types = item.get('@type')
+                if 'Product' not in (product_types if isinstance(product_types, list) else [product_types]):
+                    continue
+
+                offers = item.get('offers') or {}
+                if isinstance(offers, list):
+                    offers = offers[0] if offers else {}
+                price = offers.get('price') or offers.get('lowPrice')
+                if price is not None and item.get('name'):
+                    return self._parse_state_price(price), item['name'].strip()
+        return None, None
+
+    def _extract_from_state(self, tree: HtmlElement) -> tuple[int | None, str | None]:
+        for script_id in self.state_script_ids:
+            for script in tree.xpath(f'//script[@id="{script_id}"]'):
+                product = self._find_product_in_state(self._load_json(script.text))
+                if product is not None:
+                    return product
+        return None, None
+
+    def _extract_from_classes(self, tree: HtmlElement) -> tuple[int | None, str | None]:
+        product_price = None
+        for class_name in self.product_price_classes:
+            element = self._find_by_class(tree, class_name)
+            if element is not None:
+                product_price = self._parse_price_to_int(element.text_content())
+                break
+
+        product_name = None
+        for class_name in self.product_name_classes:
+            element = self._find_by_class(tree, class_name)
+            if element is not None:
+                product_name = element.text_content().strip()
+                break
+        return product_price, product_name
+
+    def _find_product_in_state(self, state) -> tuple[int, str] | None:
+        for path in self.state_product_paths:
+            product = self._get_state_product(self._get_by_path(state, path))
+            if product is not None:
+                return product
+
+        article_id = get_product_key(self.product_url).article_id
+        if article_id.startswith('/'):
+            return None
+        return self._find_product_by_article(state, article_id)
+
+    def _find_product_by_article(self, state, article_id: str) -> tuple[int, str] | None:
+        if isinstance(state, dict):
+            if any(str(state.get(key)) == article_id for key in self.state_id_keys):
+                product = self._get_state_product(state)
+                if product is not None:
+                    return product
+            children = state.values()
+        elif isinstance(state, list):
+            children = state
+        else:
+            return None
+
+        for child in children:
+            product = self._find_product_by_article(child, article_id)
+            if product is not None:
+                return product
+        return None
+
+    def _get_state_product(self, state) -> tuple[int, str] | None:
+        if not isinstance(state, dict):
+            return None
+        price_key = next((key for key in self.state_price_keys if key in state), None)
+        name_key = next((key for key in self.state_name_keys if isinstance(state.get(key), str)), None)
+        if not price_key or not name_key or not isinstance(state[price_key], (int, float, str)):
+            return None
+        try:
+            return self._parse_state_price(state[price_key]), state[name_key].strip()
+        except ValueError:
+            return None
+
+    @staticmethod
+    def _get_by_path(state, path: tuple[str, ...]):
+        for key in path:
+            if not isinstance(state, dict):
+                return None
+            state = state.get(key)
+        return state
+
+    @staticmethod
+    def _find_by_class(tree: HtmlElement, class_name: str) -> HtmlElement | None:
+        conditions = ' and '.join(f'contains(concat(" ", normalize-space(@class), " "), " {name} ")'
+                                  for name in class_name.split('.'))
+        elements = tree.xpath(f'.//*[{conditions}]')
+        return elements[0] if elements else None
+
+    @classmethod
+    def _iter_json_ld_items(cls, data):
+        if isinstance(data, list):
+            for item in data:
+                yield from cls._iter_json_ld_items(item)
+        elif isinstance(data, dict):
+            yield data
+            yield from cls._iter_json_ld_items(data.get('@graph'))
+
+    @staticmethod
+    def _load_json(text: str | None):
+        try:
+            return json.loads(text or '')
+        except ValueError:
+            return None
+
+    @staticmethod
+    def _parse_state_price(price) -> int:
+        return int(float(str(price).replace(' ', '').replace(',', '.')))
@@ -0,0 +1,26 @@
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from config.selenium_config import my_user_agent, HTTP_POOL_MAXSIZE
+
+
+_lock = threading.Lock()
+_session: requests.Session | None = None
+
+
+def get_http_session() -> requests.Session:
+    """Общая для процесса сессия с пулом keep-alive соединений к маркетплейсам"""
+    global _session
+    if _session is None:
+        with _lock:
+            if _session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=HTTP_POOL_MAXSIZE, pool_maxsize=HTTP_POOL_MAXSIZE)
+                session.mount('https://', adapter)
+                session.mount('http://', adapter)
+                session.headers.update({'User-Agent': my_user_agent,
+                                        'Accept-Language': 'ru-RU,ru;q=0.9'})
+                _session = session
+    return _session
@@ -6,6 +6,7 @@ from selenium.webdriver.common.by import By
 
 from config.logger import setup_logger
 from src.monitoring.parsers.base_parser import BaseParser
+from src.monitoring.parsers.html_parser import HtmlParser
 
 logger = setup_logger(__name__)
 
@@ -21,7 +22,7 @@ class MegaMarkerParser(BaseParser, MegaMarketClasses):
         self.is_consider_bonuses = is_consider_bonuses
 
     def get_product_price_and_name(self):
-        product_price, product_name = super().get_product_price_and_name(1,2)
+        product_price, product_name = super().get_product_price_and_name()
 
         if self.is_consider_bonuses:
             bonuses = self._get_product_bonuses()
@@ -39,6 +40,24 @@ class MegaMarkerParser(BaseParser, MegaMarketClasses):
         return elements_int_bonuses
 
 
+class MegaMarketHtmlParser(HtmlParser, MegaMarkerParser):
+    def _extract_from_tree(self, tree):
+        product_price, product_name = super()._extract_from_tree(tree)
+
+        if product_price and self.is_consider_bonuses:
+            product_price -= self._get_product_bonuses_from_tree(tree)
+        return product_price, product_name
+
+    def _get_product_bonuses_from_tree(self, tree):
+        bonus_element = self._find_by_class(tree, 'money-bonus_loyalty')
+        if bonus_element is None:
+            return 0
+        bonus_amount = self._find_by_class(bonus_element, 'bonus-amount')
+        if bonus_amount is None:
+            return 0
+        return self._parse_price_to_int(bonus_amount.text_content())
+
+
 class PriceCalculator:
     @classmethod
     def count_finally_price(cls, price, bonuses, coupon=None):
@@ -6,6 +6,7 @@ from selenium.webdriver.common.by import By
 from config.logger import setup_logger
 from src.monitoring.custom_exceptions import ProductNotFound
 from src.monitoring.parsers.base_parser import BaseParser
+from src.monitoring.parsers.selector_registry import selector_registry
 
 
 logger = setup_logger(__name__)
@@ -23,6 +24,7 @@ class OzonClasses:
 
 
 class OzonParser(BaseParser, OzonClasses):
+    wait_timeout = 4  # при неудаче страница загружается повторно
 
     def __init__(self, driver, product_url, is_consider_bonuses: bool = True):
         super().__init__(driver, product_url)
@@ -32,30 +34,44 @@ class OzonParser(BaseParser, OzonClasses):
 
     def get_product_price_and_name(self) -> tuple[int, str]:
         try:
-            return super().get_product_price_and_name(2, 4)
+            return super().get_product_price_and_name()
         except ProductNotFound:
-            return super().get_product_price_and_name(2, 4)
+            pass
+
+        try:
+            return self._get_ozon_product_price_and_name()
+        except ProductNotFound:
+            return super().get_product_price_and_name()
+
+    def _get_ozon_product_price_and_name(self) -> tuple[int, str]:
+        """Запасной поиск по абсолютному XPath. Классы найденных элементов добавляются в кандидаты"""
+        return self._extract_ozon_product_price(), self._extract_ozon_product_name()
 
     def _extract_ozon_product_price(self):
         try:
             product_price = self.driver.find_element(By.XPATH,
                                                      '/html/body/div[1]/div/div[1]/div[4]/div[3]/div[2]/div[2]/div[2]/div/div[1]/div/div/div[1]/div[1]/button/span/div/div[1]/div/div/span')
             string_price = product_price.get_attribute("innerText")
-            logger.warning(f'ADD TO OZON PRICE CLASSES {product_price.get_attribute("class")}')
+            self._promote_element_class(product_price, 'price')
             return self._parse_price_to_int(string_price)
-        except NoSuchElementException:
+        except (NoSuchElementException, ValueError):
             raise ProductNotFound(f'Не определена цена товара!')
 
     def _extract_ozon_product_name(self):
         try:
             product_price = self.driver.find_element(By.XPATH,
                                                      '/html/body/div[1]/div/div[1]/div[4]/div[2]/div/div/div[1]/div/h1')
-            logger.warning(f'ADD TO OZON NAME CLASSES {product_price.get_attribute("class")}')
+            self._promote_element_class(product_price, 'name')
             return product_price.get_attribute("innerText")
 
         except NoSuchElementException:
             raise ProductNotFound(f'Не определено наименование товара!')
 
+    def _promote_element_class(self, element, kind: str):
+        class_name = '.'.join((element.get_attribute("class") or '').split())
+        if class_name:
+            selector_registry.promote(self.marketplace, kind, class_name)
+
     def _parse_price_to_int(self, price_str: str):
         return super()._parse_price_to_int(price_str, '\u2009')
 
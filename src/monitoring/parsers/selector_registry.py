@@ -0,0 +1,138 @@
+import datetime
+import threading
+import time
+
+from config.logger import setup_logger
+
+
+logger = setup_logger(__name__)
+
+
+class SelectorStat:
+    def __init__(self, hits: int = 0, misses: int = 0, score: float = 0.0, is_learned: bool = False,
+                 last_success_at: datetime.datetime | None = None):
+        self.hits = hits
+        self.misses = misses
+        self.score = score
+        self.is_learned = is_learned
+        self.last_success_at = last_success_at
+        self.pending_hits = 0
+        self.pending_misses = 0
+        self.is_dirty = False
+
+
+class SelectorRegistry:
+    """Статистика селекторов цены и названия по маркетплейсам.
+
+    Кандидаты сортируются по недавней доле попаданий (экспоненциально затухающий счет),
+    селекторы, найденные запасным XPath, добавляются к кандидатам. Статистика
+    загружается из таблицы selector_stats при первом обращении и периодически
+    сохраняется обратно.
+    """
+    decay = 0.9
+    flush_interval = 60
+
+    def __init__(self, is_persistent: bool = True):
+        self.is_persistent = is_persistent
+        self._stats: dict[tuple[str, str], dict[str, SelectorStat]] = {}
+        self._lock = threading.RLock()
+        self._is_loaded = not is_persistent
+        self._last_flush = time.monotonic()
+
+    def order(self, marketplace: str, kind: str, candidates: list[str]) -> list[str]:
+        self._load()
+        with self._lock:
+            stats = self._stats.get((marketplace, kind), {})
+            learned = [selector for selector, stat in stats.items()
+                       if stat.is_learned and selector not in candidates]
+            selectors = list(candidates) + learned
+            return sorted(selectors, key=lambda selector: -stats[selector].score if selector in stats else 0)
+
+    def record(self, marketplace: str, kind: str, tried: list[str], matched: str | None):
+        """matched засчитывается попаданием, все селекторы до него в порядке проверки - промахами"""
+        with self._lock:
+            for selector in tried:
+                if selector == matched:
+                    self._record_hit(marketplace, kind, selector)
+                    break
+                self._record_miss(marketplace, kind, selector)
+        self._flush_if_needed()
+
+    def promote(self, marketplace: str, kind: str, selector: str):
+        """Добавляет селектор, найденный запасным способом, и ставит его первым"""
+        with self._lock:
+            stats = self._stats.setdefault((marketplace, kind), {})
+            stat = stats.setdefault(selector, SelectorStat())
+            stat.is_learned = True
+            stat.score = max((other.score for other in stats.values()), default=0) + 1
+            self._record_hit(marketplace, kind, selector)
+        logger.info(f'Новый селектор {kind} для {marketplace}: {selector}')
+
+    def get_stats(self, marketplace: str, kind: str) -> dict[str, SelectorStat]:
+        with self._lock:
+            return dict(self._stats.get((marketplace, kind), {}))
+
+    def flush(self):
+        if not self.is_persistent:
+            return
+        from db.crud_operations import SelectorStatsCRUD
+
+        with self._lock:
+            rows, flushed = [], []
+            for (marketplace, kind), stats in self._stats.items():
+                for selector, stat in stats.items():
+                    if not stat.is_dirty:
+                        continue
+                    rows.append({'marketplace': marketplace, 'kind': kind, 'selector': selector,
+                                 'hits': stat.pending_hits, 'misses': stat.pending_misses,
+                                 'score': stat.score, 'is_learned': stat.is_learned,
+                                 'last_success_at': stat.last_success_at})
+                    flushed.append(stat)
+                    stat.pending_hits = stat.pending_misses = 0
+                    stat.is_dirty = False
+            self._last_flush = time.monotonic()
+
+        if SelectorStatsCRUD.save_selector_stats(rows) is not None:
+            return
+        # запись не удалась: возвращаем счётчики, чтобы сохранить их при следующем сбросе
+        with self._lock:
+            for stat, row in zip(flushed, rows):
+                stat.pending_hits += row['hits']
+                stat.pending_misses += row['misses']
+                stat.is_dirty = True
+
+    def _record_hit(self, marketplace: str, kind: str, selector: str):
+        stat = self._stats.setdefault((marketplace, kind), {}).setdefault(selector, SelectorStat())
+        stat.hits += 1
+        stat.pending_hits += 1
+        stat.score = stat.score * self.decay + 1
+        stat.last_success_at = datetime.datetime.utcnow()
+        stat.is_dirty = True
+
+    def _record_miss(self, marketplace: str, kind: str, selector: str):
+        stat = self._stats.setdefault((marketplace, kind), {}).setdefault(selector, SelectorStat())
+        stat.misses += 1
+        stat.pending_misses += 1
+        stat.score = stat.score * self.decay
+        stat.is_dirty = True
+
+    def _flush_if_needed(self):
+        if self.is_persistent and time.monotonic() - self._last_flush > self.flush_interval:
+            self.flush()
+
+    def _load(self):
+        if self._is_loaded:
+            return
+        from db.crud_operations import SelectorStatsCRUD
+
+        with self._lock:
+            if self._is_loaded:
+                return
+            self._is_loaded = True
+            for row in SelectorStatsCRUD.get_selector_stats() or []:
+                self._stats.setdefault((row.marketplace, row.kind), {})[row.selector] = SelectorStat(
+                    hits=row.hits, misses=row.misses, score=row.score,
+                    is_learned=row.is_learned, last_success_at=row.last_success_at)
+
+
+selector_registry = SelectorRegistry()
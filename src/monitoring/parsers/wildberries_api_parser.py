@@ -0,0 +1,71 @@
+import re
+
+from requests import RequestException
+
+from config.logger import setup_logger
+from config.selenium_config import HTTP_TIMEOUT
+from src.monitoring.custom_exceptions import ProductNotFound
+from src.monitoring.parsers.http_client import get_http_session
+from src.monitoring.parsers.wildberries_parser import WildberriesParser
+
+
+logger = setup_logger(__name__)
+
+
+class WildberriesApiParser(WildberriesParser):
+    """Получает цену и название из публичного JSON API карточки товара.
+
+    Страница в браузере загружается только если API не ответило или формат ответа изменился.
+    """
+    requires_browser = False
+
+    card_api_url = 'https://card.wb.ru/cards/v2/detail'
+    card_api_params = {'appType': 1, 'curr': 'rub', 'dest': -1257786, 'spp': 30}
+    article_pattern = re.compile(r'/catalog/(\d+)')
+
+    def get_product_price_and_name(self) -> tuple[int, str]:
+        try:
+            return self._get_product_price_and_name_from_api()
+        except (RequestException, ValueError, ProductNotFound) as ex:
+            logger.info(f'API Wildberries недоступно, загружаем страницу {self.product_url}: {ex}')
+
+        with self._browser():
+            return super().get_product_price_and_name()
+        raise ProductNotFound('Ошибка драйвера при загрузке страницы')
+
+    def _get_product_price_and_name_from_api(self) -> tuple[int, str]:
+        article_id = self._extract_article_id()
+        response = get_http_session().get(self.card_api_url,
+                                          params={**self.card_api_params, 'nm': article_id},
+                                          timeout=HTTP_TIMEOUT)
+        response.raise_for_status()
+        return self._parse_card(response.json(), article_id)
+
+    def _extract_article_id(self) -> int:
+        match = self.article_pattern.search(self.product_url)
+        if not match:
+            raise ProductNotFound(f'Не найден артикул в ссылке {self.product_url}')
+        return int(match.group(1))
+
+    def _parse_card(self, card: dict, article_id: int) -> tuple[int, str]:
+        products = (card.get('data') or {}).get('products') or []
+        product = next((product for product in products if product.get('id') == article_id), None)
+        if product is None:
+            raise ProductNotFound(f'Товар {article_id} не найден в ответе API')
+
+        product_name = product.get('name')
+        product_price = self._parse_card_price(product)
+        if not product_price or not product_name:
+            raise ProductNotFound(f'Не определена цена или наименование товара {article_id}')
+        return product_price, product_name
+
+    @staticmethod
+    def _parse_card_price(product: dict) -> int | None:
+        size_prices = [size['price']['product'] for size in product.get('sizes') or []
+                       if (size.get('price') or {}).get('product')]
+        if size_prices:
+            return min(size_prices) // 100
+
+        if product.get('salePriceU'):
+            return product['salePriceU'] // 100
+        return None
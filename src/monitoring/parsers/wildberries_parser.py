@@ -27,12 +27,6 @@ class WildberriesParser(BaseParser, WildberriesClasses):
 
         self.product_name_classes = self.product_name_classes
         self.product_price_classes = self._choose_price_classes(is_consider_bonuses)
-    #
-    # def get_product_price_and_name(self) -> tuple[int, str]:
-    #     return super().get_product_price_and_name()
-
-    def get_product_price_and_name(self):
-        return super().get_product_price_and_name(3, 5)
 
     def _choose_price_classes(self, is_consider_bonuses):
         if is_consider_bonuses:
@@ -0,0 +1,181 @@
+import json
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Callable
+
+import redis
+
+from config.config import RESULT_CACHE_TTL, RESULT_CACHE_LOCAL_SIZE, RESULT_CACHE_LOCK_TIMEOUT
+from config.logger import setup_logger
+from config.redis_config import get_redis
+from src.monitoring.metrics import metrics
+from src.monitoring.services.product_key import get_product_key
+
+
+logger = setup_logger(__name__)
+
+
+# Снимает блокировку, только если ее еще держит этот загрузчик: после lock_timeout ее мог взять другой процесс
+UNLOCK_SCRIPT = '''
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+'''
+
+
+class ResultCache:
+    """Кэш цены и названия товара: LRU процесса перед общим для всех процессов Redis.
+
+    get_or_fetch загружает страницу один раз на товар: параллельные запросы в процессе
+    ждут общий Future, а другие процессы - пока загрузивший запишет результат в Redis.
+    """
+
+    poll_interval = 0.5
+
+    def __init__(self, ttl: int = RESULT_CACHE_TTL, local_size: int = RESULT_CACHE_LOCAL_SIZE,
+                 lock_timeout: int = RESULT_CACHE_LOCK_TIMEOUT,
+                 redis_factory: Callable[[], redis.Redis] = get_redis):
+        self.ttl = ttl
+        self.local_size = local_size
+        self.lock_timeout = lock_timeout
+        self.redis_factory = redis_factory
+
+        self._local: OrderedDict[str, tuple[float, tuple[int, str]]] = OrderedDict()
+        self._in_flight: dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self._unlock_script = None
+
+    def get(self, url: str) -> tuple[int, str] | None:
+        key = self._key(url)
+        result = self._get_local(key)
+        if result is not None:
+            metrics.increment('result_cache.hits')
+            return result
+
+        result = self._get_shared(key)
+        if result is not None:
+            metrics.increment('result_cache.hits')
+            self._set_local(key, result)
+            return result
+
+        metrics.increment('result_cache.misses')
+        return None
+
+    def set(self, url: str, result: tuple[int, str]):
+        key = self._key(url)
+        self._set_local(key, result)
+        try:
+            self.redis_factory().set(key, json.dumps(result), ex=self.ttl)
+        except redis.RedisError as ex:
+            logger.warning(f'Кэш цен в Redis недоступен: {ex}')
+
+    def get_or_fetch(self, url: str, fetch: Callable[[], tuple[int, str]]) -> tuple[int, str]:
+        result = self.get(url)
+        if result is not None:
+            return result
+
+        key = self._key(url)
+        with self._lock:
+            future = self._in_flight.get(key)
+            is_leader = future is None
+            if is_leader:
+                future = Future()
+                self._in_flight[key] = future
+
+        if not is_leader:
+            metrics.increment('result_cache.shared_loads')
+            return future.result()
+
+        try:
+            # пока ждали блокировку, предыдущая загрузка могла успеть записать результат
+            result = self._get_local(key) or self._fetch_once(url, key, fetch)
+            future.set_result(result)
+            return result
+        except Exception as ex:
+            future.set_exception(ex)
+            raise
+        finally:
+            with self._lock:
+                del self._in_flight[key]
+
+    def _fetch_once(self, url: str, key: str, fetch: Callable[[], tuple[int, str]]) -> tuple[int, str]:
+        """Загружает товар, если его сейчас не загружает другой процесс, иначе ждет его результат"""
+        lock_key = f'{key}:lock'
+        token = uuid.uuid4().hex
+        try:
+            is_locked = self.redis_factory().set(lock_key, token, nx=True, ex=self.lock_timeout)
+        except redis.RedisError:
+            is_locked = True
+
+        if not is_locked:
+            deadline = time.monotonic() + self.lock_timeout
+            while time.monotonic() < deadline:
+                time.sleep(self.poll_interval)
+                result = self._get_shared(key)
+                if result is not None:
+                    metrics.increment('result_cache.shared_loads')
+                    self._set_local(key, result)
+                    return result
+                if not self._is_locked(lock_key):
+                    break
+
+        try:
+            result = tuple(fetch())
+            self.set(url, result)
+            return result
+        finally:
+            if is_locked:
+                self._unlock(lock_key, token)
+
+    def _get_local(self, key: str) -> tuple[int, str] | None:
+        with self._lock:
+            item = self._local.get(key)
+            if item is None:
+                return None
+            expires_at, result = item
+            if expires_at < time.monotonic():
+                del self._local[key]
+                return None
+            self._local.move_to_end(key)
+            return result
+
+    def _set_local(self, key: str, result: tuple[int, str]):
+        with self._lock:
+            self._local[key] = (time.monotonic() + self.ttl, result)
+            self._local.move_to_end(key)
+            while len(self._local) > self.local_size:
+                self._local.popitem(last=False)
+
+    def _get_shared(self, key: str) -> tuple[int, str] | None:
+        try:
+            value = self.redis_factory().get(key)
+        except redis.RedisError as ex:
+            logger.warning(f'Кэш цен в Redis недоступен: {ex}')
+            return None
+        return tuple(json.loads(value)) if value else None
+
+    def _is_locked(self, lock_key: str) -> bool:
+        try:
+            return bool(self.redis_factory().exists(lock_key))
+        except redis.RedisError:
+            return False
+
+    def _unlock(self, lock_key: str, token: str):
+        try:
+            if self._unlock_script is None:
+                self._unlock_script = self.redis_factory().register_script(UNLOCK_SCRIPT)
+            self._unlock_script(keys=[lock_key], args=[token])
+        except redis.RedisError:
+            pass
+
+    @staticmethod
+    def _key(url: str) -> str:
+        marketplace, article_id = get_product_key(url)
+        return f'result_cache:{marketplace}:{article_id}'
+
+
+result_cache = ResultCache()
@@ -0,0 +1,81 @@
+import datetime
+import math
+
+from config.config import SCHEDULE_BASE_INTERVAL, SCHEDULE_MIN_INTERVAL, SCHEDULE_MAX_INTERVAL, \
+    SCHEDULE_VOLATILITY_ALPHA
+from db.crud_operations import MonitoredSubscription, ScheduledCheck
+
+
+THRESHOLD_CLOSENESS_RANGE = 0.2  # цена в пределах 20% от порога считается близкой к нему
+
+
+def get_priority(subscriptions: list[MonitoredSubscription], volatility: float, price: int) -> float:
+    """Приоритет товара: растет с числом подписчиков, изменчивостью цены и близостью к порогу"""
+    subscribers_score = math.log2(1 + len(subscriptions))
+    volatility_score = min(volatility * 20, 3)
+    closeness_score = 2 * get_threshold_closeness(subscriptions, price)
+    return subscribers_score + volatility_score + closeness_score
+
+
+def get_threshold_closeness(subscriptions: list[MonitoredSubscription], price: int) -> float:
+    """1 - цена на пороге или ниже, 0 - цена дальше THRESHOLD_CLOSENESS_RANGE от всех порогов"""
+    closeness = 0.0
+    for subscription in subscriptions:
+        if subscription.is_any_change or price <= 0:
+            continue
+        gap = (price - subscription.threshold_price) / price
+        closeness = max(closeness, 1 - max(gap, 0) / THRESHOLD_CLOSENESS_RANGE)
+    return max(closeness, 0.0)
+
+
+def get_volatility(volatility: float, last_price: int, new_price: int,
+                   alpha: float = SCHEDULE_VOLATILITY_ALPHA) -> float:
+    """Экспоненциальное среднее относительного изменения цены между проверками"""
+    change = abs(new_price - last_price) / last_price if last_price else 0
+    return alpha * change + (1 - alpha) * volatility
+
+
+def get_check_interval(priority: float, consecutive_failures: int = 0) -> datetime.timedelta:
+    """Интервал до следующей проверки: короче для приоритетных товаров, длиннее после ошибок"""
+    seconds = SCHEDULE_BASE_INTERVAL / (1 + priority)
+    seconds = min(max(seconds, SCHEDULE_MIN_INTERVAL), SCHEDULE_MAX_INTERVAL)
+    if consecutive_failures:
+        seconds = min(seconds * 2 ** min(consecutive_failures, 16), SCHEDULE_MAX_INTERVAL)
+    return datetime.timedelta(seconds=seconds)
+
+
+def plan_after_success(subscriptions: list[MonitoredSubscription], new_price: int,
+                       now: datetime.datetime) -> ScheduledCheck:
+    product = subscriptions[0]
+    volatility = get_volatility(product.volatility, product.last_price, new_price)
+    priority = get_priority(subscriptions, volatility, new_price)
+    return ScheduledCheck(product_id=product.product_id,
+                          next_check_at=now + get_check_interval(priority),
+                          priority=priority,
+                          volatility=volatility,
+                          consecutive_failures=0,
+                          last_checked_at=now)
+
+
+def plan_after_failure(subscriptions: list[MonitoredSubscription], now: datetime.datetime) -> ScheduledCheck:
+    product = subscriptions[0]
+    consecutive_failures = product.consecutive_failures + 1
+    priority = get_priority(subscriptions, product.volatility, product.last_price)
+    return ScheduledCheck(product_id=product.product_id,
+                          next_check_at=now + get_check_interval(priority, consecutive_failures),
+                          priority=priority,
+                          volatility=product.volatility,
+                          consecutive_failures=consecutive_failures,
+                          last_checked_at=now)
+
+
+def plan_after_skip(subscriptions: list[MonitoredSubscription], now: datetime.datetime) -> ScheduledCheck:
+    """Проверку пропустили из-за своих же ограничений: интервал как обычно, число ошибок не меняется"""
+    product = subscriptions[0]
+    priority = get_priority(subscriptions, product.volatility, product.last_price)
+    return ScheduledCheck(product_id=product.product_id,
+                          next_check_at=now + get_check_interval(priority, product.consecutive_failures),
+                          priority=priority,
+                          volatility=product.volatility,
+                          consecutive_failures=product.consecutive_failures,
+                          last_checked_at=None)
@@ -0,0 +1,27 @@
+import re
+from typing import NamedTuple
+from urllib.parse import urlparse
+
+
+# артикул товара в пути ссылки; ссылки других сайтов определяются по нормализованному пути
+ARTICLE_PATTERNS = {
+    'ozon.ru': re.compile(r'/product/(?:[^/]*-)?(\d+)(?:/|$)'),
+    'megamarket.ru': re.compile(r'/catalog/details/(?:[^/]*-)?(\d+)(?:[_/]|$)'),
+    'wildberries.ru': re.compile(r'/catalog/(\d+)(?:/|$)'),
+}
+
+
+class ProductKey(NamedTuple):
+    marketplace: str
+    article_id: str
+
+
+def get_product_key(url: str) -> ProductKey:
+    """https://www.ozon.ru/product/phone-123/?sh=abc -> ProductKey('ozon.ru', '123')"""
+    parsed_url = urlparse(url.strip())
+    marketplace = parsed_url.netloc.lower().removeprefix('www.')
+    pattern = ARTICLE_PATTERNS.get(marketplace)
+    match = pattern.search(parsed_url.path) if pattern else None
+    article_id = match.group(1) if match else parsed_url.path.rstrip('/')
+    return ProductKey(marketplace=marketplace, article_id=article_id)
+
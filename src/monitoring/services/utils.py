@@ -6,6 +6,7 @@ from config.config import DOMAINS
 from config.logger import setup_logger
 from src.monitoring.custom_exceptions import InvalidMessageWithUrl
 from src.monitoring.parsers.base_parser import BaseParser
+from src.monitoring.services.product_key import get_product_key
 
 
 logger = setup_logger(__name__)
@@ -18,7 +19,7 @@ def choose_parser_class(url: str) -> Type[BaseParser]:
 
 
 def get_domain(url: str): #refactor etogo
-    domain = extract_domain(url)
+    domain = get_marketplace(url)
 
     if not domain:
         logger.warning(f'Не найден домен {url}')
@@ -30,6 +31,10 @@ def get_domain(url: str): #refactor etogo
     return domain
 
 
+def get_marketplace(url: str) -> str:
+    return get_product_key(url).marketplace
+
+
 def extract_domain(url: str) -> str:
     parsed_url = urlparse(url)
     return parsed_url.netloc
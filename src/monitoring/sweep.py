@@ -0,0 +1,80 @@
+import time
+from collections import deque, defaultdict
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Callable, Iterable, Iterator, TypeVar
+
+from config.config import SWEEP_MAX_SESSIONS, MARKETPLACE_SESSIONS, DEFAULT_MARKETPLACE_SESSIONS
+from config.logger import setup_logger
+from src.monitoring.services.utils import get_marketplace
+
+
+logger = setup_logger(__name__)
+
+
+T = TypeVar('T')
+R = TypeVar('R')
+
+
+class ParallelSweep:
+    """Раздает загрузку страниц по нескольким сессиям браузера.
+
+    Одновременно выполняется не больше max_sessions загрузок всего и не больше
+    marketplace_sessions[маркетплейс] загрузок одного маркетплейса.
+    """
+
+    def __init__(self, max_sessions: int = SWEEP_MAX_SESSIONS,
+                 marketplace_sessions: dict[str, int] | None = None,
+                 default_marketplace_sessions: int = DEFAULT_MARKETPLACE_SESSIONS):
+        if max_sessions < 1:
+            raise ValueError('max_sessions должен быть больше нуля')
+
+        self.max_sessions = max_sessions
+        self.marketplace_sessions = MARKETPLACE_SESSIONS if marketplace_sessions is None else marketplace_sessions
+        self.default_marketplace_sessions = default_marketplace_sessions
+        self.wall_time = 0.0
+        self.processed = 0
+        self.failed = 0
+
+    def run(self, items: Iterable[T], get_url: Callable[[T], str],
+            fetch: Callable[[T], R]) -> Iterator[tuple[T, R | None, Exception | None]]:
+        """Возвращает (item, результат, ошибка) по мере готовности результатов"""
+        queues: dict[str, deque] = defaultdict(deque)
+        for item in items:
+            queues[get_marketplace(get_url(item))].append(item)
+
+        in_flight: dict[str, int] = defaultdict(int)
+        futures = {}
+        self.processed = 0
+        self.failed = 0
+        started_at = time.monotonic()
+
+        with ThreadPoolExecutor(max_workers=self.max_sessions) as executor:
+            while queues or futures:
+                for marketplace in list(queues):
+                    queue = queues[marketplace]
+                    while (queue and len(futures) < self.max_sessions
+                           and in_flight[marketplace] < self._get_limit(marketplace)):
+                        item = queue.popleft()
+                        futures[executor.submit(fetch, item)] = (marketplace, item)
+                        in_flight[marketplace] += 1
+                    if not queue:
+                        del queues[marketplace]
+
+                done, _ = wait(futures, return_when=FIRST_COMPLETED)
+                for future in done:
+                    marketplace, item = futures.pop(future)
+                    in_flight[marketplace] -= 1
+                    self.processed += 1
+                    error = future.exception()
+                    if error is not None:
+                        self.failed += 1
+                        yield item, None, error
+                    else:
+                        yield item, future.result(), None
+
+        self.wall_time = time.monotonic() - started_at
+        logger.info(f'Обход завершен: {self.processed} товаров ({self.failed} с ошибкой) '
+                    f'за {self.wall_time:.1f} с')
+
+    def _get_limit(self, marketplace: str) -> int:
+        return max(1, self.marketplace_sessions.get(marketplace, self.default_marketplace_sessions))
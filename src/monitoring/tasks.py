@@ -1,8 +1,17 @@
-from celery import Celery
+import datetime
+
+from celery import Celery, chord
 from celery.schedules import crontab
+from celery.signals import worker_process_init
 
+from config.config import PRICE_HISTORY_RAW_DAYS, MONITORING_TASK_CHUNK_SIZE
+from config.database_config import dispose_engines_after_fork
 from config.logger import setup_logger
-from src.monitoring.monitoring import start_monitoring, get_product_price_and_name_from_handlers
+from db.crud_operations import PriceObservationsCRUD, ProductScheduleCRUD
+from src.monitoring.metrics import metrics
+from src.monitoring.monitoring import get_product_price_and_name_from_handlers, claim_due_products, \
+    split_by_marketplace, check_products, summarize_sweep, get_lease_id, renew_leases, release_leases
+from src.notifications.digest import send_digests
 
 
 logger = setup_logger(__name__)
@@ -13,9 +22,50 @@ app.config_from_object('config.celery_config')
 app.autodiscover_tasks()
 
 
+@worker_process_init.connect
+def reset_database_pools(**kwargs):
+    dispose_engines_after_fork()
+
+
 @app.task
 def check_new_products_prices():
-    start_monitoring()
+    """Раздает наступившие проверки порциями по очередям маркетплейсов, сводку собирает summarize_sweep_task"""
+    ProductScheduleCRUD.add_missing_schedules()
+    lease_id = get_lease_id()
+    due_products = claim_due_products(lease_id)
+    if not due_products:
+        return
+
+    chunks = split_by_marketplace(due_products, MONITORING_TASK_CHUNK_SIZE)
+    header = [check_products_task.s(product_ids, lease_id).set(queue=get_monitoring_queue(marketplace))
+              for marketplace, product_ids in chunks]
+    chord(header)(summarize_sweep_task.s())
+    logger.info(f'Обход запущен: товаров {len(due_products)}, задач {len(chunks)}')
+
+
+@app.task
+def check_products_task(product_ids: list[int], lease_id: str) -> dict:
+    """Проверяет порцию и сразу записывает ее результаты; возвращает только сводку для summarize_sweep_task"""
+    try:
+        product_ids = renew_leases(product_ids, lease_id)
+        return check_products(product_ids, lease_id)
+    except Exception as ex:
+        # исключение в одной порции не должно отменять сводку по остальным
+        logger.error(f'Ошибка при проверке порции товаров {product_ids}: {ex}')
+        release_leases(product_ids, lease_id)
+        return {'processed': 0, 'failed': len(product_ids), 'skipped': 0, 'new_prices': 0, 'wall_time': 0}
+    finally:
+        # счетчики порции (кэш, ограничители, пул БД) остаются в процессе воркера, а не у summarize_sweep_task
+        metrics.log()
+
+
+@app.task
+def summarize_sweep_task(summaries: list[dict]) -> dict:
+    return summarize_sweep(summaries)
+
+
+def get_monitoring_queue(marketplace: str) -> str:
+    return f'monitoring.{marketplace}'
 
 
 @app.task
@@ -24,9 +74,39 @@ def task_get_product_price_and_name(url):
     return result
 
 
+@app.task
+def downsample_price_history():
+    older_than = datetime.datetime.utcnow() - datetime.timedelta(days=PRICE_HISTORY_RAW_DAYS)
+    deleted = PriceObservationsCRUD.downsample_observations(older_than)
+    logger.info(f'Свернуто наблюдений цен в дневные агрегаты: {deleted}')
+
+
+@app.task
+def send_hourly_digests():
+    # изменения пользователей, вернувшихся в режим «сразу», тоже уходят с ближайшей сводкой
+    send_digests(['hourly', 'immediate'])
+
+
+@app.task
+def send_daily_digests():
+    send_digests(['daily'])
+
+
 app.conf.beat_schedule = {
-    'check_new_products_prices-every-30-seconds': {
+    'check_new_products_prices-every-minute': {
         'task': 'src.monitoring.tasks.check_new_products_prices',
-        'schedule': crontab(minute='*/2'),
+        'schedule': crontab(minute='*'),
+    },
+    'send_hourly_digests-every-hour': {
+        'task': 'src.monitoring.tasks.send_hourly_digests',
+        'schedule': crontab(minute=0),
+    },
+    'send_daily_digests-daily': {
+        'task': 'src.monitoring.tasks.send_daily_digests',
+        'schedule': crontab(hour=10, minute=0),
+    },
+    'downsample_price_history-daily': {
+        'task': 'src.monitoring.tasks.downsample_price_history',
+        'schedule': crontab(hour=4, minute=0),
     },
 }
@@ -0,0 +1,159 @@
+import time
+from typing import Callable
+
+import redis
+from requests import RequestException
+from selenium.common import WebDriverException
+
+from config.config import DEFAULT_RATE_LIMIT, MARKETPLACE_RATE_LIMITS, RATE_LIMIT_BURST, RATE_LIMIT_MAX_WAIT, \
+    CIRCUIT_BREAKER_FAILURES, CIRCUIT_BREAKER_COOLDOWN
+from config.logger import setup_logger
+from config.redis_config import get_redis
+from src.monitoring.custom_exceptions import PageNotLoaded, DomainUnavailable
+from src.monitoring.driver_pool import DriverPoolExhausted
+from src.monitoring.metrics import metrics
+
+
+logger = setup_logger(__name__)
+
+
+# Резервирует токен и возвращает, сколько секунд ждать до него, или -1, если ждать дольше max_wait.
+# Время берется из Redis, чтобы у всех воркеров были одни и те же часы.
+TOKEN_BUCKET_SCRIPT = '''
+local rate = tonumber(ARGV[1])
+local capacity = tonumber(ARGV[2])
+local max_wait = tonumber(ARGV[3])
+local redis_time = redis.call('TIME')
+local now = tonumber(redis_time[1]) + tonumber(redis_time[2]) / 1000000
+
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'updated_at')
+local tokens = tonumber(state[1]) or capacity
+local updated_at = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + (now - updated_at) * rate) - 1
+
+local wait = 0
+if tokens < 0 then
+    wait = -tokens / rate
+end
+if wait > max_wait then
+    return '-1'
+end
+
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'updated_at', tostring(now))
+redis.call('EXPIRE', KEYS[1], math.ceil((capacity - tokens) / rate) + 1)
+return tostring(wait)
+'''
+
+
+class DomainRateLimiter:
+    """Token bucket на маркетплейс, общий для всех воркеров через Redis"""
+
+    def __init__(self, rates: dict[str, float] | None = None, default_rate: float = DEFAULT_RATE_LIMIT,
+                 burst: int = RATE_LIMIT_BURST, max_wait: float = RATE_LIMIT_MAX_WAIT,
+                 redis_factory: Callable[[], redis.Redis] = get_redis):
+        self.rates = MARKETPLACE_RATE_LIMITS if rates is None else rates
+        self.default_rate = default_rate
+        self.burst = burst
+        self.max_wait = max_wait
+        self.redis_factory = redis_factory
+        self._script = None
+
+    def acquire(self, marketplace: str) -> bool:
+        """Ждет своей очереди на загрузку страницы. False - очередь дольше max_wait"""
+        rate = self.rates.get(marketplace, self.default_rate)
+        if rate <= 0:
+            return True
+        try:
+            wait = float(self._get_script()(keys=[f'rate_limit:{marketplace}'],
+                                            args=[rate, self.burst, self.max_wait]))
+        except redis.RedisError as ex:
+            logger.warning(f'Ограничитель запросов недоступен, работаем без него: {ex}')
+            return True
+
+        if wait < 0:
+            metrics.increment(f'rate_limit.rejected.{marketplace}')
+            return False
+        if wait > 0:
+            metrics.increment(f'rate_limit.waited_seconds.{marketplace}', wait)
+            time.sleep(wait)
+        return True
+
+    def _get_script(self):
+        if self._script is None:
+            self._script = self.redis_factory().register_script(TOKEN_BUCKET_SCRIPT)
+        return self._script
+
+
+class CircuitBreaker:
+    """Отключает маркетплейс на cooldown секунд после failure_threshold ошибок подряд.
+
+    После паузы маркетплейс снова проверяется, но счетчик ошибок остается на пороге:
+    первая же ошибка отключает его снова, первый успех сбрасывает счетчик.
+    """
+
+    def __init__(self, failure_threshold: int = CIRCUIT_BREAKER_FAILURES, cooldown: int = CIRCUIT_BREAKER_COOLDOWN,
+                 redis_factory: Callable[[], redis.Redis] = get_redis):
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.redis_factory = redis_factory
+
+    def is_open(self, marketplace: str) -> bool:
+        try:
+            return bool(self.redis_factory().exists(self._open_key(marketplace)))
+        except redis.RedisError as ex:
+            logger.warning(f'Предохранитель недоступен, работаем без него: {ex}')
+            return False
+
+    def record_success(self, marketplace: str):
+        try:
+            self.redis_factory().delete(self._failures_key(marketplace))
+        except redis.RedisError as ex:
+            logger.warning(f'Предохранитель недоступен, работаем без него: {ex}')
+
+    def record_failure(self, marketplace: str):
+        try:
+            client = self.redis_factory()
+            failures = client.incr(self._failures_key(marketplace))
+            client.expire(self._failures_key(marketplace), self.cooldown * 4)
+            if failures >= self.failure_threshold:
+                client.set(self._open_key(marketplace), failures, ex=self.cooldown)
+                client.set(self._failures_key(marketplace), self.failure_threshold - 1, ex=self.cooldown * 4)
+                metrics.increment(f'circuit_breaker.opened.{marketplace}')
+                logger.warning(f'{marketplace} отключен на {self.cooldown} с после {failures} ошибок подряд')
+        except redis.RedisError as ex:
+            logger.warning(f'Предохранитель недоступен, работаем без него: {ex}')
+
+    @staticmethod
+    def _failures_key(marketplace: str) -> str:
+        return f'circuit_breaker:{marketplace}:failures'
+
+    @staticmethod
+    def _open_key(marketplace: str) -> str:
+        return f'circuit_breaker:{marketplace}:open'
+
+
+rate_limiter = DomainRateLimiter()
+circuit_breaker = CircuitBreaker()
+
+
+def throttled(marketplace: str, fetch: Callable[[], tuple[int, str]]) -> tuple[int, str]:
+    """Выполняет fetch с учетом лимита запросов и предохранителя маркетплейса.
+
+    Предохранитель считает только ошибки загрузки: таймауты, ошибки драйвера и HTTP, пустые страницы.
+    Товар, снятый с продажи, или не найденный селектор - ошибка одного товара, а не маркетплейса.
+    """
+    if circuit_breaker.is_open(marketplace):
+        metrics.increment(f'circuit_breaker.skipped.{marketplace}')
+        raise DomainUnavailable(f'{marketplace} временно не проверяется')
+    if not rate_limiter.acquire(marketplace):
+        raise DomainUnavailable(f'Очередь запросов к {marketplace} слишком длинная')
+
+    try:
+        result = fetch()
+    except DriverPoolExhausted:
+        raise  # не хватило своих драйверов, маркетплейс тут ни при чем
+    except (PageNotLoaded, WebDriverException, RequestException):
+        circuit_breaker.record_failure(marketplace)
+        raise
+    circuit_breaker.record_success(marketplace)
+    return result
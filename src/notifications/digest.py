@@ -0,0 +1,72 @@
+import threading
+from itertools import groupby
+from operator import attrgetter
+
+from config.config import NOTIFICATIONS_FLUSH_TIMEOUT
+from config.logger import setup_logger
+from db.crud_operations import PendingNotificationsCRUD
+from src.notifications.dispatcher import notification_dispatcher, join_messages
+
+
+logger = setup_logger(__name__)
+
+
+DIGEST_MODES = {
+    'immediate': 'Сразу',
+    'hourly': 'Раз в час',
+    'daily': 'Раз в день',
+}
+
+
+class DigestBuffer:
+    """Изменения цен для пользователей в режиме сводки, накопленные за порцию обхода"""
+
+    def __init__(self):
+        self._changes: dict[tuple[int, int], dict] = {}
+        self._lock = threading.Lock()
+
+    def add(self, chat_id: int, product_id: int, product_name: str, product_url: str,
+            old_price: int, new_price: int):
+        with self._lock:
+            change = self._changes.setdefault((chat_id, product_id), {
+                'chat_id': chat_id, 'product_id': product_id, 'product_url': product_url, 'old_price': old_price,
+            })
+            change.update(product_name=product_name, new_price=new_price)
+
+    def flush(self) -> int:
+        with self._lock:
+            changes = list(self._changes.values())
+            self._changes.clear()
+        if not changes:
+            return 0
+        return PendingNotificationsCRUD.add_pending_notifications(changes) or 0
+
+
+digest_buffer = DigestBuffer()
+
+
+def send_digests(digest_modes: list[str]) -> int:
+    """Отправляет накопленные изменения одним сообщением на пользователя и возвращает число сообщений"""
+    from src.monitoring.comparer import PriceComparer
+
+    notifications = PendingNotificationsCRUD.get_pending_notifications(digest_modes) or []
+    notifications = sorted(notifications, key=attrgetter('chat_id'))
+    sent = 0
+    for chat_id, changes in groupby(notifications, key=attrgetter('chat_id')):
+        lines = [PriceComparer._prepare_message_text(product_name=change.product_name,
+                                                     product_url=change.product_url,
+                                                     old_price=change.old_price,
+                                                     new_price=change.new_price)
+                 for change in changes if change.old_price != change.new_price]
+        if lines:
+            for message in join_messages([f'📊 Изменения цен: {len(lines)}'] + lines):
+                notification_dispatcher.enqueue(chat_id=chat_id, text=message)
+            sent += 1
+
+    # изменения удаляются только после отправки, иначе при сбое сводка пропала бы
+    if not notification_dispatcher.flush(timeout=NOTIFICATIONS_FLUSH_TIMEOUT):
+        logger.warning('Не все сводки отправлены, изменения останутся до следующей сводки')
+        return 0
+    PendingNotificationsCRUD.delete_sent_notifications(notifications)
+    logger.info(f'Отправлено сводок: {sent}, изменений в них: {len(notifications)}')
+    return sent
@@ -0,0 +1,167 @@
+import asyncio
+import atexit
+import threading
+import time
+from typing import Awaitable, Callable
+
+from aiogram.exceptions import TelegramAPIError, TelegramRetryAfter
+
+from config.config import NOTIFICATIONS_GLOBAL_RATE, NOTIFICATIONS_CHAT_INTERVAL, NOTIFICATIONS_SENDERS, \
+    NOTIFICATIONS_MAX_RETRIES
+from config.logger import setup_logger
+from src.notifications.utils import send_message_price_changed
+
+
+logger = setup_logger(__name__)
+
+
+TELEGRAM_MESSAGE_LIMIT = 4096
+
+
+class AsyncTokenBucket:
+    def __init__(self, rate: float, capacity: float | None = None):
+        self.rate = rate
+        self.capacity = capacity or rate
+        self._tokens = self.capacity
+        self._updated_at = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.rate) - 1
+            self._updated_at = now
+            if self._tokens < 0:
+                await asyncio.sleep(-self._tokens / self.rate)
+
+
+class NotificationDispatcher:
+    """Очередь исходящих уведомлений с долгоживущим асинхронным отправителем.
+
+    Отправитель работает в своем потоке со своим event loop, поэтому enqueue можно
+    вызывать из синхронного кода обхода. Сообщения идут не чаще global_rate в секунду
+    всего и не чаще раза в chat_interval секунд в один чат; все, что накопилось для чата
+    за время ожидания, уходит одним сообщением.
+    """
+
+    def __init__(self, send: Callable[[int, str], Awaitable] | None = None,
+                 global_rate: float = NOTIFICATIONS_GLOBAL_RATE,
+                 chat_interval: float = NOTIFICATIONS_CHAT_INTERVAL,
+                 senders: int = NOTIFICATIONS_SENDERS,
+                 max_retries: int = NOTIFICATIONS_MAX_RETRIES):
+        self.send = send or (lambda chat_id, text: send_message_price_changed(chat_id=chat_id, message_text=text))
+        self.global_rate = global_rate
+        self.chat_interval = chat_interval
+        self.senders = senders
+        self.max_retries = max_retries
+
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._queue: asyncio.Queue | None = None
+        self._bucket: AsyncTokenBucket | None = None
+        self._pending: dict[int, list[str]] = {}
+        self._chat_sent_at: dict[int, float] = {}
+        self._sending: set[int] = set()  # чаты, которые сейчас обрабатывает один из отправителей
+        self._unsent = 0
+        self._start_lock = threading.Lock()
+        self._unsent_changed = threading.Condition()
+
+    def enqueue(self, chat_id: int, text: str):
+        self._start()
+        with self._unsent_changed:
+            self._unsent += 1
+        self._loop.call_soon_threadsafe(self._add, chat_id, text)
+
+    def flush(self, timeout: float | None = None) -> bool:
+        """Ждет отправки всех поставленных в очередь сообщений. False - не дождались за timeout"""
+        with self._unsent_changed:
+            return self._unsent_changed.wait_for(lambda: self._unsent == 0, timeout)
+
+    def _start(self):
+        if self._loop is not None:
+            return
+        with self._start_lock:
+            if self._loop is not None:
+                return
+            loop = asyncio.new_event_loop()
+            started = threading.Event()
+            thread = threading.Thread(target=self._run, args=(loop, started), name='notifications', daemon=True)
+            thread.start()
+            started.wait()
+            self._loop = loop
+
+    def _run(self, loop: asyncio.AbstractEventLoop, started: threading.Event):
+        asyncio.set_event_loop(loop)
+        self._queue = asyncio.Queue()
+        self._bucket = AsyncTokenBucket(self.global_rate)
+        for _ in range(self.senders):
+            loop.create_task(self._sender())
+        started.set()
+        loop.run_forever()
+
+    def _add(self, chat_id: int, text: str):
+        if chat_id not in self._pending:
+            self._pending[chat_id] = []
+            # чат, который сейчас отправляется, вернет в очередь его отправитель
+            if chat_id not in self._sending:
+                self._queue.put_nowait(chat_id)
+        self._pending[chat_id].append(text)
+
+    async def _sender(self):
+        while True:
+            chat_id = await self._queue.get()
+            self._sending.add(chat_id)
+            wait = self._chat_sent_at.get(chat_id, 0) + self.chat_interval - time.monotonic()
+            if wait > 0:
+                await asyncio.sleep(wait)
+
+            texts = self._pending.pop(chat_id)
+            try:
+                for message in join_messages(texts):
+                    await self._send_with_retries(chat_id, message)
+            finally:
+                self._chat_sent_at[chat_id] = time.monotonic()
+                self._sending.discard(chat_id)
+                if chat_id in self._pending:
+                    self._queue.put_nowait(chat_id)
+                with self._unsent_changed:
+                    self._unsent -= len(texts)
+                    self._unsent_changed.notify_all()
+
+    async def _send_with_retries(self, chat_id: int, message: str):
+        for attempt in range(self.max_retries + 1):
+            await self._bucket.acquire()
+            try:
+                await self.send(chat_id, message)
+                return
+            except TelegramRetryAfter as ex:
+                if attempt == self.max_retries:
+                    break
+                logger.warning(f'Telegram просит подождать {ex.retry_after} с перед отправкой в {chat_id}')
+                await asyncio.sleep(ex.retry_after)
+            except TelegramAPIError as ex:
+                logger.warning(f'Не удалось отправить уведомление в {chat_id}: {ex}')
+                return
+            except Exception as ex:
+                logger.error(f'Ошибка при отправке уведомления в {chat_id}: {ex}')
+                return
+        logger.warning(f'Уведомление в {chat_id} не отправлено после {self.max_retries} повторов')
+
+
+def join_messages(texts: list[str], limit: int = TELEGRAM_MESSAGE_LIMIT) -> list[str]:
+    """Склеивает уведомления одного чата в как можно меньшее число сообщений не длиннее limit"""
+    messages = []
+    current = ''
+    for text in texts:
+        candidate = f'{current}\n\n{text}' if current else text
+        if len(candidate) <= limit or not current:
+            current = candidate
+        else:
+            messages.append(current)
+            current = text
+    if current:
+        messages.append(current)
+    return messages
+
+
+notification_dispatcher = NotificationDispatcher()
+atexit.register(notification_dispatcher.flush, 10)
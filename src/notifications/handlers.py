@@ -1,3 +1,6 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
 from aiogram import types, F, Router
 from aiogram.enums import ParseMode
 from aiogram.fsm.context import FSMContext
@@ -5,15 +8,16 @@ from aiogram.methods import SendMessage
 from aiogram.types import Message, CallbackQuery
 from aiogram.filters import CommandStart
 
+from config.config import HANDLER_SCRAPE_WORKERS
 from config.logger import setup_logger
-from db.crud_operations import UsersCRUD, UserProductsCRUD
+from db.async_crud_operations import AsyncUsersCRUD, AsyncUserProductsCRUD
 from src.monitoring.custom_exceptions import ProductNotFound, InvalidMessageWithUrl
 from src.monitoring.monitoring import get_product_price_and_name_from_handlers
-from src.monitoring.services.utils import find_url_in_text
-from src.monitoring.tasks import task_get_product_price_and_name
+from src.monitoring.services.utils import find_url_in_text, choose_parser_class
 from src.notifications import kb, text
+from src.notifications.digest import DIGEST_MODES
 from src.notifications.states import AddProductStateMachine, DeleteProductCallback, UniversalCallback, \
-    ChooseIsIncludeSales
+    ChooseIsIncludeSales, DigestModeCallback
 from src.notifications.utils import generate_message_for_each_products
 
 
@@ -21,6 +25,7 @@ logger = setup_logger(__name__)
 
 
 router = Router()
+scrape_executor = ThreadPoolExecutor(max_workers=HANDLER_SCRAPE_WORKERS, thread_name_prefix='scrape')
 
 
 @router.message(CommandStart())
@@ -28,7 +33,7 @@ async def start_handler(msg: Message):
     await msg.answer(text.greet, reply_markup=kb.menu)
 
     telegram_user_id = msg.from_user.id
-    if not UsersCRUD.add_new_user_and_get_user_id(telegram_user_id):
+    if not await AsyncUsersCRUD.add_new_user_and_get_user_id(telegram_user_id):
         logger.warning(f'Ошибка при добавлении пользователся в БД!'
                        f'{msg} {telegram_user_id}')
 
@@ -55,31 +60,50 @@ async def start_add_product_handler(message: Message, state: FSMContext):
 # ---LINK HANDLER
 @router.message(AddProductStateMachine.EnterLink)
 async def enter_link_handler(message: Message, state: FSMContext):
+    url = None
+    status_message = None
 
     try:
         url = find_url_in_text(message.text)
-        # product_price, product_name = await task_get_product_price_and_name.delay(link)
-        # # product_price, product_name = result.get()
-        product_price, product_name = get_product_price_and_name_from_handlers(url)
-
-        await message.answer(f'{product_name}\n'
-                             f'Текущая цена: {product_price} руб.\n'
-                             f'[Cсылка на товар]({url})', parse_mode=ParseMode.MARKDOWN)
+        try:
+            choose_parser_class(url)
+        except KeyError:
+            logger.info(f'Не найден парсер для ссылки {url}')
+            await message.answer(text.parser_not_found, reply_markup=kb.exit_kb)
+            return
+        status_message = await message.answer(text.checking_product)
+
+        # парсинг идет в отдельном потоке, бот в это время обслуживает другие чаты
+        loop = asyncio.get_running_loop()
+        product_price, product_name = await loop.run_in_executor(scrape_executor,
+                                                                 get_product_price_and_name_from_handlers, url)
+
+        await status_message.edit_text(f'{product_name}\n'
+                                       f'Текущая цена: {product_price} руб.\n'
+                                       f'[Cсылка на товар]({url})', parse_mode=ParseMode.MARKDOWN)
         callback_data = UniversalCallback(action='enter_any_price').pack()
         callback_data_menu = UniversalCallback(action='exit_to_menu').pack()
         await message.answer(text.get_price, reply_markup=kb.create_any_product_price(callback_data, callback_data_menu))
         await message.delete()
         await state.update_data(url=url, product_price=product_price, product_name=product_name)
         await state.set_state(AddProductStateMachine.EnterPrice)
-    except KeyError:
-        logger.info(url)
-        await message.answer(text.parser_not_found, reply_markup=kb.exit_kb)
     except InvalidMessageWithUrl:
         await message.answer(text.invalid_link, reply_markup=kb.exit_kb)
         await message.delete()
     except ProductNotFound:
         logger.warning(f'Не определна цена или наименование товара {url}')
-        await message.answer(text.price_or_name_not_detected)
+        await answer_check_failed(message, status_message, text.price_or_name_not_detected)
+    except Exception as ex:
+        logger.error(f'Ошибка при проверке товара {url}: {ex!r}')
+        await answer_check_failed(message, status_message, text.product_check_failed)
+
+
+async def answer_check_failed(message: Message, status_message: Message | None, error_text: str):
+    """Заменяет сообщение «Проверяем цену» текстом ошибки, а если его еще нет - отвечает новым"""
+    if status_message is None:
+        await message.answer(error_text, reply_markup=kb.exit_kb)
+    else:
+        await status_message.edit_text(error_text)
 
 
 # ---PRICE HANDLERS
@@ -119,13 +143,13 @@ async def handle_threshold_price(message: Message, state: FSMContext):
 async def enter_consider_bonuses(query: CallbackQuery, callback_data: ChooseIsIncludeSales, state: FSMContext):
     is_include_sales = True if callback_data.is_include == "include" else False
     state_data = await state.get_data()
-    UserProductsCRUD.add_user_product(telegram_id=query.from_user.id,
-                                      product_url=state_data['url'],
-                                      threshold_price=state_data['threshold_price'],
-                                      last_product_price=state_data['product_price'],
-                                      product_name=state_data['product_name'],
-                                      is_any_change=state_data['any_price_change'],
-                                      is_take_into_account_bonuses=is_include_sales)
+    await AsyncUserProductsCRUD.add_user_product(telegram_id=query.from_user.id,
+                                                 product_url=state_data['url'],
+                                                 threshold_price=state_data['threshold_price'],
+                                                 last_product_price=state_data['product_price'],
+                                                 product_name=state_data['product_name'],
+                                                 is_any_change=state_data['any_price_change'],
+                                                 is_take_into_account_bonuses=is_include_sales)
     await state.clear()
     await query.message.answer('Товар успешно добавлен!', reply_markup=kb.menu) #написать подробно про добавленный товар
 
@@ -142,7 +166,7 @@ async def enter_consider_bonuses_handler(message: Message, state: FSMContext):
 # ------------------GET USER PRODUCTS--------------------------
 @router.message(F.text == 'Мои товары')
 async def get_user_products_handler(message: Message):
-    products_list = UserProductsCRUD.get_user_products_for_handler(message.from_user.id)
+    products_list = await AsyncUserProductsCRUD.get_user_products_for_handler(message.from_user.id)
     if products_list:
         # for user_products, users, products in products_list:
 
@@ -159,13 +183,32 @@ async def get_user_products_handler(message: Message):
         await message.answer(text.products_are_not_being_monitored,
                              reply_markup=kb.menu)
 
+
+# -----------------DIGEST MODE-----------------
+@router.message(F.text == 'Уведомления')
+async def digest_mode_handler(message: Message):
+    current_mode = await AsyncUsersCRUD.get_digest_mode(message.from_user.id) or 'immediate'
+    await message.answer(text.choose_digest_mode,
+                         reply_markup=kb.create_digest_mode_keyboard(DIGEST_MODES, current_mode))
+
+
+@router.callback_query(DigestModeCallback.filter(F.mode.in_(DIGEST_MODES)))
+async def set_digest_mode_handler(query: CallbackQuery, callback_data: DigestModeCallback):
+    await AsyncUsersCRUD.add_new_user_and_get_user_id(query.from_user.id)
+    if not await AsyncUsersCRUD.set_digest_mode(query.from_user.id, callback_data.mode):
+        logger.warning(f'Не удалось изменить режим уведомлений {query.from_user.id}')
+    await query.message.edit_reply_markup(reply_markup=kb.create_digest_mode_keyboard(DIGEST_MODES,
+                                                                                      callback_data.mode))
+    await query.answer(text.digest_mode_changed)
+
+
 # -----------------DELETE PRODUCT-----------------
 
 
 @router.callback_query(DeleteProductCallback.filter(F.action == 'delete'))
 async def delete_product_handler(query: CallbackQuery, callback_data: DeleteProductCallback):
     user_product_id = callback_data.user_product_id
-    if not UserProductsCRUD.delete_user_products(user_product_id):
+    if not await AsyncUserProductsCRUD.delete_user_products(user_product_id):
         logger.warning(f'Не найдена запись {user_product_id}')
     await query.answer(text.stop_monitoring_product)
 
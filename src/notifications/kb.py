@@ -1,11 +1,16 @@
 from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup, KeyboardButton, ReplyKeyboardMarkup, ReplyKeyboardRemove
 
+from src.notifications.states import DigestModeCallback
+
 
 menu = [
         [
             KeyboardButton(text="Мои товары"),
             KeyboardButton(text="Начать отслеживание"),
             KeyboardButton(text="О боте"),
+        ],
+        [
+            KeyboardButton(text="Уведомления"),
         ]
     ]
 
@@ -51,3 +56,12 @@ def create_include_sales(callback_data_include, callback_data_not_include) -> In
         [InlineKeyboardButton(text="Не учитывать", callback_data=callback_data_not_include)]
     ])
     return inline_keyboard
+
+
+def create_digest_mode_keyboard(modes: dict[str, str], current_mode: str) -> InlineKeyboardMarkup:
+    inline_keyboard = InlineKeyboardMarkup(inline_keyboard=[
+        [InlineKeyboardButton(text=f'✅ {title}' if mode == current_mode else title,
+                              callback_data=DigestModeCallback(mode=mode).pack())]
+        for mode, title in modes.items()
+    ])
+    return inline_keyboard
@@ -22,3 +22,5 @@ class ChooseIsIncludeSales(CallbackData, prefix='sales'):
     is_include: str
 
 
+class DigestModeCallback(CallbackData, prefix='digest'):
+    mode: str
@@ -8,12 +8,18 @@ menu = "📍 Главное меню"
 
 
 get_link = "Отправьте ссылку на товар."
+checking_product = "⏳ Проверяем цену товара, это займет несколько секунд..."
 parser_not_found = 'Бот работает только с озоном, мега, вайлд'
 invalid_link ="Проверьте, пожалуйста, вашу ссылку и отправьте заново"
 price_or_name_not_detected = ('Не удалось добавить в отслеживаемые ваш товар. Проверьте вашу ссылку и повторите, пожалуйста,'
                               'операцию позднее!')
+product_check_failed = 'Не удалось проверить товар из-за ошибки. Повторите, пожалуйста, операцию позднее!'
 get_price = "Введите цену оповещения"
 get_sales = "Учитывать бонусы / клубные карты?"
 product_added = 'Товар добавлен'
 stop_monitoring_product = 'Товар больше не отслеживается!'
-products_are_not_being_monitored = 'Вы пока еще не отслеживаете никакие товары!'
\ No newline at end of file
+products_are_not_being_monitored = 'Вы пока еще не отслеживаете никакие товары!'
+choose_digest_mode = ('Как присылать изменения цен?\n'
+                      '• Сразу - отдельным сообщением при каждом изменении\n'
+                      '• Раз в час / раз в день - одной сводкой по всем товарам')
+digest_mode_changed = 'Режим уведомлений изменен'
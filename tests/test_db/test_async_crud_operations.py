@@ -0,0 +1,85 @@
+import os
+import unittest
+from unittest import IsolatedAsyncioTestCase
+from unittest.mock import patch
+
+from dotenv import load_dotenv
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+
+from db.async_crud_operations import AsyncUsersCRUD, AsyncUserProductsCRUD
+from db.models import Base
+
+load_dotenv()
+
+
+DB_USER = os.getenv('DB_USER')
+DB_PASS = os.getenv('DB_PASS')
+DB_HOST = os.getenv('DB_HOST')
+DB_NAME = os.getenv('DB_NAME')
+
+TEST_DATABASE_URL = f"postgresql://{DB_USER}:{DB_PASS}@{DB_HOST}/{DB_NAME}_test"
+TEST_ASYNC_DATABASE_URL = f"postgresql+asyncpg://{DB_USER}:{DB_PASS}@{DB_HOST}/{DB_NAME}_test"
+engine = create_engine(TEST_DATABASE_URL)
+
+
+class TestAsyncCRUD(IsolatedAsyncioTestCase):
+    @classmethod
+    def setUpClass(cls):
+        Base.metadata.create_all(bind=engine)
+
+    @classmethod
+    def tearDownClass(cls):
+        Base.metadata.drop_all(bind=engine)
+
+    async def asyncSetUp(self):
+        self.async_engine = create_async_engine(TEST_ASYNC_DATABASE_URL)
+        test_async_session = async_sessionmaker(self.async_engine, class_=AsyncSession, expire_on_commit=False)
+        session_patcher = patch('db.async_crud_operations.async_session', test_async_session)
+        session_patcher.start()
+        self.addCleanup(session_patcher.stop)
+
+    async def asyncTearDown(self):
+        await self.async_engine.dispose()
+
+    async def test_add_new_user(self):
+        user_id = await AsyncUsersCRUD.add_new_user_and_get_user_id(555)
+        same_user_id = await AsyncUsersCRUD.add_new_user_and_get_user_id(555)
+
+        self.assertIsInstance(user_id, int)
+        self.assertEqual(user_id, same_user_id)
+
+    async def test_add_get_and_delete_user_product(self):
+        user_product_id = await AsyncUserProductsCRUD.add_user_product(
+            telegram_id=777, product_url='https://www.ozon.ru/product/1/', is_take_into_account_bonuses=True,
+            threshold_price=100, last_product_price=200, product_name='Товар', is_any_change=False)
+
+        user_products = await AsyncUserProductsCRUD.get_user_products_for_handler(777)
+
+        self.assertEqual([user_product.id for user_product in user_products], [user_product_id])
+        self.assertEqual(user_products[0].products.product_name, 'Товар')
+        self.assertEqual(user_products[0].users.telegram_id, 777)
+
+        await AsyncUserProductsCRUD.delete_user_products(user_product_id)
+        self.assertEqual(await AsyncUserProductsCRUD.get_user_products_for_handler(777), [])
+        self.assertEqual(await AsyncUsersCRUD.get_digest_mode(777), 'immediate')
+
+    async def test_add_same_product_from_other_link(self):
+        first_id = await AsyncUserProductsCRUD.add_user_product(
+            telegram_id=778, product_url='https://www.ozon.ru/product/phone-2/?sh=a', is_take_into_account_bonuses=True,
+            threshold_price=100, last_product_price=200, product_name='Товар', is_any_change=False)
+        second_id = await AsyncUserProductsCRUD.add_user_product(
+            telegram_id=778, product_url='https://ozon.ru/product/2/', is_take_into_account_bonuses=False,
+            threshold_price=150, last_product_price=190, product_name='Товар', is_any_change=False)
+
+        user_products = await AsyncUserProductsCRUD.get_user_products_for_handler(778)
+
+        self.assertEqual(first_id, second_id)
+        self.assertEqual(len(user_products), 1)
+        self.assertEqual(user_products[0].threshold_price, 150)
+        self.assertEqual(user_products[0].products.last_price, 200)
+        self.assertEqual(user_products[0].products.url, 'https://www.ozon.ru/product/phone-2/?sh=a')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,13 +1,16 @@
+import datetime
 import os
 import unittest
 from unittest.mock import patch
 
 from dotenv import load_dotenv
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, text
+from sqlalchemy.dialects import postgresql
 from sqlalchemy.orm import sessionmaker
 
-from db.crud_operations import UsersCRUD, ProductsCRUD
-from db.models import Users, Products
+from db.crud_operations import UsersCRUD, ProductsCRUD, PriceObservationsCRUD, UserProductsCRUD, \
+    ProductScheduleCRUD, ScheduledCheck, PendingNotificationsCRUD
+from db.models import Users, Products, PriceObservations, PriceRollups
 
 load_dotenv()
 
@@ -125,6 +128,30 @@ class TestProductCRUD(unittest.TestCase):
         self.assertEqual(product_1.product_name, product_name + " Updated")
         self.assertEqual(product_1.last_price, last_price + 10)
 
+    def test_add_new_product_same_article(self):
+        product_id_1 = ProductsCRUD.add_new_product('https://www.ozon.ru/product/phone-123/?sh=abc', 100, 'Phone')
+        product_id_2 = ProductsCRUD.add_new_product('https://ozon.ru/product/phone-new-name-123/', 90, 'Phone')
+
+        self.assertEqual(product_id_1, product_id_2)
+        self.assertEqual(ProductsCRUD.get_product_id('https://ozon.ru/product/123'), product_id_1)
+        product = self.session.get(Products, product_id_1)
+        self.assertEqual((product.marketplace, product.article_id), ('ozon.ru', '123'))
+
+    def test_backfill_product_keys(self):
+        self.session.add_all([Products(url='https://www.ozon.ru/product/phone-321/', last_price=100, product_name='A'),
+                              Products(url='https://ozon.ru/product/phone-321/?sh=x', last_price=100, product_name='A')])
+        self.session.commit()
+        UserProductsCRUD.add_user_product(telegram_id=3001, product_url='https://ozon.ru/product/phone-321/?sh=x',
+                                          is_take_into_account_bonuses=True, threshold_price=0,
+                                          last_product_price=100, product_name='A', is_any_change=True)
+
+        self.assertEqual(ProductsCRUD.backfill_product_keys(), 1)
+        self.session.expire_all()
+
+        products = self.session.query(Products).filter_by(article_id='321').all()
+        self.assertEqual(len(products), 1)
+        self.assertEqual(ProductsCRUD.get_product_id('https://ozon.ru/product/321'), products[0].id)
+
     def test_add_new_product_invalid_input(self):
         product_url = "https://example.com/product"
         invalid_product_url = [1]
@@ -190,6 +217,243 @@ class TestProductCRUD(unittest.TestCase):
         self.assertEqual(prod_obj_new.url, prod_obj_old_url)
         # self.assertNotEqual(prod_obj_new.last_price, prod_obj_old_price)
 
+    def test_set_new_product_prices(self):
+        product_id_1 = ProductsCRUD.add_new_product('https://example.com/bulk-1', 100, 'Bulk 1')
+        product_id_2 = ProductsCRUD.add_new_product('https://example.com/bulk-2', 200, 'Bulk 2')
+
+        written = ProductsCRUD.set_new_product_prices({product_id_1: 150, product_id_2: 250, 233541: 1})
+
+        self.assertEqual(written, 2)
+        self.assertEqual(self.session.get(Products, product_id_1).last_price, 150)
+        self.assertEqual(self.session.get(Products, product_id_2).last_price, 250)
+        self.assertEqual(ProductsCRUD.set_new_product_prices({}), 0)
+        with self.assertRaises(ValueError):
+            ProductsCRUD.set_new_product_prices({product_id_1: -1})
+
+
+class TestUserProductsCRUD(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        from db.models import Base
+        Base.metadata.create_all(bind=engine)
+
+    @classmethod
+    def tearDownClass(cls):
+        from db.models import Base
+        Base.metadata.drop_all(bind=engine)
+
+    def test_iter_subscriptions_for_monitoring(self):
+        for telegram_id in (1001, 1002):
+            UserProductsCRUD.add_user_product(telegram_id=telegram_id, product_url='https://example.com/stream',
+                                              is_take_into_account_bonuses=False, threshold_price=50,
+                                              last_product_price=100, product_name='Stream',
+                                              is_any_change=True)
+
+        subscriptions = list(UserProductsCRUD.iter_subscriptions_for_monitoring(chunk_size=1))
+
+        self.assertEqual(sorted(subscription.telegram_id for subscription in subscriptions), [1001, 1002])
+        self.assertTrue(all(subscription.url == 'https://example.com/stream' for subscription in subscriptions))
+        self.assertEqual(subscriptions[0].last_price, 100)
+
+    def test_add_user_product_for_new_user(self):
+        user_product_id = UserProductsCRUD.add_user_product(
+            telegram_id=1004, product_url='https://example.com/new-user', is_take_into_account_bonuses=False,
+            threshold_price=50, last_product_price=100, product_name='New user', is_any_change=True)
+
+        self.assertIsInstance(user_product_id, int)
+        with Session() as session:
+            self.assertEqual(session.query(Users).filter_by(telegram_id=1004).one().digest_mode, 'immediate')
+
+    def test_add_user_product_twice_updates_subscription(self):
+        for threshold_price in (50, 40):
+            UserProductsCRUD.add_user_product(telegram_id=1003, product_url='https://example.com/twice',
+                                              is_take_into_account_bonuses=False, threshold_price=threshold_price,
+                                              last_product_price=100, product_name='Twice', is_any_change=False)
+
+        user_products = UserProductsCRUD.get_user_products_for_handler(1003)
+
+        self.assertEqual(len(user_products), 1)
+        self.assertEqual(user_products[0].threshold_price, 40)
+        self.assertEqual(user_products[0].products.url, 'https://example.com/twice')
+
+
+class TestQueryPlans(unittest.TestCase):
+    """Горячие запросы должны находить строки по индексам, а не просматривать таблицы целиком"""
+
+    @classmethod
+    def setUpClass(cls):
+        from db.models import Base
+        Base.metadata.create_all(bind=engine)
+
+    @classmethod
+    def tearDownClass(cls):
+        from db.models import Base
+        Base.metadata.drop_all(bind=engine)
+
+    def explain(self, query) -> str:
+        sql = str(query.compile(dialect=postgresql.dialect(), compile_kwargs={'literal_binds': True}))
+        with engine.connect() as connection:
+            # на пустых таблицах полный просмотр всегда дешевле, поэтому запрещаем его там, где есть индекс
+            connection.execute(text('SET enable_seqscan = off'))
+            return '\n'.join(row[0] for row in connection.execute(text(f'EXPLAIN {sql}')))
+
+    def test_user_products_query_uses_indexes(self):
+        plan = self.explain(UserProductsCRUD.user_products_query(777))
+
+        self.assertNotIn('Seq Scan', plan)
+        self.assertNotIn('SubPlan', plan)
+
+    def test_subscriptions_query_uses_indexes(self):
+        plan = self.explain(UserProductsCRUD.subscriptions_query(product_ids=[1, 2, 3]))
+
+        self.assertNotIn('Seq Scan on user_products', plan)
+        self.assertNotIn('Seq Scan on products', plan)
+
+
+class TestPriceObservationsCRUD(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        from db.models import Base
+        Base.metadata.create_all(bind=engine)
+
+    @classmethod
+    def tearDownClass(cls):
+        from db.models import Base
+        Base.metadata.drop_all(bind=engine)
+
+    def setUp(self):
+        self.session = Session()
+        self.product_id = ProductsCRUD.add_new_product('https://example.com/history', 100, 'History')
+
+    def tearDown(self):
+        self.session.rollback()
+
+    def test_add_observations_skips_unchanged_price(self):
+        self.assertEqual(PriceObservationsCRUD.add_observations({self.product_id: 100}), 1)
+        self.assertEqual(PriceObservationsCRUD.add_observations({self.product_id: 100}), 0)
+        self.assertEqual(PriceObservationsCRUD.add_observations({self.product_id: 90}), 1)
+
+        since = datetime.datetime.utcnow() - datetime.timedelta(hours=1)
+        prices = [price for _, price in PriceObservationsCRUD.get_observations(self.product_id, since)]
+        self.assertEqual(prices, [100, 90])
+
+        stats = PriceObservationsCRUD.get_price_stats(self.product_id, since)
+        self.assertEqual((stats['min_price'], stats['max_price'], stats['observations']), (90, 100, 2))
+        self.assertAlmostEqual(stats['avg_price'], 95)
+
+    def test_downsample_observations(self):
+        old = datetime.datetime.utcnow() - datetime.timedelta(days=40)
+        self.session.add_all([
+            PriceObservations(product_id=self.product_id, price=120, observed_at=old),
+            PriceObservations(product_id=self.product_id, price=80, observed_at=old + datetime.timedelta(hours=1)),
+            PriceObservations(product_id=self.product_id, price=100, observed_at=old + datetime.timedelta(days=1)),
+        ])
+        self.session.commit()
+
+        deleted = PriceObservationsCRUD.downsample_observations(datetime.datetime.utcnow())
+
+        self.assertEqual(deleted, 2)
+        rollup = self.session.query(PriceRollups).filter_by(product_id=self.product_id).one()
+        self.assertEqual((rollup.min_price, rollup.max_price, rollup.observations), (80, 120, 2))
+
+        stats = PriceObservationsCRUD.get_price_stats(self.product_id, old - datetime.timedelta(days=1))
+        self.assertEqual((stats['min_price'], stats['max_price'], stats['observations']), (80, 120, 3))
+
+
+class TestProductScheduleCRUD(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        from db.models import Base
+        Base.metadata.create_all(bind=engine)
+
+    @classmethod
+    def tearDownClass(cls):
+        from db.models import Base
+        Base.metadata.drop_all(bind=engine)
+
+    def test_schedule_due_products(self):
+        UserProductsCRUD.add_user_product(telegram_id=2001, product_url='https://example.com/scheduled',
+                                          is_take_into_account_bonuses=False, threshold_price=50,
+                                          last_product_price=100, product_name='Scheduled', is_any_change=True)
+        product_id = ProductsCRUD.get_product_id('https://example.com/scheduled')
+
+        self.assertGreaterEqual(ProductScheduleCRUD.add_missing_schedules(), 1)
+        self.assertEqual(ProductScheduleCRUD.add_missing_schedules(), 0)
+        due_products = ProductScheduleCRUD.claim_due_products(limit=10, worker_id='first', lease_timeout=60)
+        self.assertEqual(due_products[product_id], 'https://example.com/scheduled')
+        self.assertNotIn(product_id, ProductScheduleCRUD.claim_due_products(limit=10, worker_id='second',
+                                                                           lease_timeout=60))
+        self.assertGreaterEqual(ProductScheduleCRUD.count_leased_due_products(), 1)
+
+        now = datetime.datetime.utcnow()
+        check = ScheduledCheck(product_id=product_id, next_check_at=now + datetime.timedelta(hours=1),
+                               priority=1.5, volatility=0.1, consecutive_failures=0, last_checked_at=now)
+        self.assertEqual(ProductScheduleCRUD.save_checks([check], worker_id='second'), 0)
+        self.assertEqual(ProductScheduleCRUD.save_checks([check], worker_id='first'), 1)
+        self.assertNotIn(product_id, ProductScheduleCRUD.claim_due_products(
+            limit=10, worker_id='second', now=now + datetime.timedelta(minutes=30), lease_timeout=60))
+        self.assertIn(product_id, ProductScheduleCRUD.claim_due_products(
+            limit=10, worker_id='second', now=now + datetime.timedelta(hours=2), lease_timeout=60))
+
+        subscription = next(UserProductsCRUD.iter_subscriptions_for_monitoring(product_ids=[product_id]))
+        self.assertAlmostEqual(subscription.volatility, 0.1)
+
+    def test_renew_and_release_leases(self):
+        UserProductsCRUD.add_user_product(telegram_id=2002, product_url='https://example.com/leased',
+                                          is_take_into_account_bonuses=False, threshold_price=50,
+                                          last_product_price=100, product_name='Leased', is_any_change=True)
+        product_id = ProductsCRUD.get_product_id('https://example.com/leased')
+        ProductScheduleCRUD.add_missing_schedules()
+        now = datetime.datetime.utcnow()
+        self.assertIn(product_id, ProductScheduleCRUD.claim_due_products(limit=10, worker_id='first',
+                                                                         lease_timeout=60, now=now))
+
+        # аренда истекла, и товар закрепил за собой следующий тик
+        later = now + datetime.timedelta(minutes=5)
+        self.assertIn(product_id, ProductScheduleCRUD.claim_due_products(limit=10, worker_id='second',
+                                                                         lease_timeout=60, now=later))
+        self.assertEqual(ProductScheduleCRUD.renew_leases([product_id], worker_id='first', lease_timeout=60), [])
+        self.assertEqual(ProductScheduleCRUD.renew_leases([product_id], worker_id='second', lease_timeout=60),
+                         [product_id])
+
+        self.assertEqual(ProductScheduleCRUD.release_leases([product_id], worker_id='first'), 0)
+        self.assertEqual(ProductScheduleCRUD.release_leases([product_id], worker_id='second'), 1)
+        self.assertIn(product_id, ProductScheduleCRUD.claim_due_products(limit=10, worker_id='third',
+                                                                         lease_timeout=60))
+
+
+class TestPendingNotificationsCRUD(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        from db.models import Base
+        Base.metadata.create_all(bind=engine)
+
+    @classmethod
+    def tearDownClass(cls):
+        from db.models import Base
+        Base.metadata.drop_all(bind=engine)
+
+    def test_delete_only_sent_notifications(self):
+        UserProductsCRUD.add_user_product(telegram_id=4001, product_url='https://example.com/digest',
+                                          is_take_into_account_bonuses=False, threshold_price=50,
+                                          last_product_price=100, product_name='Digest', is_any_change=True)
+        product_id = ProductsCRUD.get_product_id('https://example.com/digest')
+        change = {'chat_id': 4001, 'product_id': product_id, 'product_name': 'Digest',
+                  'product_url': 'https://example.com/digest', 'old_price': 100, 'new_price': 90}
+        PendingNotificationsCRUD.add_pending_notifications([change])
+
+        notifications = PendingNotificationsCRUD.get_pending_notifications(['immediate'])
+        self.assertEqual([notification.new_price for notification in notifications], [90])
+        self.assertEqual(PendingNotificationsCRUD.get_pending_notifications(['immediate']), notifications)
+
+        # цена изменилась еще раз, пока сводка отправлялась
+        PendingNotificationsCRUD.add_pending_notifications([{**change, 'new_price': 80}])
+        self.assertEqual(PendingNotificationsCRUD.delete_sent_notifications(notifications), 0)
+
+        notifications = PendingNotificationsCRUD.get_pending_notifications(['immediate'])
+        self.assertEqual(PendingNotificationsCRUD.delete_sent_notifications(notifications), 1)
+        self.assertEqual(PendingNotificationsCRUD.get_pending_notifications(['immediate']), [])
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,58 @@
+import unittest
+from unittest.mock import patch
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import DBAPIError
+
+from config.database_config import get_pool_settings, TimedQueuePool, log_slow_queries
+from src.monitoring.metrics import metrics
+
+
+class TestEngineSettings(unittest.TestCase):
+    def setUp(self):
+        metrics.reset()
+
+    def test_pool_settings_by_role(self):
+        self.assertEqual(get_pool_settings('worker')['pool_size'], 2)
+        self.assertEqual(get_pool_settings('beat')['max_overflow'], 1)
+        self.assertTrue(get_pool_settings('bot')['pool_pre_ping'])
+        self.assertFalse(get_pool_settings('bot')['echo'])
+
+    def test_pool_size_from_env(self):
+        with patch('config.database_config.DB_POOL_SIZE', '7'):
+            self.assertEqual(get_pool_settings('worker')['pool_size'], 7)
+
+    def test_pool_counts_checkouts(self):
+        engine = create_engine('sqlite://', poolclass=TimedQueuePool, pool_size=1)
+        for _ in range(2):
+            with engine.connect() as connection:
+                connection.execute(text('SELECT 1'))
+
+        self.assertEqual(metrics.get('db.pool_checkouts'), 2)
+        self.assertGreaterEqual(metrics.get('db.pool_wait_seconds'), 0)
+
+    def test_slow_queries_are_logged(self):
+        engine = create_engine('sqlite://')
+        log_slow_queries(engine, threshold=0)
+
+        with self.assertLogs('config.database_config', level='WARNING') as logs, engine.connect() as connection:
+            connection.execute(text('SELECT 1'))
+
+        self.assertEqual(metrics.get('db.slow_queries'), 1)
+        self.assertIn('SELECT 1', logs.output[0])
+
+    def test_failed_query_does_not_break_timing(self):
+        engine = create_engine('sqlite://')
+        log_slow_queries(engine, threshold=0)
+
+        with self.assertLogs('config.database_config', level='WARNING') as logs, engine.connect() as connection:
+            with self.assertRaises(DBAPIError):
+                connection.execute(text('SELECT * FROM missing_table'))
+            connection.execute(text('SELECT 2'))
+
+        self.assertEqual(metrics.get('db.slow_queries'), 1)
+        self.assertIn('SELECT 2', logs.output[0])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,46 @@
+import threading
+
+
+class FakeRedis:
+    """Минимальная замена Redis для тестов, без истечения ключей.
+
+    register_script поддерживает только скрипт снятия блокировки: удалить ключ, если в нем наш токен.
+    """
+
+    def __init__(self):
+        self.data = {}
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def set(self, key, value, ex=None, nx=False):
+        with self.lock:
+            if nx and key in self.data:
+                return None
+            self.data[key] = value.encode() if isinstance(value, str) else value
+            return True
+
+    def exists(self, key):
+        return int(key in self.data)
+
+    def delete(self, key):
+        self.data.pop(key, None)
+
+    def incr(self, key):
+        with self.lock:
+            self.data[key] = int(self.data.get(key, 0)) + 1
+            return self.data[key]
+
+    def expire(self, key, seconds):
+        pass
+
+    def register_script(self, script):
+        def compare_and_delete(keys, args):
+            with self.lock:
+                if self.data.get(keys[0]) != str(args[0]).encode():
+                    return 0
+                del self.data[keys[0]]
+                return 1
+
+        return compare_and_delete
@@ -0,0 +1,75 @@
+import unittest
+from unittest.mock import MagicMock, patch
+
+from src.monitoring.custom_exceptions import ProductNotFound
+from src.monitoring.parsers.base_parser import BaseParser
+from src.monitoring.parsers.selector_registry import SelectorRegistry
+
+
+class SimpleParser(BaseParser):
+    product_price_classes = ['price', 'price-final.wallet']
+    product_name_classes = ['0l8', 'title']
+    wait_timeout = 0.1
+    jitter = (0, 0)
+
+
+class TestBaseParser(unittest.TestCase):
+    def setUp(self):
+        registry_patcher = patch('src.monitoring.parsers.base_parser.selector_registry',
+                                 SelectorRegistry(is_persistent=False))
+        self.selector_registry = registry_patcher.start()
+        self.addCleanup(registry_patcher.stop)
+
+    def test_class_to_css(self):
+        self.assertEqual(BaseParser._class_to_css('l8o.ol8.l2p'), '.l8o.ol8.l2p')
+        self.assertEqual(BaseParser._class_to_css('0l8'), '.\\30 l8')
+
+    @patch('src.monitoring.parsers.base_parser.time.sleep')
+    def test_get_product_price_and_name_single_round_trip(self, mock_sleep):
+        driver = MagicMock()
+        driver.execute_script.return_value = {'price': [1, '1\xa0299 ₽'], 'name': [0, 'Товар']}
+        parser = SimpleParser(driver=driver, product_url='https://www.example.com/product')
+
+        product_price, product_name = parser.get_product_price_and_name()
+
+        self.assertEqual((product_price, product_name), (1299, 'Товар'))
+        driver.execute_script.assert_called_once()
+        self.assertEqual(driver.execute_script.call_args.args[1], ['.price', '.price-final.wallet'])
+        mock_sleep.assert_not_called()
+
+    def test_matched_selector_tried_first(self):
+        driver = MagicMock()
+        driver.execute_script.return_value = {'price': [1, '100'], 'name': [1, 'Товар']}
+        parser = SimpleParser(driver=driver, product_url='https://www.example.com/product')
+
+        parser.get_product_price_and_name()
+        parser.get_product_price_and_name()
+
+        price_css, name_css = driver.execute_script.call_args.args[1:]
+        self.assertEqual(price_css, ['.price-final.wallet', '.price'])
+        self.assertEqual(name_css, ['.title', '.\\30 l8'])
+
+    @patch('config.selenium_config.send')
+    def test_resources_blocked_once_per_marketplace(self, mock_send):
+        driver = MagicMock(spec=['get', 'execute_script'])
+        driver.execute_script.return_value = {'price': [0, '100'], 'name': [0, 'Товар']}
+
+        SimpleParser(driver=driver, product_url='https://www.ozon.ru/product/1/').get_product_price_and_name()
+        SimpleParser(driver=driver, product_url='https://ozon.ru/product/2/').get_product_price_and_name()
+
+        blocked_urls = [call.args[2]['urls'] for call in mock_send.call_args_list
+                        if call.args[1] == 'Network.setBlockedURLs']
+        self.assertEqual(len(blocked_urls), 1)
+        self.assertIn('*ir.ozone.ru/s3/multimedia*', blocked_urls[0])
+
+    def test_get_product_price_and_name_timeout(self):
+        driver = MagicMock()
+        driver.execute_script.return_value = {'price': None, 'name': [0, 'Товар']}
+        parser = SimpleParser(driver=driver, product_url='https://example.com/product')
+
+        with self.assertRaises(ProductNotFound):
+            parser.get_product_price_and_name()
+
+
+if __name__ == '__main__':
+    unittest.main()
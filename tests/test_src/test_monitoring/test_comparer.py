@@ -1,5 +1,4 @@
 import unittest
-from unittest import IsolatedAsyncioTestCase
 from unittest.mock import patch
 
 from src.monitoring.comparer import PriceComparer
@@ -71,8 +70,7 @@ class TestPriceComparer(unittest.TestCase):
                                                          invalid_user_id)
 
     @patch('src.monitoring.comparer.PriceComparer._notify_user')
-    @patch('db.crud_operations.ProductsCRUD.set_new_product_price')
-    def test_compare_prices_and_notify_user_any_change(self, mock_set_new_price, mock_notify_user):
+    def test_compare_prices_and_notify_user_any_change(self, mock_notify_user):
         is_any_change = True
         threshold_price = 500
         product_last_price = 600
@@ -80,16 +78,15 @@ class TestPriceComparer(unittest.TestCase):
         product_id = 1
         user_id = 123
 
-        PriceComparer.compare_prices_and_notify_user(is_any_change, threshold_price,
-                                                     product_last_price, product_price,
-                                                     product_id, user_id)
+        new_price = PriceComparer.compare_prices_and_notify_user(is_any_change, threshold_price,
+                                                                 product_last_price, product_price,
+                                                                 product_id, user_id)
 
         mock_notify_user.assert_called_once()
-        mock_set_new_price.assert_called_once_with(product_id=product_id, new_price=product_price)
+        self.assertEqual(new_price, product_price)
 
     @patch('src.monitoring.comparer.PriceComparer._notify_user')
-    @patch('db.crud_operations.ProductsCRUD.set_new_product_price')
-    def test_compare_prices_and_notify_user_without_change(self, mock_set_new_price, mock_notify_user):
+    def test_compare_prices_and_notify_user_without_change(self, mock_notify_user):
         is_any_change = True
         threshold_price = 500
         product_last_price = 600
@@ -102,7 +99,6 @@ class TestPriceComparer(unittest.TestCase):
                                                              product_id, user_id)
 
         mock_notify_user.assert_not_called()
-        mock_set_new_price.assert_not_called()
         self.assertIsNone(value)
 
     def test_compare_invalid_input(self):
@@ -188,9 +184,27 @@ class TestPriceComparer(unittest.TestCase):
         self.assertIsNone(PriceComparer._validate_int(v_4))
 
 
-class TestPriceComparer(IsolatedAsyncioTestCase):
-    @patch('db.crud_operations.ProductsCRUD.set_new_product_price')
-    async def test_compare_prices_and_notify_user_real_price_more(self, mock_set_new_price):
+class TestNotifyUser(unittest.TestCase):
+    @patch('src.monitoring.comparer.digest_buffer')
+    @patch('src.monitoring.comparer.notification_dispatcher')
+    def test_notify_user_routes_by_digest_mode(self, mock_dispatcher, mock_digest_buffer):
+        notification = dict(product_last_price=600, product_new_price=400, chat_id=123, product_id=1,
+                            product_url='https://www.ozon.ru/product/1/', product_name='Товар')
+
+        PriceComparer._notify_user(**notification)
+        PriceComparer._notify_user(**notification, digest_mode='hourly')
+
+        mock_dispatcher.enqueue.assert_called_once()
+        self.assertEqual(mock_dispatcher.enqueue.call_args.kwargs['chat_id'], 123)
+        mock_digest_buffer.add.assert_called_once_with(chat_id=123, product_id=1, product_name='Товар',
+                                                       product_url='https://www.ozon.ru/product/1/',
+                                                       old_price=600, new_price=400)
+
+
+class TestPriceComparer(unittest.TestCase):
+    @patch('src.monitoring.comparer.digest_buffer.add')
+    @patch('src.monitoring.comparer.notification_dispatcher.enqueue')
+    def test_compare_prices_and_notify_user_price_more(self, mock_enqueue, mock_digest_add):
         is_any_change = True
         threshold_price = 500
         product_last_price = 600
@@ -200,16 +214,21 @@ class TestPriceComparer(IsolatedAsyncioTestCase):
         product_name = 'ASUS PRO MAX'
         product_url = 'www.goolge.com'
 
-        await PriceComparer.compare_prices_and_notify_user(
+        new_price = PriceComparer.compare_prices_and_notify_user(
             is_any_change, threshold_price, product_last_price, product_price,
             product_id, user_id, product_url, product_name
         )
 
-        mock_set_new_price.assert_called_once()
+        self.assertEqual(new_price, product_price)
+        mock_enqueue.assert_called_once()
+        self.assertEqual(mock_enqueue.call_args.kwargs['chat_id'], user_id)
+        self.assertIn('Цена увеличилась на 100 руб', mock_enqueue.call_args.kwargs['text'])
+        mock_digest_add.assert_not_called()
 
-    @patch('db.crud_operations.ProductsCRUD.set_new_product_price')
-    async def test_compare_prices_and_notify_user_real_price_lower(self, mock_set_new_price):
-        is_any_change = True
+    @patch('src.monitoring.comparer.digest_buffer.add')
+    @patch('src.monitoring.comparer.notification_dispatcher.enqueue')
+    def test_compare_prices_and_notify_user_price_lower_in_digest(self, mock_enqueue, mock_digest_add):
+        is_any_change = False
         threshold_price = 500
         product_last_price = 600
         product_price = 500
@@ -218,12 +237,16 @@ class TestPriceComparer(IsolatedAsyncioTestCase):
         product_name = 'ASUS PRO MAX'
         product_url = 'www.goolge.com'
 
-        await PriceComparer.compare_prices_and_notify_user(
+        new_price = PriceComparer.compare_prices_and_notify_user(
             is_any_change, threshold_price, product_last_price, product_price,
-            product_id, user_id, product_url, product_name
+            product_id, user_id, product_url, product_name, digest_mode='hourly'
         )
 
-        mock_set_new_price.assert_called_once()
+        self.assertEqual(new_price, product_price)
+        mock_enqueue.assert_not_called()
+        mock_digest_add.assert_called_once_with(chat_id=user_id, product_id=product_id, product_name=product_name,
+                                                product_url=product_url, old_price=product_last_price,
+                                                new_price=product_price)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,88 @@
+import unittest
+from unittest.mock import MagicMock, PropertyMock
+
+from selenium.common import WebDriverException
+
+from src.monitoring.driver_pool import WebDriverPool, DriverPoolExhausted
+
+
+class TestWebDriverPool(unittest.TestCase):
+    def setUp(self):
+        self.created_drivers = []
+
+        def driver_factory():
+            driver = MagicMock()
+            self.created_drivers.append(driver)
+            return driver
+
+        self.driver_factory = driver_factory
+
+    def test_lease_reuses_driver(self):
+        pool = WebDriverPool(self.driver_factory, max_size=2, idle_timeout=60, max_page_loads=10, lease_timeout=1)
+
+        with pool.lease() as driver_1:
+            pass
+        with pool.lease() as driver_2:
+            pass
+
+        self.assertIs(driver_1, driver_2)
+        self.assertEqual(len(self.created_drivers), 1)
+        self.assertEqual(pool.size, 1)
+        self.assertEqual(pool.idle_count, 1)
+
+    def test_lease_is_bounded(self):
+        pool = WebDriverPool(self.driver_factory, max_size=1, idle_timeout=60, max_page_loads=10, lease_timeout=0.05)
+
+        with pool.lease():
+            with self.assertRaises(DriverPoolExhausted):
+                with pool.lease():
+                    pass
+
+    def test_recycle_after_max_page_loads(self):
+        pool = WebDriverPool(self.driver_factory, max_size=1, idle_timeout=60, max_page_loads=2, lease_timeout=1)
+
+        for _ in range(3):
+            with pool.lease():
+                pass
+
+        self.assertEqual(len(self.created_drivers), 2)
+        self.created_drivers[0].quit.assert_called_once()
+
+    def test_broken_driver_replaced(self):
+        pool = WebDriverPool(self.driver_factory, max_size=1, idle_timeout=60, max_page_loads=10, lease_timeout=1)
+
+        with self.assertRaises(WebDriverException):
+            with pool.lease():
+                raise WebDriverException('session deleted')
+
+        with pool.lease() as driver:
+            pass
+
+        self.assertIsNot(driver, self.created_drivers[0])
+        self.created_drivers[0].quit.assert_called_once()
+
+    def test_dead_idle_driver_replaced(self):
+        pool = WebDriverPool(self.driver_factory, max_size=1, idle_timeout=60, max_page_loads=10, lease_timeout=1)
+
+        with pool.lease() as driver:
+            type(driver).current_url = PropertyMock(side_effect=WebDriverException('dead'))
+
+        with pool.lease() as new_driver:
+            pass
+
+        self.assertIsNot(new_driver, driver)
+        self.assertEqual(pool.size, 1)
+
+    def test_evict_idle(self):
+        pool = WebDriverPool(self.driver_factory, max_size=1, idle_timeout=0, max_page_loads=10, lease_timeout=1)
+
+        with pool.lease():
+            pass
+        pool.evict_idle()
+
+        self.assertEqual(pool.size, 0)
+        self.created_drivers[0].quit.assert_called_once()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,80 @@
+import os
+import unittest
+from unittest.mock import MagicMock, patch
+
+from src.monitoring.custom_exceptions import ProductNotFound
+from src.monitoring.parsers.html_parser import HtmlParser
+from src.monitoring.parsers.mega_market_parser import MegaMarketHtmlParser, MegaMarkerParser
+
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), 'fixtures')
+
+
+def load_fixture(name: str) -> str:
+    with open(os.path.join(FIXTURES_DIR, name), encoding='utf-8') as file:
+        return file.read()
+
+
+class SnapshotHtmlParser(HtmlParser):
+    product_price_classes = ['price-final']
+    product_name_classes = ['title']
+
+
+class TestHtmlParser(unittest.TestCase):
+    def test_parse_json_ld(self):
+        parser = SnapshotHtmlParser(driver=None, product_url='https://example.com/product')
+
+        self.assertEqual(parser.parse_html(load_fixture('json_ld_product.html')),
+                         (29990, 'Наушники Sony WH-1000XM5'))
+
+    def test_parse_next_data(self):
+        parser = SnapshotHtmlParser(driver=None, product_url='https://example.com/product')
+
+        self.assertEqual(parser.parse_html(load_fixture('next_data_product.html')),
+                         (41990, 'Кофемашина DeLonghi Magnifica S'))
+
+    def test_state_search_by_article(self):
+        state = {'recommendations': [{'id': 1, 'name': 'Чехол', 'price': 990}],
+                 'card': {'sku': '123', 'title': 'Смартфон', 'finalPrice': '54 990'}}
+        parser = SnapshotHtmlParser(driver=None, product_url='https://www.ozon.ru/product/smartfon-123/')
+
+        self.assertEqual(parser._find_product_in_state(state), (54990, 'Смартфон'))
+
+    def test_state_search_without_article(self):
+        state = {'recommendations': [{'id': 1, 'name': 'Чехол', 'price': 990}]}
+        parser = SnapshotHtmlParser(driver=None, product_url='https://example.com/product')
+
+        self.assertIsNone(parser._find_product_in_state(state))
+
+    def test_parse_without_price(self):
+        parser = SnapshotHtmlParser(driver=None, product_url='https://example.com/product')
+
+        with self.assertRaises(ProductNotFound):
+            parser.parse_html('<html><body><h1>Пусто</h1></body></html>')
+
+
+class TestMegaMarketHtmlParser(unittest.TestCase):
+    def test_parse_with_bonuses(self):
+        parser = MegaMarketHtmlParser(driver=None, product_url='https://megamarket.ru/catalog/details/iphone-15/')
+
+        self.assertEqual(parser.parse_html(load_fixture('megamarket_product.html')),
+                         (67990, 'Смартфон Apple iPhone 15 128GB Black'))
+
+    def test_parse_without_bonuses(self):
+        parser = MegaMarketHtmlParser(driver=None, product_url='https://megamarket.ru/catalog/details/iphone-15/',
+                                      is_consider_bonuses=False)
+
+        self.assertEqual(parser.parse_html(load_fixture('megamarket_product.html'))[0], 79990)
+
+    @patch.object(MegaMarkerParser, 'get_product_price_and_name', return_value=(100, 'browser'))
+    @patch('src.monitoring.parsers.html_parser.get_http_session')
+    def test_fallback_to_browser(self, mock_get_http_session, mock_browser_parse):
+        mock_get_http_session.return_value.get.return_value.text = '<html><body></body></html>'
+        parser = MegaMarketHtmlParser(driver=MagicMock(), product_url='https://megamarket.ru/catalog/details/iphone-15/')
+
+        self.assertEqual(parser.get_product_price_and_name(), (100, 'browser'))
+        mock_browser_parse.assert_called_once()
+
+
+if __name__ == '__main__':
+    unittest.main()
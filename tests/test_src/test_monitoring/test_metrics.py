@@ -0,0 +1,38 @@
+import threading
+import unittest
+
+from src.monitoring.metrics import Metrics
+
+
+class TestMetrics(unittest.TestCase):
+    def test_increment_from_threads(self):
+        metrics = Metrics()
+
+        def work():
+            for _ in range(1000):
+                metrics.increment('calls')
+
+        threads = [threading.Thread(target=work) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(metrics.get('calls'), 4000)
+        self.assertEqual(metrics.snapshot(), {'calls': 4000})
+        metrics.reset()
+        self.assertEqual(metrics.get('calls'), 0)
+
+    def test_log(self):
+        metrics = Metrics()
+        metrics.increment('sweep.processed', 3)
+        metrics.increment('db.pool_wait_seconds', 0.25)
+
+        with self.assertLogs('src.monitoring.metrics', level='INFO') as logs:
+            metrics.log()
+
+        self.assertIn('db.pool_wait_seconds=0.25, sweep.processed=3', logs.output[0])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -3,7 +3,11 @@ from unittest.mock import MagicMock, patch
 
 from selenium.webdriver.chrome.webdriver import WebDriver
 
-from src.monitoring.monitoring import driver_context, start_monitoring
+from db.crud_operations import MonitoredSubscription
+from src.monitoring.custom_exceptions import ProductNotFound, DomainUnavailable
+from src.monitoring.metrics import metrics
+from src.monitoring.monitoring import driver_context, start_monitoring, group_by_product, split_by_marketplace, \
+    summarize_sweep, check_products
 
 
 class TestDriverContext(unittest.TestCase):
@@ -14,17 +18,138 @@ class TestDriverContext(unittest.TestCase):
             self.assertIsNotNone(driver)
 
 
-# class TestStartMonitoring(unittest.TestCase):
-#     @patch('src.monitoring.monitoring.driver_context')
-#     @patch('src.monitoring.monitoring.parse_and_compare')
-#     @patch('db.crud_operations.UserProductsCRUD.get_user_products')
-#     def test_start_monitoring(self, mock_get_user_products, mock_parse_and_compare, mock_driver_context):
-#         mock_get_user_products.
-#
-#         start_monitoring()
-#
-#         mock_notify_user.assert_not_called()
-#         mock_set_new_price.assert_not_called()
+def make_subscription(product_id: int, telegram_id: int) -> MonitoredSubscription:
+    return MonitoredSubscription(product_id=product_id, url=f'https://www.ozon.ru/product/{product_id}/',
+                                 last_price=90, telegram_id=telegram_id, threshold_price=0,
+                                 is_any_change=True, is_take_into_account_bonuses=False)
+
+
+class TestStartMonitoring(unittest.TestCase):
+    def test_group_by_product(self):
+        subscriptions = [make_subscription(1, 10), make_subscription(1, 20), make_subscription(2, 10),
+                         make_subscription(3, 10), make_subscription(3, 20), make_subscription(3, 30)]
+
+        chunks = list(group_by_product(iter(subscriptions), chunk_size=3))
+
+        self.assertEqual([[len(group) for group in chunk] for chunk in chunks], [[2, 1], [3]])
+        self.assertTrue(all(subscription.product_id == 3 for subscription in chunks[1][0]))
+
+    @patch('src.monitoring.monitoring.result_cache.get_or_fetch', side_effect=lambda url, fetch: fetch())
+    @patch('src.monitoring.monitoring.throttled', side_effect=lambda marketplace, fetch: fetch())
+    @patch('db.crud_operations.ProductScheduleCRUD.renew_leases',
+           side_effect=lambda product_ids, worker_id, lease_timeout: product_ids)
+    @patch('db.crud_operations.ProductScheduleCRUD.save_checks')
+    @patch('db.crud_operations.ProductScheduleCRUD.count_leased_due_products', return_value=0)
+    @patch('db.crud_operations.ProductScheduleCRUD.claim_due_products',
+           return_value={product_id: f'https://www.ozon.ru/product/{product_id}/' for product_id in (1, 2, 3)})
+    @patch('db.crud_operations.ProductScheduleCRUD.add_missing_schedules')
+    @patch('db.crud_operations.PriceObservationsCRUD.add_observations')
+    @patch('db.crud_operations.ProductsCRUD.set_new_product_prices')
+    @patch('src.monitoring.monitoring.compare_and_notify', return_value=100)
+    @patch('src.monitoring.monitoring.fetch_product_price_and_name')
+    @patch('db.crud_operations.UserProductsCRUD.iter_subscriptions_for_monitoring')
+    def test_start_monitoring_fetches_each_product_once(self, mock_iter_subscriptions, mock_fetch,
+                                                        mock_compare_and_notify, mock_set_new_prices,
+                                                        mock_add_observations, mock_add_missing_schedules,
+                                                        mock_claim_due_products, mock_count_leased,
+                                                        mock_save_checks, mock_renew_leases, mock_throttled,
+                                                        mock_get_or_fetch):
+        mock_iter_subscriptions.return_value = iter([make_subscription(1, 10), make_subscription(1, 20),
+                                                     make_subscription(1, 30), make_subscription(2, 10),
+                                                     make_subscription(3, 10)])
+
+        def fetch(url):
+            if url.endswith('/3/'):
+                raise ProductNotFound('Не определена цена товара!')
+            return 100, 'name'
+
+        mock_fetch.side_effect = fetch
+        written_prices = []
+        mock_set_new_prices.side_effect = lambda new_prices: written_prices.append(dict(new_prices))
+        saved_checks = []
+        mock_save_checks.side_effect = lambda checks, worker_id: saved_checks.extend(checks)
+
+        start_monitoring()
+
+        self.assertEqual(mock_fetch.call_count, 3)
+        self.assertEqual(mock_compare_and_notify.call_count, 4)
+        self.assertEqual(written_prices, [{1: 100, 2: 100}])
+        mock_add_observations.assert_called_once()
+        self.assertEqual(mock_iter_subscriptions.call_args.kwargs['product_ids'], [1, 2, 3])
+        checks = {check.product_id: check for check in saved_checks}
+        self.assertEqual(checks[1].consecutive_failures, 0)
+        self.assertEqual(checks[3].consecutive_failures, 1)
+        lease_id = mock_claim_due_products.call_args.kwargs['worker_id']
+        self.assertEqual(mock_renew_leases.call_args.kwargs['worker_id'], lease_id)
+        self.assertEqual(mock_save_checks.call_args.kwargs['worker_id'], lease_id)
+
+    @patch('db.crud_operations.UserProductsCRUD.iter_subscriptions_for_monitoring')
+    @patch('db.crud_operations.ProductScheduleCRUD.count_leased_due_products', return_value=5)
+    @patch('db.crud_operations.ProductScheduleCRUD.claim_due_products', return_value={})
+    @patch('db.crud_operations.ProductScheduleCRUD.add_missing_schedules')
+    def test_start_monitoring_without_due_products(self, mock_add_missing_schedules, mock_claim_due_products,
+                                                    mock_count_leased, mock_iter_subscriptions):
+        contended_before = metrics.get('schedule.contended_products')
+
+        start_monitoring()
+
+        mock_iter_subscriptions.assert_not_called()
+        self.assertEqual(metrics.get('schedule.contended_products') - contended_before, 5)
+        self.assertTrue(mock_claim_due_products.call_args.kwargs['worker_id'])
+
+    def test_split_by_marketplace(self):
+        due_products = {1: 'https://www.ozon.ru/product/1/', 2: 'https://www.wildberries.ru/catalog/2/detail.aspx',
+                        3: 'https://ozon.ru/product/3/', 4: 'https://www.ozon.ru/product/4/'}
+
+        chunks = split_by_marketplace(due_products, chunk_size=2)
+
+        self.assertEqual(chunks, [('ozon.ru', [1, 3]), ('ozon.ru', [4]), ('wildberries.ru', [2])])
+
+    @patch('src.monitoring.monitoring.notification_dispatcher')
+    @patch('src.monitoring.monitoring.fetch_cached', return_value=(100, 'name'))
+    @patch('src.monitoring.monitoring.compare_and_notify', return_value=100)
+    @patch('db.crud_operations.ProductScheduleCRUD.save_checks')
+    @patch('db.crud_operations.PriceObservationsCRUD.add_observations')
+    @patch('db.crud_operations.ProductsCRUD.set_new_product_prices')
+    @patch('db.crud_operations.UserProductsCRUD.iter_subscriptions_for_monitoring')
+    def test_check_products_writes_results_before_waiting_for_notifications(
+            self, mock_iter_subscriptions, mock_set_new_prices, mock_add_observations, mock_save_checks,
+            mock_compare_and_notify, mock_fetch_cached, mock_dispatcher):
+        mock_iter_subscriptions.return_value = iter([make_subscription(1, 10)])
+        calls = []
+        mock_set_new_prices.side_effect = lambda new_prices: calls.append('set_new_product_prices')
+        mock_save_checks.side_effect = lambda checks, worker_id: calls.append('save_checks')
+        mock_dispatcher.flush.side_effect = lambda timeout: calls.append('flush') or True
+
+        summary = check_products([1], 'lease')
+
+        self.assertEqual(calls, ['set_new_product_prices', 'save_checks', 'flush'])
+        mock_add_observations.assert_called_once_with({1: 100})
+        self.assertEqual(summary['processed'], 1)
+        self.assertEqual(summary['new_prices'], 1)
+
+    @patch('src.monitoring.monitoring.notification_dispatcher')
+    @patch('src.monitoring.monitoring.fetch_cached', side_effect=DomainUnavailable('ozon.ru временно не проверяется'))
+    @patch('db.crud_operations.ProductScheduleCRUD.save_checks')
+    @patch('db.crud_operations.UserProductsCRUD.iter_subscriptions_for_monitoring')
+    def test_check_products_skipped_by_throttling_keeps_failures(self, mock_iter_subscriptions, mock_save_checks,
+                                                                 mock_fetch_cached, mock_dispatcher):
+        mock_iter_subscriptions.return_value = iter([make_subscription(1, 10)._replace(consecutive_failures=2)])
+
+        summary = check_products([1], 'lease')
+
+        check = mock_save_checks.call_args.args[0][0]
+        self.assertEqual(check.consecutive_failures, 2)
+        self.assertIsNone(check.last_checked_at)
+        self.assertEqual((summary['failed'], summary['skipped']), (0, 1))
+
+    def test_summarize_sweep(self):
+        summary = summarize_sweep([{'processed': 1, 'failed': 0, 'skipped': 0, 'new_prices': 1, 'wall_time': 2.0},
+                                   {'processed': 2, 'failed': 1, 'skipped': 1, 'new_prices': 0, 'wall_time': 3.0}])
+
+        self.assertEqual(summary, {'chunks': 2, 'processed': 3, 'failed': 1, 'skipped': 1, 'new_prices': 1,
+                                   'wall_time': 3.0})
+
 
 if __name__ == '__main__':
     unittest.main()
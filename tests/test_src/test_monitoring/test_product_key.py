@@ -0,0 +1,29 @@
+import unittest
+
+from src.monitoring.services.product_key import get_product_key, ProductKey
+
+
+class TestGetProductKey(unittest.TestCase):
+    def test_ozon(self):
+        for url in ['https://www.ozon.ru/product/smartfon-apple-iphone-15-1234567/?sh=abc&from=share',
+                    'https://ozon.ru/product/smartfon-apple-iphone-15-pro-1234567',
+                    'https://OZON.ru/product/1234567/#reviews']:
+            self.assertEqual(get_product_key(url), ProductKey('ozon.ru', '1234567'))
+
+    def test_megamarket(self):
+        self.assertEqual(
+            get_product_key('https://megamarket.ru/catalog/details/smartfon-apple-iphone-15-100060768030_1234/'),
+            ProductKey('megamarket.ru', '100060768030'))
+
+    def test_wildberries(self):
+        for url in ['https://www.wildberries.ru/catalog/178614735/detail.aspx?size=1',
+                    'https://wildberries.ru/catalog/178614735/detail.aspx']:
+            self.assertEqual(get_product_key(url), ProductKey('wildberries.ru', '178614735'))
+
+    def test_without_article_uses_path(self):
+        self.assertEqual(get_product_key('https://www.ozon.ru/t/AbCd/?utm=1'), ProductKey('ozon.ru', '/t/AbCd'))
+        self.assertEqual(get_product_key('https://example.com/product/'), ProductKey('example.com', '/product'))
+
+
+if __name__ == '__main__':
+    unittest.main()
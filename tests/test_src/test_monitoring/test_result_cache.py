@@ -0,0 +1,80 @@
+import threading
+import time
+import unittest
+
+from src.monitoring.result_cache import ResultCache
+from tests.test_src.test_monitoring.fake_redis import FakeRedis
+
+
+class TestResultCache(unittest.TestCase):
+    def setUp(self):
+        self.redis = FakeRedis()
+        self.cache = ResultCache(ttl=60, local_size=2, lock_timeout=5, redis_factory=lambda: self.redis)
+
+    def test_key_is_product_article(self):
+        self.cache.set('https://www.ozon.ru/product/item-1/?sh=abc', (100, 'Товар'))
+
+        self.assertEqual(self.cache.get('https://ozon.ru/product/other-name-1'), (100, 'Товар'))
+        self.assertIn('result_cache:ozon.ru:1', self.redis.data)
+
+    def test_shared_cache_fills_local_lru(self):
+        other_process = ResultCache(ttl=60, local_size=2, redis_factory=lambda: self.redis)
+        other_process.set('https://ozon.ru/product/1/', (100, 'Товар'))
+
+        self.assertEqual(self.cache.get('https://ozon.ru/product/1/'), (100, 'Товар'))
+        self.redis.data.clear()
+        self.assertEqual(self.cache.get('https://ozon.ru/product/1/'), (100, 'Товар'))
+
+    def test_lru_evicts_oldest(self):
+        for product_id in range(3):
+            self.cache.set(f'https://ozon.ru/product/{product_id}/', (product_id, 'Товар'))
+        self.redis.data.clear()
+
+        self.assertIsNone(self.cache.get('https://ozon.ru/product/0/'))
+        self.assertEqual(self.cache.get('https://ozon.ru/product/2/'), (2, 'Товар'))
+
+    def test_concurrent_requests_share_one_load(self):
+        calls = []
+
+        def fetch():
+            calls.append(1)
+            time.sleep(0.1)
+            return 100, 'Товар'
+
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(
+            self.cache.get_or_fetch('https://ozon.ru/product/1/', fetch))) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, [(100, 'Товар')] * 5)
+        self.assertEqual(self.redis.data, {'result_cache:ozon.ru:1': b'[100, "\\u0422\\u043e\\u0432\\u0430\\u0440"]'})
+
+    def test_failed_load_is_not_cached(self):
+        def fetch():
+            raise ValueError('Не определена цена товара!')
+
+        with self.assertRaises(ValueError):
+            self.cache.get_or_fetch('https://ozon.ru/product/1/', fetch)
+
+        self.assertIsNone(self.cache.get('https://ozon.ru/product/1/'))
+        self.assertEqual(self.cache.get_or_fetch('https://ozon.ru/product/1/', lambda: (1, 'Товар')), (1, 'Товар'))
+
+    def test_expired_lock_of_other_process_is_kept(self):
+        lock_key = 'result_cache:ozon.ru:1:lock'
+
+        def fetch():
+            # наша блокировка истекла, и товар начал загружать другой процесс
+            self.redis.set(lock_key, 'other-token')
+            return 100, 'Товар'
+
+        self.cache.get_or_fetch('https://ozon.ru/product/1/', fetch)
+
+        self.assertEqual(self.redis.get(lock_key), b'other-token')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,74 @@
+import datetime
+import unittest
+
+from config.config import SCHEDULE_MAX_INTERVAL, SCHEDULE_MIN_INTERVAL
+from db.crud_operations import MonitoredSubscription
+from src.monitoring.scheduler import get_check_interval, get_priority, get_threshold_closeness, get_volatility, \
+    plan_after_success, plan_after_failure, plan_after_skip
+
+
+def make_subscription(telegram_id: int = 10, threshold_price: int = 0, is_any_change: bool = True,
+                      last_price: int = 1000, volatility: float = 0, consecutive_failures: int = 0):
+    return MonitoredSubscription(product_id=1, url='https://www.ozon.ru/product/1/', last_price=last_price,
+                                 telegram_id=telegram_id, threshold_price=threshold_price,
+                                 is_any_change=is_any_change, is_take_into_account_bonuses=False,
+                                 volatility=volatility, consecutive_failures=consecutive_failures)
+
+
+class TestScheduler(unittest.TestCase):
+    def test_priority_grows_with_subscribers(self):
+        one = get_priority([make_subscription()], volatility=0, price=1000)
+        many = get_priority([make_subscription(telegram_id) for telegram_id in range(7)], volatility=0, price=1000)
+
+        self.assertGreater(many, one)
+
+    def test_threshold_closeness(self):
+        far = [make_subscription(threshold_price=500, is_any_change=False)]
+        near = [make_subscription(threshold_price=950, is_any_change=False)]
+        reached = [make_subscription(threshold_price=1100, is_any_change=False)]
+
+        self.assertEqual(get_threshold_closeness(far, 1000), 0)
+        self.assertAlmostEqual(get_threshold_closeness(near, 1000), 0.75)
+        self.assertEqual(get_threshold_closeness(reached, 1000), 1)
+        self.assertEqual(get_threshold_closeness([make_subscription(threshold_price=950)], 1000), 0)
+
+    def test_volatility_is_moving_average(self):
+        self.assertAlmostEqual(get_volatility(0, 1000, 900, alpha=0.5), 0.05)
+        self.assertAlmostEqual(get_volatility(0.05, 1000, 1000, alpha=0.5), 0.025)
+
+    def test_check_interval_bounds_and_backoff(self):
+        self.assertEqual(get_check_interval(priority=1000).total_seconds(), SCHEDULE_MIN_INTERVAL)
+        self.assertLess(get_check_interval(priority=3), get_check_interval(priority=1))
+        self.assertEqual(get_check_interval(priority=1, consecutive_failures=2), 4 * get_check_interval(priority=1))
+        self.assertEqual(get_check_interval(priority=0, consecutive_failures=100).total_seconds(),
+                         SCHEDULE_MAX_INTERVAL)
+
+    def test_plan_after_success_and_failure(self):
+        now = datetime.datetime(2024, 1, 1)
+        subscriptions = [make_subscription(volatility=0.1, consecutive_failures=3)]
+
+        success = plan_after_success(subscriptions, new_price=900, now=now)
+        failure = plan_after_failure(subscriptions, now=now)
+
+        self.assertEqual(success.consecutive_failures, 0)
+        self.assertEqual(success.last_checked_at, now)
+        self.assertGreater(success.next_check_at, now)
+        self.assertEqual(failure.consecutive_failures, 4)
+        self.assertEqual(failure.volatility, 0.1)
+        self.assertGreater(failure.next_check_at, success.next_check_at)
+
+    def test_plan_after_skip_keeps_failures(self):
+        now = datetime.datetime(2024, 1, 1, 12)
+        subscriptions = [make_subscription(volatility=0.1, consecutive_failures=3)]
+
+        skip = plan_after_skip(subscriptions, now=now)
+
+        self.assertEqual(skip.consecutive_failures, 3)
+        self.assertIsNone(skip.last_checked_at)
+        self.assertEqual(skip.next_check_at, plan_after_failure([make_subscription(volatility=0.1,
+                                                                                   consecutive_failures=2)],
+                                                                now=now).next_check_at)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,70 @@
+import unittest
+from unittest.mock import patch
+
+from src.monitoring.parsers.selector_registry import SelectorRegistry
+
+
+class TestSelectorRegistry(unittest.TestCase):
+    def test_order_by_recent_hit_rate(self):
+        registry = SelectorRegistry(is_persistent=False)
+        candidates = ['a', 'b', 'c']
+
+        registry.record('ozon.ru', 'price', ['a', 'b', 'c'], 'c')
+        registry.record('ozon.ru', 'price', ['c', 'a', 'b'], 'c')
+
+        self.assertEqual(registry.order('ozon.ru', 'price', candidates)[0], 'c')
+        self.assertEqual(registry.order('wildberries.ru', 'price', candidates), candidates)
+
+        stats = registry.get_stats('ozon.ru', 'price')
+        self.assertEqual((stats['c'].hits, stats['c'].misses), (2, 0))
+        self.assertEqual((stats['a'].hits, stats['a'].misses), (0, 1))
+
+    def test_record_without_match(self):
+        registry = SelectorRegistry(is_persistent=False)
+
+        registry.record('ozon.ru', 'name', ['a', 'b'], None)
+
+        stats = registry.get_stats('ozon.ru', 'name')
+        self.assertEqual(stats['a'].misses, 1)
+        self.assertEqual(stats['b'].misses, 1)
+
+    def test_promote(self):
+        registry = SelectorRegistry(is_persistent=False)
+        registry.record('ozon.ru', 'price', ['a'], 'a')
+
+        registry.promote('ozon.ru', 'price', 'new.class')
+
+        self.assertEqual(registry.order('ozon.ru', 'price', ['a', 'b']), ['new.class', 'a', 'b'])
+        self.assertTrue(registry.get_stats('ozon.ru', 'price')['new.class'].is_learned)
+
+    @patch('db.crud_operations.SelectorStatsCRUD.save_selector_stats')
+    @patch('db.crud_operations.SelectorStatsCRUD.get_selector_stats', return_value=[])
+    def test_flush_saves_pending_counts(self, mock_get_selector_stats, mock_save_selector_stats):
+        registry = SelectorRegistry()
+        registry.order('ozon.ru', 'price', ['a', 'b'])
+        registry.record('ozon.ru', 'price', ['a', 'b'], 'b')
+
+        registry.flush()
+        registry.flush()
+
+        rows = mock_save_selector_stats.call_args_list[0].args[0]
+        self.assertEqual({row['selector']: (row['hits'], row['misses']) for row in rows}, {'a': (0, 1), 'b': (1, 0)})
+        self.assertEqual(mock_save_selector_stats.call_args_list[1].args[0], [])
+        mock_get_selector_stats.assert_called_once()
+
+    @patch('db.crud_operations.SelectorStatsCRUD.save_selector_stats', return_value=None)
+    @patch('db.crud_operations.SelectorStatsCRUD.get_selector_stats', return_value=[])
+    def test_flush_keeps_counts_on_failure(self, mock_get_selector_stats, mock_save_selector_stats):
+        registry = SelectorRegistry()
+        registry.order('ozon.ru', 'price', ['a', 'b'])
+        registry.record('ozon.ru', 'price', ['a', 'b'], 'b')
+
+        registry.flush()
+        registry.flush()
+
+        rows = mock_save_selector_stats.call_args_list[1].args[0]
+        self.assertEqual({row['selector']: (row['hits'], row['misses']) for row in rows}, {'a': (0, 1), 'b': (1, 0)})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,58 @@
+import threading
+import time
+import unittest
+from collections import defaultdict
+
+from src.monitoring.sweep import ParallelSweep
+
+
+class TestParallelSweep(unittest.TestCase):
+    def setUp(self):
+        self.lock = threading.Lock()
+        self.in_flight = defaultdict(int)
+        self.max_in_flight = defaultdict(int)
+
+    def _fetch(self, url):
+        marketplace = url.split('/')[2]
+        with self.lock:
+            self.in_flight[marketplace] += 1
+            self.in_flight['total'] += 1
+            self.max_in_flight[marketplace] = max(self.max_in_flight[marketplace], self.in_flight[marketplace])
+            self.max_in_flight['total'] = max(self.max_in_flight['total'], self.in_flight['total'])
+        time.sleep(0.01)
+        with self.lock:
+            self.in_flight[marketplace] -= 1
+            self.in_flight['total'] -= 1
+        if url.endswith('broken'):
+            raise ValueError(url)
+        return len(url)
+
+    def test_run_respects_limits(self):
+        urls = ([f'https://ozon.ru/product/{i}' for i in range(6)] +
+                [f'https://www.wildberries.ru/catalog/{i}' for i in range(6)])
+        sweep = ParallelSweep(max_sessions=3, marketplace_sessions={'ozon.ru': 2, 'wildberries.ru': 1})
+
+        results = list(sweep.run(urls, get_url=lambda url: url, fetch=self._fetch))
+
+        self.assertEqual(sorted(url for url, _, _ in results), sorted(urls))
+        self.assertLessEqual(self.max_in_flight['total'], 3)
+        self.assertLessEqual(self.max_in_flight['ozon.ru'], 2)
+        self.assertLessEqual(self.max_in_flight['www.wildberries.ru'], 1)
+        self.assertEqual(sweep.processed, len(urls))
+        self.assertGreater(sweep.wall_time, 0)
+
+    def test_run_returns_errors(self):
+        urls = ['https://ozon.ru/product/1', 'https://ozon.ru/product/broken']
+        sweep = ParallelSweep(max_sessions=2)
+
+        results = {url: (result, error) for url, result, error in
+                   sweep.run(urls, get_url=lambda url: url, fetch=self._fetch)}
+
+        self.assertEqual(results[urls[0]], (len(urls[0]), None))
+        self.assertIsNone(results[urls[1]][0])
+        self.assertIsInstance(results[urls[1]][1], ValueError)
+        self.assertEqual(sweep.failed, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
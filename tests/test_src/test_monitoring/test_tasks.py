@@ -0,0 +1,55 @@
+import unittest
+from unittest.mock import patch
+
+from src.monitoring.tasks import check_new_products_prices, check_products_task
+
+
+class TestMonitoringTasks(unittest.TestCase):
+    @patch('src.monitoring.tasks.chord')
+    @patch('src.monitoring.tasks.claim_due_products')
+    @patch('db.crud_operations.ProductScheduleCRUD.add_missing_schedules')
+    def test_check_new_products_prices_fans_out_by_marketplace(self, mock_add_missing_schedules,
+                                                                mock_claim_due_products, mock_chord):
+        mock_claim_due_products.return_value = {1: 'https://www.ozon.ru/product/1/',
+                                                2: 'https://www.wildberries.ru/catalog/2/detail.aspx'}
+
+        check_new_products_prices()
+
+        header = mock_chord.call_args.args[0]
+        self.assertEqual(sorted((signature.args[0], signature.options['queue']) for signature in header),
+                         [([1], 'monitoring.ozon.ru'), ([2], 'monitoring.wildberries.ru')])
+        lease_id = mock_claim_due_products.call_args.args[0]
+        self.assertTrue(all(signature.args[1] == lease_id for signature in header))
+        callback = mock_chord.return_value.call_args.args[0]
+        self.assertEqual(callback.task, 'src.monitoring.tasks.summarize_sweep_task')
+
+    @patch('src.monitoring.tasks.chord')
+    @patch('src.monitoring.tasks.claim_due_products', return_value={})
+    @patch('db.crud_operations.ProductScheduleCRUD.add_missing_schedules')
+    def test_check_new_products_prices_without_due_products(self, mock_add_missing_schedules,
+                                                             mock_claim_due_products, mock_chord):
+        check_new_products_prices()
+
+        mock_chord.assert_not_called()
+
+    @patch('db.crud_operations.ProductScheduleCRUD.release_leases')
+    @patch('db.crud_operations.ProductScheduleCRUD.renew_leases', return_value=[1, 2])
+    @patch('src.monitoring.tasks.check_products', side_effect=RuntimeError('boom'))
+    def test_check_products_task_reports_failed_chunk(self, mock_check_products, mock_renew_leases,
+                                                      mock_release_leases):
+        result = check_products_task([1, 2], 'lease')
+
+        self.assertEqual(result['failed'], 2)
+        self.assertEqual(result['processed'], 0)
+        mock_release_leases.assert_called_once_with([1, 2], worker_id='lease')
+
+    @patch('db.crud_operations.ProductScheduleCRUD.renew_leases', return_value=[2])
+    @patch('src.monitoring.tasks.check_products', return_value={'processed': 1})
+    def test_check_products_task_skips_lost_leases(self, mock_check_products, mock_renew_leases):
+        check_products_task([1, 2], 'lease')
+
+        mock_check_products.assert_called_once_with([2], 'lease')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,100 @@
+import unittest
+from unittest.mock import MagicMock, patch
+
+from selenium.common import TimeoutException
+
+from src.monitoring.custom_exceptions import DomainUnavailable, ProductNotFound, PageNotLoaded
+from src.monitoring.driver_pool import DriverPoolExhausted
+from src.monitoring.throttling import CircuitBreaker, DomainRateLimiter, throttled
+from tests.test_src.test_monitoring.fake_redis import FakeRedis
+
+
+class TestCircuitBreaker(unittest.TestCase):
+    def setUp(self):
+        self.redis = FakeRedis()
+        self.breaker = CircuitBreaker(failure_threshold=3, cooldown=60, redis_factory=lambda: self.redis)
+
+    def test_opens_after_consecutive_failures(self):
+        for _ in range(2):
+            self.breaker.record_failure('ozon.ru')
+        self.assertFalse(self.breaker.is_open('ozon.ru'))
+
+        self.breaker.record_failure('ozon.ru')
+        self.assertTrue(self.breaker.is_open('ozon.ru'))
+        self.assertFalse(self.breaker.is_open('wildberries.ru'))
+
+    def test_success_resets_failures(self):
+        for _ in range(2):
+            self.breaker.record_failure('ozon.ru')
+        self.breaker.record_success('ozon.ru')
+        self.breaker.record_failure('ozon.ru')
+
+        self.assertFalse(self.breaker.is_open('ozon.ru'))
+
+    def test_reopens_on_first_failure_after_cooldown(self):
+        for _ in range(3):
+            self.breaker.record_failure('ozon.ru')
+        self.redis.delete('circuit_breaker:ozon.ru:open')  # пауза истекла
+
+        self.breaker.record_failure('ozon.ru')
+
+        self.assertTrue(self.breaker.is_open('ozon.ru'))
+
+
+class TestDomainRateLimiter(unittest.TestCase):
+    def make_limiter(self, script_result: str) -> tuple[DomainRateLimiter, MagicMock]:
+        script = MagicMock(return_value=script_result)
+        client = MagicMock()
+        client.register_script.return_value = script
+        return DomainRateLimiter(rates={'ozon.ru': 2}, burst=3, max_wait=10, redis_factory=lambda: client), script
+
+    @patch('src.monitoring.throttling.time.sleep')
+    def test_waits_for_reserved_token(self, mock_sleep):
+        limiter, script = self.make_limiter('0.5')
+
+        self.assertTrue(limiter.acquire('ozon.ru'))
+
+        mock_sleep.assert_called_once_with(0.5)
+        self.assertEqual(script.call_args.kwargs, {'keys': ['rate_limit:ozon.ru'], 'args': [2, 3, 10]})
+
+    @patch('src.monitoring.throttling.time.sleep')
+    def test_rejects_when_queue_is_too_long(self, mock_sleep):
+        limiter, _ = self.make_limiter('-1')
+
+        self.assertFalse(limiter.acquire('ozon.ru'))
+        mock_sleep.assert_not_called()
+
+
+class TestThrottled(unittest.TestCase):
+    @patch('src.monitoring.throttling.rate_limiter')
+    @patch('src.monitoring.throttling.circuit_breaker')
+    def test_records_failures_and_skips_open_domain(self, mock_breaker, mock_limiter):
+        mock_breaker.is_open.return_value = False
+        mock_limiter.acquire.return_value = True
+
+        with self.assertRaises(TimeoutException):
+            throttled('ozon.ru', MagicMock(side_effect=TimeoutException()))
+        mock_breaker.record_failure.assert_called_once_with('ozon.ru')
+
+        self.assertEqual(throttled('ozon.ru', lambda: (100, 'name')), (100, 'name'))
+        mock_breaker.record_success.assert_called_once_with('ozon.ru')
+
+        with self.assertRaises(ProductNotFound):
+            throttled('ozon.ru', MagicMock(side_effect=ProductNotFound('Не определена цена товара!')))
+        with self.assertRaises(DriverPoolExhausted):
+            throttled('ozon.ru', MagicMock(side_effect=DriverPoolExhausted()))
+        mock_breaker.record_failure.assert_called_once_with('ozon.ru')
+
+        with self.assertRaises(PageNotLoaded):
+            throttled('ozon.ru', MagicMock(side_effect=PageNotLoaded()))
+        self.assertEqual(mock_breaker.record_failure.call_count, 2)
+
+        mock_breaker.is_open.return_value = True
+        fetch = MagicMock()
+        with self.assertRaises(DomainUnavailable):
+            throttled('ozon.ru', fetch)
+        fetch.assert_not_called()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,71 @@
+import json
+import os
+import unittest
+from unittest.mock import MagicMock, patch
+
+from requests import ConnectionError
+
+from src.monitoring.custom_exceptions import ProductNotFound
+from src.monitoring.parsers.wildberries_api_parser import WildberriesApiParser
+from src.monitoring.parsers.wildberries_parser import WildberriesParser
+
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), 'fixtures')
+
+
+def load_fixture(name: str) -> dict:
+    with open(os.path.join(FIXTURES_DIR, name), encoding='utf-8') as file:
+        return json.load(file)
+
+
+def make_response(card: dict):
+    response = MagicMock()
+    response.json.return_value = card
+    return response
+
+
+class TestWildberriesApiParser(unittest.TestCase):
+    @patch('src.monitoring.parsers.wildberries_api_parser.get_http_session')
+    def test_get_product_price_and_name_v2(self, mock_get_http_session):
+        mock_get_http_session.return_value.get.return_value = make_response(load_fixture('wildberries_card_v2.json'))
+        parser = WildberriesApiParser(driver=None,
+                                      product_url='https://www.wildberries.ru/catalog/178614735/detail.aspx?size=1')
+
+        product_price, product_name = parser.get_product_price_and_name()
+
+        self.assertEqual(product_price, 73490)
+        self.assertEqual(product_name, 'Смартфон iPhone 15 128GB')
+        params = mock_get_http_session.return_value.get.call_args.kwargs['params']
+        self.assertEqual(params['nm'], 178614735)
+
+    @patch('src.monitoring.parsers.wildberries_api_parser.get_http_session')
+    def test_get_product_price_and_name_v1(self, mock_get_http_session):
+        mock_get_http_session.return_value.get.return_value = make_response(load_fixture('wildberries_card_v1.json'))
+        parser = WildberriesApiParser(driver=None,
+                                      product_url='https://wildberries.ru/catalog/15297133/detail.aspx')
+
+        self.assertEqual(parser.get_product_price_and_name(), (1059, 'Футболка хлопковая оверсайз'))
+
+    def test_extract_article_id(self):
+        parser = WildberriesApiParser(driver=None, product_url='https://www.wildberries.ru/brands/apple')
+
+        with self.assertRaises(ProductNotFound):
+            parser._extract_article_id()
+
+    @patch.object(WildberriesParser, 'get_product_price_and_name', return_value=(100, 'browser'))
+    @patch('src.monitoring.parsers.wildberries_api_parser.get_http_session')
+    def test_fallback_to_browser(self, mock_get_http_session, mock_browser_parse):
+        driver = MagicMock()
+        mock_get_http_session.return_value.get.return_value = make_response(load_fixture('wildberries_card_empty.json'))
+        parser = WildberriesApiParser(driver=driver,
+                                      product_url='https://www.wildberries.ru/catalog/178614735/detail.aspx')
+
+        self.assertEqual(parser.get_product_price_and_name(), (100, 'browser'))
+
+        mock_get_http_session.return_value.get.side_effect = ConnectionError()
+        self.assertEqual(parser.get_product_price_and_name(), (100, 'browser'))
+        self.assertEqual(mock_browser_parse.call_count, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
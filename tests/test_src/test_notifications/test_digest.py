@@ -0,0 +1,59 @@
+import unittest
+from collections import namedtuple
+from unittest.mock import patch
+
+from src.notifications.digest import DigestBuffer, send_digests
+
+
+PendingNotification = namedtuple('PendingNotification',
+                                 'id chat_id product_name product_url old_price new_price updated_at')
+
+
+class TestDigest(unittest.TestCase):
+    @patch('db.crud_operations.PendingNotificationsCRUD.add_pending_notifications', return_value=2)
+    def test_buffer_keeps_first_old_price(self, mock_add_pending):
+        buffer = DigestBuffer()
+
+        buffer.add(chat_id=1, product_id=10, product_name='Товар', product_url='url', old_price=100, new_price=90)
+        buffer.add(chat_id=1, product_id=10, product_name='Товар', product_url='url', old_price=90, new_price=80)
+        buffer.add(chat_id=2, product_id=10, product_name='Товар', product_url='url', old_price=100, new_price=90)
+        buffer.flush()
+
+        changes = sorted(mock_add_pending.call_args.args[0], key=lambda change: change['chat_id'])
+        self.assertEqual([(change['old_price'], change['new_price']) for change in changes], [(100, 80), (100, 90)])
+        self.assertEqual(buffer.flush(), 0)
+
+    @patch('src.notifications.digest.notification_dispatcher')
+    @patch('db.crud_operations.PendingNotificationsCRUD.delete_sent_notifications')
+    @patch('db.crud_operations.PendingNotificationsCRUD.get_pending_notifications')
+    def test_send_digests_one_message_per_chat(self, mock_get_pending, mock_delete_sent, mock_dispatcher):
+        mock_get_pending.return_value = [
+            PendingNotification(1, 1, 'Первый', 'https://a', 100, 90, None),
+            PendingNotification(2, 2, 'Второй', 'https://b', 100, 100, None),
+            PendingNotification(3, 1, 'Третий', 'https://c', 50, 60, None),
+        ]
+        mock_dispatcher.flush.return_value = True
+
+        sent = send_digests(['hourly'])
+
+        self.assertEqual(sent, 1)
+        mock_dispatcher.enqueue.assert_called_once()
+        message = mock_dispatcher.enqueue.call_args.kwargs['text']
+        self.assertIn('[Первый](https://a)', message)
+        self.assertIn('[Третий](https://c)', message)
+        self.assertEqual(mock_dispatcher.enqueue.call_args.kwargs['chat_id'], 1)
+        self.assertEqual(len(mock_delete_sent.call_args.args[0]), 3)
+
+    @patch('src.notifications.digest.notification_dispatcher')
+    @patch('db.crud_operations.PendingNotificationsCRUD.delete_sent_notifications')
+    @patch('db.crud_operations.PendingNotificationsCRUD.get_pending_notifications')
+    def test_send_digests_keeps_changes_when_not_sent(self, mock_get_pending, mock_delete_sent, mock_dispatcher):
+        mock_get_pending.return_value = [PendingNotification(1, 1, 'Первый', 'https://a', 100, 90, None)]
+        mock_dispatcher.flush.return_value = False
+
+        self.assertEqual(send_digests(['hourly']), 0)
+        mock_delete_sent.assert_not_called()
+
+
+if __name__ == '__main__':
+    unittest.main()
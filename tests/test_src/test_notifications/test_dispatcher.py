@@ -0,0 +1,88 @@
+import asyncio
+import time
+import unittest
+
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.methods import SendMessage
+
+from src.notifications.dispatcher import NotificationDispatcher, join_messages
+
+
+class TestNotificationDispatcher(unittest.TestCase):
+    def setUp(self):
+        self.sent = []
+
+    async def send(self, chat_id: int, text: str):
+        self.sent.append((chat_id, text, time.monotonic()))
+
+    def test_coalesces_messages_for_one_chat(self):
+        dispatcher = NotificationDispatcher(send=self.send, global_rate=100, chat_interval=0.3, senders=2)
+
+        dispatcher.enqueue(1, 'first')
+        self.assertTrue(dispatcher.flush(timeout=2))
+        dispatcher.enqueue(1, 'second')
+        dispatcher.enqueue(1, 'third')
+        dispatcher.enqueue(2, 'other chat')
+        self.assertTrue(dispatcher.flush(timeout=2))
+
+        by_chat = {}
+        for chat_id, text, sent_at in self.sent:
+            by_chat.setdefault(chat_id, []).append((text, sent_at))
+        self.assertEqual([text for text, _ in by_chat[1]], ['first', 'second\n\nthird'])
+        self.assertGreaterEqual(by_chat[1][1][1] - by_chat[1][0][1], 0.25)
+        self.assertEqual([text for text, _ in by_chat[2]], ['other chat'])
+
+    def test_retries_after_telegram_asks_to_wait(self):
+        attempts = []
+
+        async def send(chat_id: int, text: str):
+            attempts.append(text)
+            if len(attempts) == 1:
+                raise TelegramRetryAfter(method=SendMessage(chat_id=chat_id, text=text), message='Flood control',
+                                         retry_after=0)
+            await asyncio.sleep(0)
+
+        dispatcher = NotificationDispatcher(send=send, global_rate=100, chat_interval=0, senders=1)
+        dispatcher.enqueue(1, 'price changed')
+
+        self.assertTrue(dispatcher.flush(timeout=2))
+        self.assertEqual(attempts, ['price changed', 'price changed'])
+
+    def test_one_chat_is_not_sent_by_two_senders_at_once(self):
+        in_flight = []
+        overlaps = []
+
+        async def slow_send(chat_id: int, text: str):
+            if in_flight:
+                overlaps.append(text)
+            in_flight.append(text)
+            self.sent.append((chat_id, text, time.monotonic()))
+            await asyncio.sleep(0.3)
+            in_flight.remove(text)
+
+        dispatcher = NotificationDispatcher(send=slow_send, global_rate=100, chat_interval=0.1, senders=4)
+        dispatcher.enqueue(1, 'first')
+        time.sleep(0.1)
+        dispatcher.enqueue(1, 'second')
+
+        self.assertTrue(dispatcher.flush(timeout=3))
+        self.assertEqual(overlaps, [])
+        self.assertGreaterEqual(self.sent[1][2] - self.sent[0][2], 0.35)
+
+    def test_last_retry_does_not_wait(self):
+        async def send(chat_id: int, text: str):
+            raise TelegramRetryAfter(method=SendMessage(chat_id=chat_id, text=text), message='Flood control',
+                                     retry_after=5)
+
+        dispatcher = NotificationDispatcher(send=send, global_rate=100, chat_interval=0, senders=1, max_retries=0)
+        dispatcher.enqueue(1, 'price changed')
+
+        self.assertTrue(dispatcher.flush(timeout=2))
+
+    def test_join_messages_respects_limit(self):
+        self.assertEqual(join_messages(['a' * 5, 'b' * 5, 'c' * 5], limit=12), ['a' * 5 + '\n\n' + 'b' * 5, 'c' * 5])
+        self.assertEqual(join_messages(['a' * 20], limit=12), ['a' * 20])
+
+
+if __name__ == '__main__':
+    unittest.main()
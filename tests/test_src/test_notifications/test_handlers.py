@@ -0,0 +1,47 @@
+import unittest
+from unittest import IsolatedAsyncioTestCase
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from requests import RequestException
+
+from src.notifications import text
+from src.notifications.handlers import enter_link_handler
+
+
+class TestEnterLinkHandler(IsolatedAsyncioTestCase):
+    def make_message(self, message_text: str) -> MagicMock:
+        message = MagicMock()
+        message.text = message_text
+        message.answer = AsyncMock(return_value=MagicMock(edit_text=AsyncMock()))
+        message.delete = AsyncMock()
+        return message
+
+    async def test_unknown_marketplace(self):
+        message = self.make_message('https://example.com/product/1')
+
+        await enter_link_handler(message, AsyncMock())
+
+        self.assertEqual(message.answer.call_args.args[0], text.parser_not_found)
+
+    @patch('src.notifications.handlers.get_product_price_and_name_from_handlers',
+           side_effect=RequestException('timeout'))
+    async def test_scrape_error_replaces_status_message(self, mock_get_price):
+        message = self.make_message('https://www.ozon.ru/product/1/')
+
+        await enter_link_handler(message, AsyncMock())
+
+        status_message = message.answer.return_value
+        status_message.edit_text.assert_awaited_once_with(text.product_check_failed)
+
+    @patch('src.notifications.handlers.get_product_price_and_name_from_handlers', side_effect=KeyError('price'))
+    async def test_key_error_inside_scrape_is_not_reported_as_unknown_marketplace(self, mock_get_price):
+        message = self.make_message('https://www.ozon.ru/product/1/')
+
+        await enter_link_handler(message, AsyncMock())
+
+        self.assertEqual(message.answer.call_args.args[0], text.checking_product)
+        message.answer.return_value.edit_text.assert_awaited_once_with(text.product_check_failed)
+
+
+if __name__ == '__main__':
+    unittest.main()